@@ -1,12 +1,12 @@
 from pathlib import Path
-from flask import Flask, render_template, request, redirect, url_for, session, jsonify, Response, flash, send_file, current_app
+from flask import Flask, render_template, request, redirect, url_for, session, jsonify, Response, flash, send_file, current_app, g, has_request_context
 import datetime as _dt
 from datetime import timedelta, datetime, date
 from functools import wraps
 from io import StringIO, BytesIO
 from math import ceil
 import json, os, uuid, csv, re, io, mimetypes, smtplib, secrets, hashlib, zipfile, urllib.request, urllib.error, unicodedata, ssl
-from urllib.parse import quote as _q, urlencode
+from urllib.parse import quote as _q, urlencode, unquote
 from email.message import EmailMessage
 from email.header import Header
 from email.utils import formataddr
@@ -16,7 +16,7 @@ from html import escape
 import boto3
 from botocore.config import Config 
 import unicodedata
-from markupsafe import escape
+from markupsafe import escape, Markup
 
 load_dotenv(dotenv_path=Path(__file__).with_name('.env'))
 # .env 한 번만 로드
@@ -116,6 +116,12 @@ def _init_config_from_env(app):
     # .env에서 읽어 app.config로 복사
     app.config.update(
         CLOUD_BACKEND=os.getenv("CLOUD_BACKEND", "").lower(),
+        STORAGE_BACKEND=os.getenv("STORAGE_BACKEND", "json").lower(),   # json | sqlite
+        # dev | prod. 지정하지 않으면 `python app.py` 나 `flask run --debug`(FLASK_DEBUG=1) 는 dev,
+        # gunicorn 등에서 import 하면 prod
+        APP_MODE=os.getenv("APP_MODE", "dev" if __name__ == "__main__" or app.debug else "prod").lower(),
+        TEMPLATES_COMPILED_DIR=os.getenv("TEMPLATES_COMPILED_DIR"),
+        SQLITE_PATH=os.getenv("SQLITE_PATH"),
         S3_BUCKET=os.getenv("S3_BUCKET"),
         S3_REGION=os.getenv("S3_REGION"),
         S3_EXPIRE_SECONDS=int(os.getenv("S3_EXPIRE_SECONDS", "604800")),
@@ -134,8 +140,13 @@ _init_config_from_env(app)
 app.secret_key = os.environ.get("FLASK_SECRET_KEY", "dev-secret-change-me")
 app.permanent_session_lifetime = timedelta(days=7)
 app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0
-app.config['TEMPLATES_AUTO_RELOAD'] = True
-app.jinja_env.auto_reload = True
+
+# 템플릿: dev 는 요청마다 캐시를 비워 항상 새로 컴파일(수정 즉시 반영),
+# prod 는 시작할 때 한 번 컴파일해 두고 그대로 쓴다(맨 아래 "템플릿 미리 컴파일")
+APP_DEV = app.config["APP_MODE"] == "dev"
+if APP_DEV:
+    app.config['TEMPLATES_AUTO_RELOAD'] = True
+    app.jinja_env.auto_reload = True
 
 print("TEMPLATE SEARCH PATH =", app.jinja_loader.searchpath)
 
@@ -292,9 +303,7 @@ def _slug_for_s3(text: str, fallback: str = "company") -> str:
     return s or fallback
 
 def _docs_write(company: str, rows: list):
-    db = load_json("documents.json", {})
-    db[company] = rows
-    save_json("documents.json", db)
+    update_json("documents.json", lambda db: db.__setitem__(company, rows))
 
 def _ensure_company_docs_dir(company: str) -> Path:
     p = DOCS_DIR / company
@@ -378,9 +387,7 @@ def _docs_add(company: str, filename: str, stored: str, size: int, mime: str) ->
         "mime": mime or "application/octet-stream",
         "uploaded_at": _now_str(),
     }
-    db = _docs_db_read()
-    db.setdefault(company, []).append(rec)
-    _docs_db_write(db)
+    update_json("documents.json", lambda db: db.setdefault(company, []).append(rec))
     return rec
 
 def _docs_find(company: str, key: str) -> dict | None:
@@ -391,12 +398,7 @@ def _docs_find(company: str, key: str) -> dict | None:
     return None
 
 def _docs_delete(company: str, key: str) -> bool:
-    db = _docs_db_read()
-    arr = list(db.get(company, []))
-    tgt = None
-    for r in arr:
-        if r.get("id") == key or r.get("stored") == key or r.get("filename") == key:
-            tgt = r; break
+    tgt = _docs_find(company, key)
     if not tgt:
         return False
     # 파일 삭제
@@ -407,9 +409,9 @@ def _docs_delete(company: str, key: str) -> bool:
     except Exception:
         pass
     # 메타에서 제거
-    arr = [r for r in arr if r.get("id") != tgt["id"]]
-    db[company] = arr
-    _docs_db_write(db)
+    def _drop(db):
+        db[company] = [r for r in db.get(company, []) if r.get("id") != tgt["id"]]
+    update_json("documents.json", _drop)
     return True
 
 
@@ -495,9 +497,7 @@ def _shares_read(company: str) -> list:
     return _shares_read_all().get(company, [])
 
 def _shares_write(company: str, rows: list):
-    db = _shares_read_all()
-    db[company] = rows
-    _shares_write_all(db)
+    update_json("shares.json", lambda db: db.__setitem__(company, rows))
 
 def _find_share_by_token(token: str):
     db = _shares_read_all()
@@ -582,18 +582,6 @@ def _carry_params_from_form():
     return {k: v for k, v in (request.form or {}).items()
             if k in FINANCE_FILTER_KEYS and str(v).strip() != ""}
 
-def _ensure_company_bucket(db_any, company: str):
-    # 파일이 리스트 형태로 저장돼 있던 레거시도 안전 처리
-    if isinstance(db_any, list):
-        db = {company: list(db_any)}
-    elif isinstance(db_any, dict):
-        db = dict(db_any)
-    else:
-        db = {}
-    if company not in db or not isinstance(db.get(company), list):
-        db[company] = []
-    return db
-
 # ──[ jobs → 자동 수입/지출 동기화용 안정 해시키 ]────────────────────
 import hashlib, json as _json
 
@@ -612,10 +600,12 @@ def _stable_job_key(company: str, j: dict) -> str:
     raw = _json.dumps(basis, ensure_ascii=False, sort_keys=True)
     return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
 
-@app.before_request
 def _dev__always_reload_templates():
     app.jinja_env.cache.clear()
 
+if APP_DEV:
+    app.before_request(_dev__always_reload_templates)
+
 # =========================================================
 # 공통 유틸(단일 정의, 중복 제거)
 # =========================================================
@@ -642,20 +632,316 @@ def _out_key_for_job(j: dict, kind: str) -> str:
     # hashlib는 이미 상단에 import 되어 있음
     return "auto-" + hashlib.md5(base.encode("utf-8")).hexdigest()[:16]
 
+# =========================================================
+# JSON 코덱 (orjson > msgspec > 표준 json)
+# =========================================================
+# JSON_CODEC=auto|orjson|msgspec|json  (설치 안 된 코덱을 고르면 표준 json)
+# JSON_COMPACT=1 : 운영용. data/*.json 을 들여쓰기 없이 저장(읽기는 어느 쪽이든 가능)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+_UTF8_BOM = b"\xef\xbb\xbf"
+
+def _json_codec() -> str:
+    want = (os.environ.get("JSON_CODEC") or "auto").strip().lower()
+    if want == "auto":
+        return "orjson" if orjson else ("msgspec" if msgspec else "json")
+    if (want == "orjson" and orjson) or (want == "msgspec" and msgspec):
+        return want
+    return "json"
+
+def _json_compact() -> bool:
+    return (os.environ.get("JSON_COMPACT") or "").strip().lower() in ("1", "true", "y", "yes", "on")
+
+def _json_decode(raw):
+    """bytes/str -> 객체 (UTF-8 BOM 허용)"""
+    if raw[:3] == _UTF8_BOM:
+        raw = raw[3:]
+    elif raw[:1] == "\ufeff":
+        raw = raw[1:]
+    codec = _json_codec()
+    try:
+        if codec == "orjson":
+            return orjson.loads(raw)
+        if codec == "msgspec":
+            return msgspec.json.decode(raw)
+    except (ValueError, getattr(msgspec, "DecodeError", ValueError)):
+        pass   # NaN/Infinity, 64비트 넘는 정수 등은 표준 json 만 읽는다
+    return json.loads(raw)
+
+def _json_encode(data, pretty: bool = False) -> bytes:
+    """객체 -> UTF-8 bytes. pretty=False 면 한 줄(저널/SQLite 용)"""
+    codec = _json_codec()
+    try:
+        if codec == "orjson":
+            opt = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if pretty else 0)
+            return orjson.dumps(data, option=opt)
+        if codec == "msgspec":
+            out = msgspec.json.encode(data)
+            return msgspec.json.format(out, indent=2) if pretty else out
+    except (TypeError, ValueError, OverflowError):
+        pass   # 빠른 코덱이 못 다루는 값은 표준 json 으로
+    if pretty:
+        return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def _json_text(data) -> str:
+    return _json_encode(data).decode("utf-8")
+
+# =========================================================
+# JSON 읽기 캐시 (경로 + inode/mtime_ns/size 기준 무효화)
+# =========================================================
+import threading, tempfile
+from contextlib import contextmanager, ExitStack
+
+_JSON_CACHE = {}                  # str(path) -> ((ino, mtime_ns, size), parsed)
+_JSON_CACHE_LOCK = threading.Lock()
+
+def _cow(v):
+    return _CowDict(v) if type(v) is dict else _CowList(v)
+
+class _CowDict(dict):
+    """
+    캐시된 파싱 결과를 감싸는 copy-on-write dict.
+    하위 dict/list는 처음 꺼내 쓸 때 한 번만 얕게 복사하고, 손대지 않은 값은 캐시와 공유한다.
+    """
+    __slots__ = ("_shared",)
+
+    def __init__(self, src=()):
+        dict.__init__(self, src)
+        self._shared = {id(v) for v in dict.values(self) if type(v) in (dict, list)}
+
+    def _own(self, key, v):
+        if id(v) in self._shared:
+            self._shared.discard(id(v))
+            v = _cow(v)
+            dict.__setitem__(self, key, v)
+        return v
+
+    def __getitem__(self, key):
+        return self._own(key, dict.__getitem__(self, key))
+
+    def __setitem__(self, key, value):
+        self._shared.discard(id(dict.get(self, key)))
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        self._shared.discard(id(dict.get(self, key)))
+        dict.__delitem__(self, key)
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def setdefault(self, key, default=None):
+        if key in self:
+            return self[key]
+        dict.__setitem__(self, key, default)
+        return default
+
+    def pop(self, key, *default):
+        v = dict.pop(self, key, *default)
+        if id(v) in self._shared:
+            self._shared.discard(id(v))
+            v = _cow(v)
+        return v
+
+    def __iter__(self):
+        # dict(cow), {**cow}, dict.update(cow) 는 __iter__ 를 덮어쓴 dict 에서만 keys()/__getitem__ 경로를 탄다
+        # (덮어쓰지 않으면 CPython 이 내부 저장소를 그대로 복사해 캐시된 하위 객체를 넘겨 준다)
+        return dict.__iter__(self)
+
+    def keys(self):
+        return dict.keys(self)
+
+    def values(self):
+        return [self[k] for k in dict.keys(self)]
+
+    def items(self):
+        return [(k, self[k]) for k in dict.keys(self)]
+
+    def copy(self):
+        return dict(self.items())
+
+    __copy__ = copy
+
+class _CowList(list):
+    """_CowDict의 list 버전(인덱스/순회/pop 시점에 원소를 복사)"""
+    __slots__ = ("_shared",)
+
+    def __init__(self, src=()):
+        list.__init__(self, src)
+        self._shared = {id(v) for v in list.__iter__(self) if type(v) in (dict, list)}
+
+    def _own(self, i):
+        v = list.__getitem__(self, i)
+        if id(v) in self._shared:
+            self._shared.discard(id(v))
+            v = _cow(v)
+            list.__setitem__(self, i, v)
+        return v
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._own(k) for k in range(*i.indices(len(self)))]
+        return self._own(i)
+
+    def __setitem__(self, i, value):
+        if not isinstance(i, slice):
+            self._shared.discard(id(list.__getitem__(self, i)))
+        list.__setitem__(self, i, value)
+
+    def __iter__(self):
+        i = 0
+        while i < len(self):
+            yield self._own(i)
+            i += 1
+
+    def __reversed__(self):
+        for i in range(len(self) - 1, -1, -1):
+            yield self._own(i)
+
+    def __add__(self, other):
+        return list(self) + list(other)
+
+    def pop(self, i=-1):
+        v = list.pop(self, i)
+        if id(v) in self._shared:
+            self._shared.discard(id(v))
+            v = _cow(v)
+        return v
+
+    def copy(self):
+        return list(self)
+
+    __copy__ = copy
+
+def _json_cache_drop(p: Path):
+    with _JSON_CACHE_LOCK:
+        _JSON_CACHE.pop(str(p), None)
+
+# ---- 프로세스 간 잠금 (gunicorn 여러 워커) ----
+try:
+    import fcntl
+except ImportError:   # Windows 등: 프로세스 내부 잠금만
+    fcntl = None
+
+_LOCK_LOCAL = threading.local()
+_INPROC_LOCKS = {}
+
+@contextmanager
+def _file_lock(p: Path):
+    """<파일>.lock 배타 잠금. 같은 스레드가 이미 잡고 있으면 그대로 통과(재진입)."""
+    key = str(p)
+    held = _LOCK_LOCAL.__dict__.setdefault("held", set())
+    if key in held:
+        yield
+        return
+    p.parent.mkdir(parents=True, exist_ok=True)
+    if fcntl is None:
+        with _JSON_CACHE_LOCK:
+            lk = _INPROC_LOCKS.setdefault(key, threading.Lock())
+        lk.acquire()
+        release = lk.release
+    else:
+        fh = open(key + ".lock", "a")
+        fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+        release = fh.close   # 닫으면 flock 도 풀린다
+    held.add(key)
+    try:
+        yield
+    finally:
+        held.discard(key)
+        release()
+
 def load_json(filename, default):
+    if filename in SQLITE_KV_FILES and _use_sqlite():
+        return _sql_kv_read(filename, default)
+    return _json_file_load(filename, default)
+
+def save_json(filename, data):
+    _user_ctx_drop(filename)
+    if filename in SQLITE_KV_FILES and _use_sqlite():
+        return _sql_kv_write(filename, data)
+    with _file_lock(DATA_DIR / filename):
+        _json_file_save(filename, data)
+
+def update_json(filename, fn, default=None):
+    """
+    잠금 -> 최신 내용 다시 읽기 -> fn(data) 로 제자리 수정 -> 저장 (한 덩어리).
+    fn 의 반환값을 그대로 돌려준다. fn 에서 예외가 나면 아무것도 저장하지 않는다.
+    fn 이 아무것도 안 바꿨으면(없는 사용자, 중복 등) 저장하지 않는다 -> 파일 버전이 그대로라
+    세션 사용자 재확인(_session_user_refresh), 조각 캐시, 화면 ETag 가 괜히 무효화되지 않는다.
+    """
+    if default is None:
+        default = {}
+    _user_ctx_drop(filename)
+    if filename in SQLITE_KV_FILES and _use_sqlite():
+        with _sql_tx():
+            data = _sql_kv_read(filename, default)
+            before = _json_encode(data)
+            result = fn(data)
+            if _json_encode(data) != before:
+                _sql_kv_write(filename, data)
+        return result
+    with _file_lock(DATA_DIR / filename):
+        data = _json_file_load(filename, default)
+        before = _json_encode(data)
+        result = fn(data)
+        if _json_encode(data) != before:
+            _json_file_save(filename, data)
+    return result
+
+def _user_ctx_drop(filename):
+    """users.json 을 저장하면 이 요청에 읽어 둔 로그인 사용자를 버린다(다음 조회에서 다시 읽음)"""
+    if filename == 'users.json' and has_request_context():
+        g.pop('_user', None)
+
+def _json_file_load(filename, default):
     p = DATA_DIR / filename
     try:
-        with p.open("r", encoding="utf-8-sig") as f:
-            return json.load(f)
-    except Exception:
+        st = p.stat()
+    except OSError:
         return default
+    sig = (st.st_ino, st.st_mtime_ns, st.st_size)
+    key = str(p)
 
-def save_json(filename, data):
+    with _JSON_CACHE_LOCK:
+        hit = _JSON_CACHE.get(key)
+    if hit is None or hit[0] != sig:
+        try:
+            data = _json_decode(p.read_bytes())
+        except Exception:
+            return default
+        if not isinstance(data, (dict, list)):
+            return data
+        hit = (sig, data)
+        with _JSON_CACHE_LOCK:
+            _JSON_CACHE[key] = hit
+    return _cow(hit[1])
+
+def _json_file_save(filename, data):
     p = DATA_DIR / filename
-    tmp = p.with_suffix(".tmp")
-    with tmp.open("w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    os.replace(tmp, p)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    # 쓰는 쪽마다 고유한 임시 파일 -> os.replace (고정 .tmp 이름은 워커끼리 충돌)
+    fd, tmp = tempfile.mkstemp(dir=p.parent, prefix=p.name + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_json_encode(data, pretty=not _json_compact()))
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, p)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    _json_cache_drop(p)
 
 def _to_number(x: object) -> float:
     if isinstance(x, (int, float)):
@@ -770,23 +1056,1324 @@ def job_amount(j: dict) -> float:
 app.add_template_global(job_amount, name="job_amount")
 
 # =========================================================
-# 수입/지출 IO
+# 회사별 분할 저장소 (data/<컬렉션>/<회사>.json)
 # =========================================================
+# {회사: [...]} 형태였던 통합 파일들. 회사 하나를 읽고 쓸 때 다른 회사 데이터는 건드리지 않는다.
+SHARDED_FILES = ("jobs.json", "incomes.json", "expenses_db.json", "workers.json", "machines.json")
+
+def _shard_name(company: str) -> str:
+    """회사명 -> 파일명(한글/영숫자/-/_ 유지, 나머지는 %XX 로 인코딩)"""
+    s = re.sub(r"[^\w\-]", lambda m: "".join(f"%{b:02X}" for b in m.group(0).encode("utf-8")), company or "")
+    return s or "_"
+
+def _shard_file(filename: str, company: str) -> str:
+    return f"{Path(filename).stem}/{_shard_name(company)}.json"
+
+def _shard_companies(filename: str) -> list:
+    """레거시 통합 파일 + 분할 폴더에 들어있는 회사 목록"""
+    legacy = _json_file_load(filename, {})
+    names = list(legacy.keys()) if isinstance(legacy, dict) else []
+    shard_dir = DATA_DIR / Path(filename).stem
+    if shard_dir.is_dir():
+        for f in sorted(shard_dir.glob("*.json")):
+            c = "" if f.stem == "_" else unquote(f.stem)
+            if c not in names:
+                names.append(c)
+    return names
+
+def _json_rows_read(filename: str, company: str) -> list:
+    rows = _json_file_load(_shard_file(filename, company), None)
+    if rows is None:
+        # 아직 분할 전(마이그레이션 전)이면 레거시 통합 파일에서 해당 회사만 꺼낸다
+        legacy = _json_file_load(filename, {})
+        rows = legacy.get(company, []) if isinstance(legacy, dict) else []
+    return rows if isinstance(rows, list) else []
+
+def _company_rows_read(filename: str, company: str) -> list:
+    if _use_sqlite():
+        return _sql_rows_read(filename, company)
+    return _json_rows_read(filename, company)
+
+def _company_rows_write(filename: str, company: str, rows: list):
+    if _use_sqlite():
+        return _sql_rows_write(filename, company, rows)
+    with _file_lock(DATA_DIR / _shard_file(filename, company)):
+        _json_file_save(_shard_file(filename, company), rows)
+
+def _company_rows_update(filename: str, company: str, fn):
+    """update_json 의 회사별 버전: 잠금 -> 다시 읽기 -> fn(rows) 제자리 수정 -> 저장"""
+    if _use_sqlite():
+        with _sql_tx():
+            rows = _sql_rows_read(filename, company)
+            result = fn(rows)
+            _sql_rows_write(filename, company, rows)
+        return result
+    with _file_lock(DATA_DIR / _shard_file(filename, company)):
+        rows = _json_rows_read(filename, company)
+        result = fn(rows)
+        _json_file_save(_shard_file(filename, company), rows)
+    return result
+
+def _migrate_to_shards() -> dict:
+    """레거시 통합 파일 -> 회사별 파일 (1회성). 옮긴 뒤 원본은 *.bak 로 보관"""
+    moved = {}
+    for fname in SHARDED_FILES:
+        legacy_path = DATA_DIR / fname
+        if not legacy_path.exists():
+            continue
+        db = _json_file_load(fname, {})
+        if not isinstance(db, dict):
+            continue
+        n = 0
+        for company, rows in db.items():
+            if (DATA_DIR / _shard_file(fname, company)).exists():
+                continue
+            _json_file_save(_shard_file(fname, company), rows if isinstance(rows, list) else [])
+            n += 1
+        os.replace(legacy_path, legacy_path.with_name(fname + ".bak"))
+        _json_cache_drop(legacy_path)
+        moved[fname] = n
+    return moved
+
+def jobs_read(company: str) -> list:
+    if _use_sqlite():
+        return _sql_rows_read("jobs.json", company)
+    return _cow(_jobs_state(company)["rows"])
+
+def jobs_read_keyed(company: str):
+    """
+    (작업 목록, 위치별 정렬 키) — 키는 _job_sort_ts 값('YYYY-MM-DD HH:MM', 해석 실패는 '').
+    JSON 은 보조 색인에 캐시된 값, SQLite 는 저장할 때 계산해 둔 sort_ts 컬럼이라
+    정렬할 때마다 날짜를 다시 해석하지 않는다.
+    """
+    if _use_sqlite():
+        cur = _sql().execute("SELECT data, sort_ts FROM jobs WHERE company = ? ORDER BY pos", (company,))
+        rows, keys = [], []
+        for d, ts in cur:
+            rows.append(_json_decode(d))
+            keys.append(ts)
+        return rows, keys
+    st = _jobs_state(company)
+    return _cow(st["rows"]), [f["sort_ts"] for f in _jobs_index(st)["facets"]]
+
+def jobs_write(company: str, rows: list):
+    """작업 목록 통째 저장(스냅샷). 부분 변경은 jobs_set / jobs_delete / jobs_add 를 쓴다."""
+    # id 없는 작업(예전 데이터)은 저장하면서 채운다
+    for i, j in enumerate(list.__iter__(rows)):
+        if isinstance(j, dict) and not j.get("id"):
+            rows[i]["id"] = _new_job_id()
+    with jobs_lock(company):
+        _company_rows_write("jobs.json", company, rows)
+        if not _use_sqlite():
+            _jobs_journal_clear(company)
+            with _JSON_CACHE_LOCK:
+                _JOBS_STATE.pop(company, None)
+
+@contextmanager
+def jobs_lock(company: str):
+    """읽고 -> 판단하고 -> jobs_set 하는 흐름을 다른 워커의 변경과 섞이지 않게 묶는다"""
+    if _use_sqlite():
+        with _sql_tx():
+            yield
+    else:
+        with _file_lock(DATA_DIR / _shard_file("jobs.json", company)):
+            yield
+
+@contextmanager
+def data_lock(*filenames):
+    """
+    여러 파일에 걸친 읽기-수정-쓰기(예: users.json + 회사 workers)를 한 덩어리로.
+    인자 순서대로 잠근다. 전역 순서: companies.json -> 회사별 파일 -> users.json
+    """
+    with ExitStack() as stack:
+        if _use_sqlite():
+            stack.enter_context(_sql_tx())
+        for filename in filenames:
+            stack.enter_context(_file_lock(DATA_DIR / filename))
+        yield
+
+def workers_read(company: str) -> list:
+    return _company_rows_read("workers.json", company)
+
+def workers_write(company: str, rows: list):
+    _company_rows_write("workers.json", company, rows)
+
+def workers_update(company: str, fn):
+    return _company_rows_update("workers.json", company, fn)
+
+def machines_read(company: str) -> list:
+    return _company_rows_read("machines.json", company)
+
+def machines_write(company: str, rows: list):
+    _company_rows_write("machines.json", company, rows)
+
+def machines_update(company: str, fn):
+    return _company_rows_update("machines.json", company, fn)
+
 def incomes_read(company: str) -> list:
-    return load_json("incomes.json", {}).get(company, [])
+    return _company_rows_read("incomes.json", company)
 
 def incomes_write(company: str, rows: list):
-    db = load_json("incomes.json", {})
-    db[company] = rows
-    save_json("incomes.json", db)
+    _company_rows_write("incomes.json", company, rows)
+
+def incomes_update(company: str, fn):
+    return _company_rows_update("incomes.json", company, fn)
 
 def expenses_read(company: str) -> list:
-    return load_json("expenses_db.json", {}).get(company, [])
+    return _company_rows_read("expenses_db.json", company)
 
 def expenses_write(company: str, rows: list):
-    db = load_json("expenses_db.json", {})
-    db[company] = rows
-    save_json("expenses_db.json", db)
+    _company_rows_write("expenses_db.json", company, rows)
+
+def expenses_update(company: str, fn):
+    return _company_rows_update("expenses_db.json", company, fn)
+
+# =========================================================
+# 작업 변경 저널 (data/jobs/<회사>.journal, 추가 전용)
+# =========================================================
+# 상태 토글/입금/수정/삭제 때마다 회사 작업 파일 전체를 다시 쓰지 않고
+# {"op", "i"(작업 위치), "fields", "ts", "base"} 한 줄만 덧붙이고 fsync 한다.
+# 읽을 때 스냅샷(data/jobs/<회사>.json) 위에 재생하고, 일정 개수가 쌓이면 스냅샷으로 합친다.
+# base = 기록 당시 스냅샷의 (inode, mtime_ns). 스냅샷이 새로 쓰이면 이전 줄들은 자동으로 무시된다.
+JOBS_JOURNAL_COMPACT_AT = int(os.environ.get("JOBS_JOURNAL_COMPACT_AT", "200"))
+
+_JOURNAL_CACHE = {}   # 경로 -> (stat 시그니처, [항목])
+
+def _jobs_journal_path(company: str) -> Path:
+    return DATA_DIR / "jobs" / f"{_shard_name(company)}.journal"
+
+def _jobs_snapshot_base(company: str):
+    try:
+        st = (DATA_DIR / _shard_file("jobs.json", company)).stat()
+    except OSError:
+        return None
+    return [st.st_ino, st.st_mtime_ns]
+
+def _jobs_journal_entries(company: str) -> list:
+    """현재 스냅샷에 해당하는 저널 항목들(기록 순서)"""
+    p = _jobs_journal_path(company)
+    try:
+        st = p.stat()
+    except OSError:
+        return []
+    sig = (st.st_ino, st.st_mtime_ns, st.st_size)
+    with _JSON_CACHE_LOCK:
+        hit = _JOURNAL_CACHE.get(p)
+    if hit is not None and hit[0] == sig:
+        entries = hit[1]
+    else:
+        entries = []
+        with open(p, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    break   # 쓰다 끊긴 마지막 줄(다음 기록 전에 _jobs_journal_trim 이 잘라낸다)
+                try:
+                    entries.append(_json_decode(line))
+                except ValueError:   # 중간의 깨진 줄은 그 줄만 버리고 뒤 기록은 살린다
+                    app.logger.warning("jobs journal %s: skipped a broken line", p.name)
+        with _JSON_CACHE_LOCK:
+            _JOURNAL_CACHE[p] = (sig, entries)
+    base = _jobs_snapshot_base(company)
+    return [e for e in entries if e.get("base") == base]
+
+def _jobs_journal_apply(rows: list, entries: list):
+    for e in entries:
+        op, i = e.get("op"), e.get("i")
+        if op == "set":
+            if isinstance(i, int) and 0 <= i < len(rows) and isinstance(rows[i], dict):
+                rows[i] = {**rows[i], **(e.get("fields") or {})}
+        elif op == "del":
+            if isinstance(i, int) and 0 <= i < len(rows):
+                rows.pop(i)
+        elif op == "add":
+            rows.append(dict(e.get("fields") or {}))
+
+def _jobs_journal_clear(company: str):
+    p = _jobs_journal_path(company)
+    try:
+        p.unlink()
+    except FileNotFoundError:
+        pass
+    with _JSON_CACHE_LOCK:
+        _JOURNAL_CACHE.pop(p, None)
+
+def _json_jobs_read(company: str) -> list:
+    rows = _json_rows_read("jobs.json", company)
+    entries = _jobs_journal_entries(company)
+    if entries:
+        _jobs_journal_apply(rows, entries)
+    return rows
+
+def _jobs_journal_trim(p: Path):
+    """마지막 줄이 쓰다 끊겼으면(개행으로 안 끝남) 마지막 개행까지 잘라낸다. 다음 기록이 그 조각에 붙지 않게"""
+    try:
+        f = open(p, "rb+")
+    except FileNotFoundError:
+        return
+    with f:
+        end = f.seek(0, os.SEEK_END)
+        if end == 0:
+            return
+        f.seek(end - 1)
+        if f.read(1) == b"\n":
+            return
+        pos = end
+        while pos > 0:
+            step = min(pos, 1 << 16)
+            pos -= step
+            f.seek(pos)
+            k = f.read(step).rfind(b"\n")
+            if k >= 0:
+                pos += k + 1
+                break
+        f.truncate(pos)
+        f.flush()
+        os.fsync(f.fileno())
+    app.logger.warning("jobs journal %s: dropped a torn last line (%d bytes)", p.name, end - pos)
+
+def _jobs_journal_append(company: str, ops: list):
+    """ops: [(op, 위치, fields)] -> 저널에 덧붙이고 fsync. 쌓이면 스냅샷으로 압축."""
+    if not ops:
+        return
+    with jobs_lock(company):
+        if _jobs_snapshot_base(company) is None:
+            # 레거시 통합 파일에만 있는 회사면 스냅샷부터 만든다
+            jobs_write(company, _json_jobs_read(company))
+        st = _jobs_state(company)
+        base, ts = _jobs_snapshot_base(company), _now_str()
+        entries = []
+        for op, i, fields in ops:
+            e = {"op": op, "i": i, "fields": fields, "ts": ts, "base": base}
+            if op == "add":
+                e["id"] = fields.get("id")
+            elif isinstance(i, int) and 0 <= i < len(st["rows"]):
+                e["id"] = st["rows"][i].get("id")
+            entries.append(e)
+        _jobs_journal_trim(_jobs_journal_path(company))
+        with open(_jobs_journal_path(company), "a", encoding="utf-8") as f:
+            f.write("".join(_json_text(e) + "\n" for e in entries))
+            f.flush()
+            os.fsync(f.fileno())
+        if len(_jobs_journal_entries(company)) >= JOBS_JOURNAL_COMPACT_AT:
+            jobs_write(company, _json_jobs_read(company))
+        else:
+            _jobs_state_advance(company, st, entries)
+
+def jobs_set(company: str, changes: dict):
+    """changes: {작업 위치: {필드: 값}}"""
+    changes = {i: dict(f) for i, f in changes.items() if f}
+    if not changes:
+        return
+    if _use_sqlite():
+        return _sql_jobs_set(company, changes)
+    _jobs_journal_append(company, [("set", i, f) for i, f in changes.items()])
+
+def jobs_delete(company: str, indices):
+    """위치 목록의 작업 삭제(뒤에서부터 지워 앞쪽 위치가 밀리지 않게)"""
+    order = sorted(set(indices), reverse=True)
+    if not order:
+        return
+    if _use_sqlite():
+        return _sql_jobs_delete(company, order)
+    _jobs_journal_append(company, [("del", i, None) for i in order])
+
+def jobs_add(company: str, job: dict) -> str:
+    """작업 추가. 새 작업의 id 를 돌려준다."""
+    job = {k: v for k, v in job.items() if not k.startswith("_")}
+    if not job.get("id"):
+        job["id"] = _new_job_id()
+    if _use_sqlite():
+        _sql_jobs_add(company, job)
+    else:
+        _jobs_journal_append(company, [("add", None, job)])
+    return job["id"]
+
+# =========================================================
+# 작업 id / 현재 작업 목록 캐시 (id -> 위치 색인)
+# =========================================================
+# 작업마다 바뀌지 않는 "id" 를 두고, 라우트는 목록 위치 대신 id 로 작업을 가리킨다.
+# JSON 백엔드: 스냅샷 + 저널을 재생한 결과를 버전(stat)별로 한 번만 만들어 두고
+# (_JOBS_STATE), 이 프로세스에서 저널을 덧붙일 때는 재생 없이 바로 갱신한다.
+# 캐시된 레코드는 읽기 전용 — 바꿀 때는 새 dict 로 교체한다.
+_JOBS_STATE = {}   # 회사 -> {"ver", "rows", "by_id", "ix"(보조 색인, 처음 조회할 때 생성)}
+
+def _new_job_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+def _jobs_version(company: str) -> tuple:
+    paths = [DATA_DIR / _shard_file("jobs.json", company), _jobs_journal_path(company)]
+    out = []
+    for p in paths:
+        try:
+            st = p.stat()
+            out.append((st.st_ino, st.st_mtime_ns, st.st_size))
+        except OSError:
+            out.append(None)
+    if out[0] is None:
+        # 아직 분할 전이면 레거시 통합 파일 기준
+        try:
+            st = (DATA_DIR / "jobs.json").stat()
+            out.append((st.st_ino, st.st_mtime_ns, st.st_size))
+        except OSError:
+            out.append(None)
+    return tuple(out)
+
+def _jobs_by_id(rows: list) -> dict:
+    return {j["id"]: i for i, j in enumerate(rows) if isinstance(j, dict) and j.get("id")}
+
+def _jobs_state(company: str) -> dict:
+    ver = _jobs_version(company)
+    with _JSON_CACHE_LOCK:
+        st = _JOBS_STATE.get(company)
+    if st is not None and st["ver"] == ver:
+        return st
+    rows = list.copy(_json_jobs_read(company))
+    st = {"ver": ver, "rows": rows, "by_id": _jobs_by_id(rows)}
+    with _JSON_CACHE_LOCK:
+        _JOBS_STATE[company] = st
+    return st
+
+def _jobs_state_advance(company: str, st: dict, entries: list):
+    """방금 덧붙인 저널 항목을 캐시에 반영(jobs_lock 안에서 호출)"""
+    rows = list(st["rows"])
+    _jobs_journal_apply(rows, entries)
+    ix = st.get("ix")
+    if any(e["op"] == "del" for e in entries):
+        by_id, ix = _jobs_by_id(rows), None
+    else:
+        by_id = dict(st["by_id"])
+        for k in range(len(st["rows"]), len(rows)):
+            if rows[k].get("id"):
+                by_id[rows[k]["id"]] = k
+        if ix is not None:
+            ix = _jobs_index_advance(ix, rows, entries)
+    new = {"ver": _jobs_version(company), "rows": rows, "by_id": by_id}
+    if ix is not None:
+        new["ix"] = ix
+    with _JSON_CACHE_LOCK:
+        _JOBS_STATE[company] = new
+
+def job_lookup(company: str, ref):
+    """
+    작업 id(예전 링크면 목록 위치 숫자) -> (현재 위치, 작업). 없으면 (None, None).
+    위치는 바로 다음 jobs_set/jobs_delete 에 쓰므로, 바꾸는 흐름은 jobs_lock 안에서 찾는다.
+    """
+    ref = str(ref if ref is not None else "").strip()
+    if not ref:
+        return None, None
+    if _use_sqlite():
+        return _sql_job_lookup(company, ref)
+    st = _jobs_state(company)
+    pos = st["by_id"].get(ref)
+    # 위치 숫자는 id 가 아직 없는 행에만(id 가 있는 행을 위치로 찾으면 삭제 뒤 밀린 다른 작업을 집는다)
+    if pos is None and ref.isdigit() and int(ref) < len(st["rows"]) and not st["rows"][int(ref)].get("id"):
+        pos = int(ref)
+    if pos is None:
+        return None, None
+    return pos, _cow(st["rows"][pos])
+
+def jobs_positions(company: str, refs) -> list:
+    """id/위치 목록 -> 현재 위치 목록(요청 순서 유지, 중복·없는 항목 제외)"""
+    out, seen = [], set()
+    for ref in refs:
+        pos, _ = job_lookup(company, ref)
+        if pos is not None and pos not in seen:
+            seen.add(pos)
+            out.append(pos)
+    return out
+
+def _jobs_companies() -> list:
+    if _use_sqlite():
+        return [c for (c,) in _sql().execute("SELECT DISTINCT company FROM jobs")]
+    return _shard_companies("jobs.json")
+
+def _backfill_job_ids() -> dict:
+    """id 없는 작업에 id 부여(1회성). 회사별 부여 건수"""
+    counts = {}
+    for company in _jobs_companies():
+        with jobs_lock(company):
+            rows = jobs_read(company)
+            n = sum(1 for j in list.__iter__(rows) if isinstance(j, dict) and not j.get("id"))
+            if n:
+                jobs_write(company, rows)
+        counts[company] = n
+    return counts
+
+# =========================================================
+# SQLite 저장소 (STORAGE_BACKEND=sqlite, WAL 모드)
+# =========================================================
+import sqlite3
+
+# {키: 값} 통째로 다루는 파일들 -> kv 테이블
+SQLITE_KV_FILES = ("users.json", "partners.json", "documents.json")
+
+_SQL_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    file TEXT NOT NULL, key TEXT NOT NULL, data TEXT NOT NULL,
+    PRIMARY KEY (file, key)
+);
+CREATE TABLE IF NOT EXISTS rows (
+    file TEXT NOT NULL, company TEXT NOT NULL, pos INTEGER NOT NULL, data TEXT NOT NULL,
+    PRIMARY KEY (file, company, pos)
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    company TEXT NOT NULL, pos INTEGER NOT NULL,
+    date_raw TEXT NOT NULL, day TEXT NOT NULL, sort_ts TEXT NOT NULL,
+    worker TEXT NOT NULL, worker_any TEXT NOT NULL, plate TEXT NOT NULL,
+    owner TEXT NOT NULL, owner_lc TEXT NOT NULL, tenant TEXT NOT NULL, tenant_lc TEXT NOT NULL,
+    done INTEGER NOT NULL, amount_man INTEGER NOT NULL, paid_man INTEGER NOT NULL,
+    pay_color TEXT NOT NULL, is_spare INTEGER NOT NULL, outsource_type TEXT NOT NULL,
+    sales_won INTEGER NOT NULL DEFAULT 0, due_won INTEGER NOT NULL DEFAULT 0,
+    amount_won INTEGER NOT NULL DEFAULT 0,
+    job_id TEXT NOT NULL DEFAULT '',
+    data TEXT NOT NULL,
+    PRIMARY KEY (company, pos)
+);
+-- 회사별 파일의 변경 번호(쓸 때마다 +1). 캐시가 "데이터가 바뀌었나"를 묻는 데 쓴다
+CREATE TABLE IF NOT EXISTS revs (
+    file TEXT NOT NULL, company TEXT NOT NULL, rev INTEGER NOT NULL,
+    PRIMARY KEY (file, company)
+);
+CREATE INDEX IF NOT EXISTS jobs_day    ON jobs(company, day);
+CREATE INDEX IF NOT EXISTS jobs_sort   ON jobs(company, sort_ts, pos);
+CREATE INDEX IF NOT EXISTS jobs_worker ON jobs(company, worker);
+CREATE INDEX IF NOT EXISTS jobs_owner  ON jobs(company, owner_lc);
+CREATE INDEX IF NOT EXISTS jobs_tenant ON jobs(company, tenant_lc);
+CREATE INDEX IF NOT EXISTS jobs_state  ON jobs(company, done, pay_color);
+"""
+
+# 스키마가 생긴 뒤에 추가된 컬럼들 (기존 DB 파일용). 채우는 식이 None 이면 facets 로 다시 계산
+_SQL_ADDED_COLS = {
+    "jobs": [("job_id", "TEXT NOT NULL DEFAULT ''", "json_extract(data, '$.id')"),
+             ("sales_won", "INTEGER NOT NULL DEFAULT 0", None),
+             ("due_won", "INTEGER NOT NULL DEFAULT 0", None),
+             ("amount_won", "INTEGER NOT NULL DEFAULT 0", None)],
+}
+
+def _sql_migrate(conn):
+    for table, cols in _SQL_ADDED_COLS.items():
+        have = {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
+        refill = []
+        for name, decl, fill in cols:
+            if name not in have:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+                if fill is None:
+                    refill.append(name)
+                else:
+                    conn.execute(f"UPDATE {table} SET {name} = COALESCE({fill}, '')")
+        if refill:
+            rows = conn.execute(f"SELECT company, pos, data FROM {table}").fetchall()
+            for company, pos, d in rows:
+                f = _job_facets(_json_decode(d))
+                conn.execute(f"UPDATE {table} SET {', '.join(c + ' = ?' for c in refill)} "
+                             "WHERE company = ? AND pos = ?", (*(f[c] for c in refill), company, pos))
+    conn.execute("CREATE INDEX IF NOT EXISTS jobs_id ON jobs(company, job_id)")
+
+_JOB_COLS = ("date_raw", "day", "sort_ts", "worker", "worker_any", "plate",
+             "owner", "owner_lc", "tenant", "tenant_lc",
+             "done", "amount_man", "paid_man", "pay_color", "is_spare", "outsource_type",
+             "sales_won", "due_won", "amount_won")
+
+_SQL_LOCAL = threading.local()
+
+def _storage_backend():
+    return (os.environ.get("STORAGE_BACKEND") or "json").strip().lower()
+
+def _use_sqlite() -> bool:
+    return _storage_backend() == "sqlite"
+
+def _sqlite_path() -> str:
+    return os.environ.get("SQLITE_PATH") or str(DATA_DIR / "crane.sqlite3")
+
+def _sql():
+    """스레드별 커넥션(autocommit, 쓰기는 _sql_tx 로 묶는다)"""
+    conn = getattr(_SQL_LOCAL, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(_sqlite_path(), timeout=30, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SQL_SCHEMA)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            _sql_migrate(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        _SQL_LOCAL.conn = conn
+    return conn
+
+@contextmanager
+def _sql_tx():
+    conn = _sql()
+    if conn.in_transaction:   # 바깥 트랜잭션(update_json 등)에 합류
+        yield conn
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+def _sql_kv_read(filename: str, default):
+    cur = _sql().execute("SELECT key, data FROM kv WHERE file = ?", (filename,))
+    out = {k: _json_decode(d) for k, d in cur}
+    return out if out else default
+
+def _sql_kv_write(filename: str, data: dict):
+    with _sql_tx() as conn:
+        conn.execute("DELETE FROM kv WHERE file = ?", (filename,))
+        conn.executemany(
+            "INSERT INTO kv(file, key, data) VALUES (?, ?, ?)",
+            [(filename, k, _json_text(v)) for k, v in (data or {}).items()],
+        )
+        _sql_bump(conn, filename, "")
+
+def _sql_kv_get(filename: str, key: str, default=None):
+    row = _sql().execute("SELECT data FROM kv WHERE file = ? AND key = ?", (filename, key)).fetchone()
+    return _json_decode(row[0]) if row else default
+
+def _sql_rows_read(filename: str, company: str) -> list:
+    table = "jobs" if filename == "jobs.json" else "rows"
+    if table == "jobs":
+        cur = _sql().execute("SELECT data FROM jobs WHERE company = ? ORDER BY pos", (company,))
+    else:
+        cur = _sql().execute("SELECT data FROM rows WHERE file = ? AND company = ? ORDER BY pos",
+                             (filename, company))
+    return [_json_decode(d) for (d,) in cur]
+
+def _sql_bump(conn, filename: str, company: str):
+    conn.execute("INSERT INTO revs(file, company, rev) VALUES (?, ?, 1) "
+                 "ON CONFLICT(file, company) DO UPDATE SET rev = rev + 1", (filename, company))
+
+def _sql_rev(filename: str, company: str) -> int:
+    row = _sql().execute("SELECT rev FROM revs WHERE file = ? AND company = ?", (filename, company)).fetchone()
+    return row[0] if row else 0
+
+def _sql_rows_write(filename: str, company: str, rows: list):
+    with _sql_tx() as conn:
+        _sql_bump(conn, filename, company)
+        if filename == "jobs.json":
+            conn.execute("DELETE FROM jobs WHERE company = ?", (company,))
+            conn.executemany(_SQL_JOB_INSERT, [_sql_job_row(company, i, j) for i, j in enumerate(rows)])
+        else:
+            conn.execute("DELETE FROM rows WHERE file = ? AND company = ?", (filename, company))
+            conn.executemany(
+                "INSERT INTO rows(file, company, pos, data) VALUES (?, ?, ?, ?)",
+                [(filename, company, i, _json_text(r)) for i, r in enumerate(rows)],
+            )
+
+def _sql_job_row(company: str, pos: int, j: dict) -> tuple:
+    f = _job_facets(j)
+    data = {k: v for k, v in j.items() if not k.startswith("_")}
+    return (company, pos, *(f[c] for c in _JOB_COLS), str(j.get("id") or ""), _json_text(data))
+
+_SQL_JOB_INSERT = (f"INSERT INTO jobs(company, pos, {', '.join(_JOB_COLS)}, job_id, data) "
+                   f"VALUES ({', '.join('?' * (len(_JOB_COLS) + 4))})")
+
+def _sql_jobs_set(company: str, changes: dict):
+    with _sql_tx() as conn:
+        _sql_bump(conn, "jobs.json", company)
+        for pos, fields in changes.items():
+            row = conn.execute("SELECT data FROM jobs WHERE company = ? AND pos = ?", (company, pos)).fetchone()
+            if row is None:
+                continue
+            j = _json_decode(row[0])
+            j.update(fields)
+            conn.execute(
+                f"UPDATE jobs SET {', '.join(c + ' = ?' for c in _JOB_COLS)}, job_id = ?, data = ? "
+                "WHERE company = ? AND pos = ?",
+                (*_sql_job_row(company, pos, j)[2:], company, pos),
+            )
+
+def _sql_jobs_delete(company: str, order: list):
+    with _sql_tx() as conn:
+        _sql_bump(conn, "jobs.json", company)
+        for pos in order:
+            if conn.execute("DELETE FROM jobs WHERE company = ? AND pos = ?", (company, pos)).rowcount:
+                # 뒤쪽 위치를 하나씩 당긴다(PK 충돌을 피하려고 음수로 한 번 거친다)
+                conn.execute("UPDATE jobs SET pos = -pos WHERE company = ? AND pos > ?", (company, pos))
+                conn.execute("UPDATE jobs SET pos = -pos - 1 WHERE company = ? AND pos < 0", (company,))
+
+def _sql_jobs_add(company: str, job: dict):
+    with _sql_tx() as conn:
+        _sql_bump(conn, "jobs.json", company)
+        (pos,) = conn.execute("SELECT COALESCE(MAX(pos) + 1, 0) FROM jobs WHERE company = ?", (company,)).fetchone()
+        conn.execute(_SQL_JOB_INSERT, _sql_job_row(company, pos, job))
+
+def _sql_job_lookup(company: str, ref: str):
+    conn = _sql()
+    row = conn.execute("SELECT pos, data FROM jobs WHERE company = ? AND job_id = ?", (company, ref)).fetchone()
+    if row is None and ref.isdigit():
+        row = conn.execute("SELECT pos, data FROM jobs WHERE company = ? AND pos = ? AND COALESCE(job_id, '') = ''",
+                           (company, int(ref))).fetchone()
+    if row is None:
+        return None, None
+    return row[0], _json_decode(row[1])
+
+def _sqlite_row_count() -> int:
+    conn = _sql()
+    return sum(conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in ("kv", "rows", "jobs"))
+
+def _sqlite_import_json(force: bool = False) -> dict:
+    """
+    data/*.json (레거시 통합 파일 + 회사별 분할 파일) -> SQLite (기존 내용은 덮어씀).
+    SQLite 로 운영을 시작한 뒤의 JSON 은 낡은 사본이라, DB 에 이미 데이터가 있으면 force 없이는 하지 않는다.
+    """
+    if not force and _sqlite_row_count():
+        raise RuntimeError(f"{_sqlite_path()} 에 이미 데이터가 있습니다. 덮어쓰려면 --force")
+    counts = {}
+    for fname in SQLITE_KV_FILES:
+        db = _json_file_load(fname, {})
+        if isinstance(db, dict):
+            _sql_kv_write(fname, db)
+            counts[fname] = len(db)
+    for fname in SHARDED_FILES:
+        n = 0
+        for company in _shard_companies(fname):
+            rows = _json_jobs_read(company) if fname == "jobs.json" else _json_rows_read(fname, company)
+            _sql_rows_write(fname, company, rows)
+            n += len(rows)
+        counts[fname] = n
+    return counts
+
+def _sql_jobs_where(company: str, flt: dict):
+    where, args = ["company = ?"], [company]
+    if flt.get("worker"):
+        where.append("worker = ?"); args.append(flt["worker"])
+    if flt.get("worker_has"):
+        where.append("instr(worker_any, ?) > 0"); args.append(flt["worker_has"])
+    if flt.get("plate_has"):
+        where.append("instr(plate, ?) > 0"); args.append(flt["plate_has"])
+    for col in ("owner", "tenant"):
+        if flt.get(col + "_ci"):
+            where.append(f"instr({col}_lc, ?) > 0"); args.append(flt[col + "_ci"].lower())
+        if flt.get(col + "_has"):
+            where.append(f"instr({col}, ?) > 0"); args.append(flt[col + "_has"])
+    if flt.get("date_from") or flt.get("date_to"):
+        where.append("date_raw != ''")
+        if flt.get("date_from"):
+            where.append("date_raw >= ?"); args.append(flt["date_from"])
+        if flt.get("date_to"):
+            where.append("date_raw <= ?"); args.append(flt["date_to"])
+    elif flt.get("date"):
+        where.append("date_raw = ?"); args.append(flt["date"])
+    if flt.get("day_from") or flt.get("day_to") or flt.get("half"):
+        where.append("day != ''")
+        if flt.get("day_from"):
+            where.append("day >= ?"); args.append(flt["day_from"])
+        if flt.get("day_to"):
+            where.append("day <= ?"); args.append(flt["day_to"])
+        if flt.get("half") == "H12":
+            where.append("substr(day, 6, 2) <= '06'")
+        elif flt.get("half") == "H34":
+            where.append("substr(day, 6, 2) >= '07'")
+    if flt.get("status") == "pending":
+        where.append("done = 0")
+    elif flt.get("status") == "done":
+        where.append("done = 1")
+    if flt.get("pay") == "unpaid":
+        where.append("amount_man > 0 AND paid_man < amount_man")
+    elif flt.get("pay") == "paid":
+        where.append("amount_man > 0 AND paid_man >= amount_man")
+    if flt.get("colors"):
+        where.append(f"pay_color IN ({', '.join('?' * len(flt['colors']))})"); args.extend(flt["colors"])
+    if flt.get("spare"):
+        where.append("is_spare = 1")
+    if flt.get("outsrc"):
+        where.append("outsource_type != 'none'")
+    if flt.get("no_outsrc"):
+        where.append("outsource_type NOT IN ('received', 'given')")
+    return " AND ".join(where), args
+
+def _sql_jobs_query(company: str, flt: dict) -> list:
+    where, args = _sql_jobs_where(company, flt)
+    cur = _sql().execute(f"SELECT pos, data FROM jobs WHERE {where} ORDER BY sort_ts DESC, pos DESC", args)
+    out = []
+    for pos, d in cur:
+        j = _json_decode(d)
+        j["_idx"] = pos
+        out.append(j)
+    return out
+
+def _sql_jobs_match(company: str, flt: dict) -> list:
+    where, args = _sql_jobs_where(company, flt)
+    cur = _sql().execute(f"SELECT pos, job_id FROM jobs WHERE {where} ORDER BY sort_ts DESC, pos DESC", args)
+    return [(pos, jid) for pos, jid in cur]
+
+def _sql_jobs_at(company: str, positions: list) -> list:
+    found = {}
+    conn = _sql()
+    for k in range(0, len(positions), 500):
+        chunk = positions[k:k + 500]
+        cur = conn.execute(
+            f"SELECT pos, data FROM jobs WHERE company = ? AND pos IN ({', '.join('?' * len(chunk))})",
+            [company, *chunk])
+        for pos, d in cur:
+            found[pos] = _json_decode(d)
+    out = []
+    for pos in positions:
+        if pos in found:
+            j = found[pos]
+            j["_idx"] = pos
+            out.append(j)
+    return out
+
+# =========================================================
+# 작업 조회(필터/정렬) — view_jobs / finance 공용
+# =========================================================
+_SORT_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}", re.ASCII)
+_SORT_TIME_RE = re.compile(r"([01]\d|2[0-3]):[0-5]\d", re.ASCII)
+
+def _job_sort_ts(j: dict) -> str:
+    """정렬용 'YYYY-MM-DD HH:MM' (날짜 해석 실패 시 '' = 가장 오래된 것으로 취급)"""
+    d = (j.get('date') or '').strip()
+    t = (j.get('time') or '').strip() or "00:00"
+    if _SORT_DATE_RE.fullmatch(d) and _SORT_TIME_RE.fullmatch(t):
+        # 흔한 표준 형식은 strptime 없이 (날짜 유효성만 확인)
+        try:
+            date.fromisoformat(d)
+            return f"{d} {t}"
+        except ValueError:
+            return ""
+    try:
+        return _dt.datetime.strptime(f"{d} {t}", "%Y-%m-%d %H:%M").strftime("%Y-%m-%d %H:%M")
+    except Exception:
+        try:
+            return _dt.datetime.strptime(d, "%Y-%m-%d").strftime("%Y-%m-%d %H:%M")
+        except Exception:
+            return ""
+
+def _job_facets(j: dict) -> dict:
+    """필터/정렬에 쓰는 파생값(SQLite 인덱스 컬럼과 동일)"""
+    def _int(x):
+        try: return int(x)
+        except Exception: return 0
+    day = _parse_date_safe(j.get("date"))
+    owner  = j.get("client_primary") or j.get("client") or ""
+    tenant = j.get("client_tenant") or ""
+    amt, paid = _amount_won(j), _paid_won(j)
+    done = int((j.get("status") or "").strip() == "완료")
+    otype = j.get("outsource_type") or "none"
+    return {
+        "date_raw": (j.get("date") or "").strip(),
+        "day": day.isoformat() if day else "",
+        "sort_ts": _job_sort_ts(j),
+        "worker": j.get("worker") or "",
+        "worker_any": j.get("worker") or j.get("driver") or "",
+        "plate": j.get("machine_number") or j.get("plate") or "",
+        "owner": owner, "owner_lc": owner.lower(),
+        "tenant": tenant, "tenant_lc": tenant.lower(),
+        "done": done,
+        "amount_man": _int(j.get("amount_man")),
+        "paid_man": _int(j.get("paid_amount_man")),
+        "pay_color": _color_by_payment(amt, paid, j.get("payment_status") or ""),
+        "is_spare": int(bool(j.get("is_spare"))),
+        "outsource_type": otype,
+        # 재무 카드용: 완납된 완료 작업 매출(외주받음 제외) / 미수
+        "sales_won": amt if (done and otype != "received" and amt > 0 and paid >= amt) else 0,
+        "due_won": max(0, amt - min(amt, paid)),
+        "amount_won": amt,
+    }
+
+def _job_facets_match(f: dict, flt: dict) -> bool:
+    if flt.get("worker") and f["worker"] != flt["worker"]: return False
+    if flt.get("worker_has") and flt["worker_has"] not in f["worker_any"]: return False
+    if flt.get("plate_has") and flt["plate_has"] not in f["plate"]: return False
+    for col in ("owner", "tenant"):
+        if flt.get(col + "_ci") and flt[col + "_ci"].lower() not in f[col + "_lc"]: return False
+        if flt.get(col + "_has") and flt[col + "_has"] not in f[col]: return False
+    if flt.get("date_from") or flt.get("date_to"):
+        d = f["date_raw"]
+        if not d: return False
+        if flt.get("date_from") and d < flt["date_from"]: return False
+        if flt.get("date_to") and d > flt["date_to"]: return False
+    elif flt.get("date") and f["date_raw"] != flt["date"]:
+        return False
+    if flt.get("day_from") or flt.get("day_to") or flt.get("half"):
+        d = f["day"]
+        if not d: return False
+        if flt.get("day_from") and d < flt["day_from"]: return False
+        if flt.get("day_to") and d > flt["day_to"]: return False
+        if flt.get("half") == "H12" and d[5:7] > "06": return False
+        if flt.get("half") == "H34" and d[5:7] < "07": return False
+    if flt.get("status") == "pending" and f["done"]: return False
+    if flt.get("status") == "done" and not f["done"]: return False
+    if flt.get("pay") == "unpaid" and not (f["amount_man"] > 0 and f["paid_man"] < f["amount_man"]): return False
+    if flt.get("pay") == "paid" and not (f["amount_man"] > 0 and f["paid_man"] >= f["amount_man"]): return False
+    if flt.get("colors") and f["pay_color"] not in flt["colors"]: return False
+    if flt.get("spare") and not f["is_spare"]: return False
+    if flt.get("outsrc") and f["outsource_type"] == "none": return False
+    if flt.get("no_outsrc") and f["outsource_type"] in ("received", "given"): return False
+    return True
+
+# ---------- 보조 색인 (JSON 백엔드, _JOBS_STATE 에 붙어 다님) ----------
+# 기사(정확히 일치) / 원수급자·임차인(소문자 값별 위치 목록) / 날짜(정렬 배열, bisect) 로
+# 후보 위치를 좁히고, 남은 조건만 미리 계산해 둔 facets 로 확인한다.
+# 저널 set/add 는 바뀐 위치만 고쳐 넣고, del(위치가 당겨짐)은 다음 조회 때 다시 만든다.
+# 색인도 읽기 전용 — 고칠 때는 바뀌는 컨테이너만 복사해 새 색인을 만든다.
+import bisect
+
+# 색인으로 정확히 걸러지지 않아 facets 로 다시 확인해야 하는 조건
+_JOBS_INDEX_RESIDUAL = ("worker_has", "plate_has", "owner_has", "tenant_has", "half",
+                        "status", "pay", "colors", "spare", "outsrc", "no_outsrc")
+
+# 월별 집계 차원: (이름, facets 컬럼). "total" 은 이름 없이 달마다 한 줄
+_FIN_MONTHLY_DIMS = (("total", None), ("worker", "worker_any"), ("machine", "plate"),
+                     ("owner", "owner"), ("tenant", "tenant"))
+
+def _fin_monthly_keys(f: dict):
+    """작업 facets -> 월별 집계 키들 (외주 작업·날짜 없는 작업은 없음)"""
+    if not f["day"] or f["outsource_type"] in ("received", "given"):
+        return ()
+    m = f["day"][:7]
+    return [(m, dim, f[col] if col else "") for dim, col in _FIN_MONTHLY_DIMS]
+
+def _jobs_index_money(ix: dict, pos: int, f: dict, sign: int):
+    """일별 매출/미수, 월별 집계, 외주 작업 위치에 작업 하나를 더하거나(sign=1) 뺀다(-1)"""
+    if f["day"]:
+        s, u = ix["daysum"].get(f["day"], (0, 0))
+        s, u = s + sign * f["sales_won"], u + sign * f["due_won"]
+        if s or u:
+            ix["daysum"][f["day"]] = (s, u)
+        else:
+            ix["daysum"].pop(f["day"], None)
+    for key in _fin_monthly_keys(f):
+        c, a, s, u = ix["monthly"].get(key, (0, 0, 0, 0))
+        c += sign
+        if c:
+            ix["monthly"][key] = (c, a + sign * f["amount_won"], s + sign * f["sales_won"],
+                                  u + sign * f["due_won"])
+        else:
+            ix["monthly"].pop(key, None)
+    if f["outsource_type"].lower() not in ("", "none"):
+        (ix["outsrc"].add if sign > 0 else ix["outsrc"].discard)(pos)
+
+def _jobs_index_put(ix: dict, pos: int, f: dict):
+    _jobs_index_money(ix, pos, f, 1)
+    ix["worker"].setdefault(f["worker"], set()).add(pos)
+    ix["owner"].setdefault(f["owner_lc"], set()).add(pos)
+    ix["tenant"].setdefault(f["tenant_lc"], set()).add(pos)
+    bisect.insort(ix["order"], (f["sort_ts"], pos))
+    if f["date_raw"]:
+        bisect.insort(ix["dates"], (f["date_raw"], pos))
+    if f["day"]:
+        bisect.insort(ix["days"], (f["day"], pos))
+
+def _jobs_index_drop(ix: dict, pos: int, f: dict):
+    _jobs_index_money(ix, pos, f, -1)
+    for name, key in (("worker", f["worker"]), ("owner", f["owner_lc"]), ("tenant", f["tenant_lc"])):
+        bucket = ix[name].get(key)
+        if bucket is not None:
+            bucket.discard(pos)
+            if not bucket:
+                del ix[name][key]
+    for name, key in (("order", f["sort_ts"]), ("dates", f["date_raw"]), ("days", f["day"])):
+        arr = ix[name]
+        k = bisect.bisect_left(arr, (key, pos))
+        if k < len(arr) and arr[k] == (key, pos):
+            del arr[k]
+
+def _jobs_index_build(rows: list) -> dict:
+    facets = [_job_facets(j) for j in rows]
+    ix = {"facets": facets, "worker": {}, "owner": {}, "tenant": {}, "daysum": {}, "monthly": {},
+          "outsrc": set()}
+    for pos, f in enumerate(facets):
+        _jobs_index_money(ix, pos, f, 1)
+        ix["worker"].setdefault(f["worker"], set()).add(pos)
+        ix["owner"].setdefault(f["owner_lc"], set()).add(pos)
+        ix["tenant"].setdefault(f["tenant_lc"], set()).add(pos)
+    ix["order"] = sorted((f["sort_ts"], pos) for pos, f in enumerate(facets))
+    ix["dates"] = sorted((f["date_raw"], pos) for pos, f in enumerate(facets) if f["date_raw"])
+    ix["days"] = sorted((f["day"], pos) for pos, f in enumerate(facets) if f["day"])
+    return ix
+
+def _jobs_index(st: dict) -> dict:
+    ix = st.get("ix")
+    if ix is None:
+        ix = st["ix"] = _jobs_index_build(st["rows"])
+    return ix
+
+def _jobs_index_advance(ix: dict, rows: list, entries: list) -> dict:
+    """저널 set/add 항목만큼 고친 새 색인(del 이 섞이면 호출하지 않는다)"""
+    n = len(ix["facets"])
+    touched = {e["i"] for e in entries if e["op"] == "set" and isinstance(e.get("i"), int) and 0 <= e["i"] < n}
+    added = range(n, len(rows))
+    new = {"facets": list(ix["facets"]), "order": list(ix["order"]),
+           "dates": list(ix["dates"]), "days": list(ix["days"]),
+           "daysum": dict(ix["daysum"]), "monthly": dict(ix["monthly"]), "outsrc": set(ix["outsrc"])}
+    old_f = {pos: new["facets"][pos] for pos in touched}
+    fresh = {pos: _job_facets(rows[pos]) for pos in [*touched, *added]}
+    for name, col in (("worker", "worker"), ("owner", "owner_lc"), ("tenant", "tenant_lc")):
+        d = dict(ix[name])
+        for key in {f[col] for f in [*old_f.values(), *fresh.values()]}:
+            if key in d:
+                d[key] = set(d[key])
+        new[name] = d
+    for pos, f in old_f.items():
+        _jobs_index_drop(new, pos, f)
+    for pos in added:
+        new["facets"].append(None)
+    for pos, f in fresh.items():
+        new["facets"][pos] = f
+        _jobs_index_put(new, pos, f)
+    return new
+
+def _jobs_index_range(arr: list, lo: str, hi: str) -> set:
+    """정렬 배열 (값, 위치) 에서 lo <= 값 <= hi 인 위치들('' 이면 그쪽 끝 제한 없음)"""
+    a = bisect.bisect_left(arr, (lo, -1)) if lo else 0
+    b = bisect.bisect_right(arr, (hi, float("inf"))) if hi else len(arr)
+    return {pos for _, pos in arr[a:b]}
+
+def _jobs_index_candidates(ix: dict, flt: dict):
+    """색인으로 좁힌 후보 위치 집합(색인으로 거를 조건이 없으면 None)"""
+    cands = []
+    if flt.get("worker"):
+        cands.append(ix["worker"].get(flt["worker"], set()))
+    for col in ("owner", "tenant"):
+        q = (flt.get(col + "_ci") or flt.get(col + "_has") or "").lower()
+        if q:
+            cands.append(set().union(*[ps for key, ps in ix[col].items() if q in key]))
+    if flt.get("date_from") or flt.get("date_to"):
+        cands.append(_jobs_index_range(ix["dates"], flt.get("date_from") or "", flt.get("date_to") or ""))
+    elif flt.get("date"):
+        cands.append(_jobs_index_range(ix["dates"], flt["date"], flt["date"]))
+    if flt.get("day_from") or flt.get("day_to"):
+        cands.append(_jobs_index_range(ix["days"], flt.get("day_from") or "", flt.get("day_to") or ""))
+    if not cands:
+        return None
+    cands.sort(key=len)
+    return set(cands[0]).intersection(*cands[1:])
+
+def _jobs_index_scan(ix: dict, flt: dict, anchor=None, backward=False, limit=None) -> list:
+    """
+    조건에 맞는 (정렬 키, 위치) 를 최신순으로. anchor=(정렬 키, 위치) 가 있으면 그보다 오래된 것부터
+    (backward 면 그보다 최신인 것을 오래된 쪽부터), limit 개를 채우면 멈춘다.
+    """
+    facets, order = ix["facets"], ix["order"]
+    hit = _jobs_index_candidates(ix, flt)
+    if hit is not None and len(hit) * 8 < len(order):
+        # 후보가 적으면 후보끼리만 정렬
+        keys = sorted((facets[p]["sort_ts"], p) for p in hit)
+        hit = None
+    else:
+        keys = order
+    if backward:
+        a = bisect.bisect_right(keys, anchor) if anchor else len(keys)
+        seq = (keys[k] for k in range(a, len(keys)))
+    else:
+        b = bisect.bisect_left(keys, anchor) if anchor else len(keys)
+        seq = (keys[k] for k in range(b - 1, -1, -1))
+    residual = any(flt.get(k) for k in _JOBS_INDEX_RESIDUAL)
+    out = []
+    for key in seq:
+        if hit is not None and key[1] not in hit:
+            continue
+        if residual and not _job_facets_match(facets[key[1]], flt):
+            continue
+        out.append(key)
+        if limit is not None and len(out) >= limit:
+            break
+    return out
+
+def _jobs_index_search(ix: dict, flt: dict) -> list:
+    """조건에 맞는 위치를 최신순으로"""
+    return [pos for _, pos in _jobs_index_scan(ix, flt)]
+
+def jobs_query(company: str, flt: dict) -> list:
+    """
+    회사 작업 중 flt 조건에 맞는 것만 최신순((날짜,시간) 내림차순, 같은 시각은 뒤에 등록된 것 먼저)으로.
+    각 작업에는 원본 목록 위치 '_idx'가 붙는다.
+      worker / worker_has / plate_has        : 기사 일치 / 기사·차량번호 포함
+      owner_ci, tenant_ci / owner_has, ...   : 대소문자 무시 포함 / 그대로 포함
+      date | date_from, date_to              : 작업목록(문자열 비교)
+      day_from, day_to, half('H12'|'H34')    : 재무(날짜 해석 후 비교)
+      status('pending'|'done'), pay('unpaid'|'paid'), colors, spare, outsrc, no_outsrc
+    """
+    if _use_sqlite():
+        return _sql_jobs_query(company, flt)
+    return jobs_at(company, [pos for pos, _ in jobs_match(company, flt)])
+
+def jobs_match(company: str, flt: dict) -> list:
+    """jobs_query 와 같은 조건·순서로 (위치, id) 만. 작업 본문은 jobs_at 으로 필요한 만큼만 꺼낸다."""
+    if _use_sqlite():
+        return _sql_jobs_match(company, flt)
+    st = _jobs_state(company)
+    rows = st["rows"]
+    return [(pos, rows[pos].get("id") or "") for pos in _jobs_index_search(_jobs_index(st), flt)]
+
+def jobs_match_total(company: str, flt: dict) -> tuple:
+    """jobs_match 와 같은 조건의 (건수, 금액 합계(원)). 색인(SQLite 는 COUNT/SUM)만 보고 작업 본문은 안 읽는다"""
+    if _use_sqlite():
+        where, args = _sql_jobs_where(company, flt)
+        n, amount = _sql().execute(f"SELECT COUNT(*), COALESCE(SUM(amount_won), 0) FROM jobs WHERE {where}",
+                                   args).fetchone()
+        return n, int(amount)
+    ix = _jobs_index(_jobs_state(company))
+    facets = ix["facets"]
+    hits = _jobs_index_search(ix, flt)
+    return len(hits), sum(facets[pos]["amount_won"] for pos in hits)
+
+# ---------- 커서(키셋) 페이지 ----------
+# 커서 = 페이지 경계 작업의 (정렬 키, id, 위치). 다음 요청은 위치 대신 id 로 경계를 다시 찾으므로
+# 그사이 작업이 추가·삭제돼도 이미 본 작업이 밀려 다시 나오거나 건너뛰지 않는다.
+import base64
+
+def _job_cursor_make(ts: str, pos: int, jid: str) -> str:
+    raw = _json_text([ts, pos, jid]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def _job_cursor_read(tok: str):
+    """커서 -> (정렬 키, 위치, id). 잘못된 값이면 None(= 첫 페이지)"""
+    tok = (tok or "").strip()
+    if not tok:
+        return None
+    try:
+        ts, pos, jid = _json_decode(base64.urlsafe_b64decode(tok + "=" * (-len(tok) % 4)))
+        return str(ts), int(pos), str(jid or "")
+    except Exception:
+        return None
+
+def _jobs_scan(company: str, flt: dict, anchor, backward: bool, limit: int) -> list:
+    """_jobs_index_scan 의 백엔드 공용판: [(정렬 키, 위치, id)]"""
+    if _use_sqlite():
+        where, args = _sql_jobs_where(company, flt)
+        if anchor:
+            op = ">" if backward else "<"
+            where += f" AND (sort_ts {op} ? OR (sort_ts = ? AND pos {op} ?))"
+            args += [anchor[0], anchor[0], anchor[1]]
+        order = "ASC" if backward else "DESC"
+        cur = _sql().execute(f"SELECT sort_ts, pos, job_id FROM jobs WHERE {where} "
+                             f"ORDER BY sort_ts {order}, pos {order} LIMIT ?", [*args, limit])
+        return [tuple(r) for r in cur]
+    st = _jobs_state(company)
+    rows = st["rows"]
+    return [(ts, pos, rows[pos].get("id") or "")
+            for ts, pos in _jobs_index_scan(_jobs_index(st), flt, anchor, backward, limit)]
+
+def _jobs_cursor_anchor(company: str, cur):
+    ts, pos, jid = cur
+    if jid:
+        now, _ = job_lookup(company, jid)
+        if now is not None:
+            pos = now
+    return ts, pos
+
+def jobs_page(company: str, flt: dict, limit: int, after: str = "", before: str = "") -> dict:
+    """
+    jobs_match 와 같은 조건·순서의 한 페이지만: {"items": [(위치, id)], "next": 커서|None, "prev": 커서|None}.
+    after=커서면 그 다음(더 오래된) 페이지, before=커서면 그 앞(더 최신) 페이지.
+    페이지 밖 작업은 읽지 않는다(JSON 은 보조 색인, SQLite 는 (company, sort_ts, pos) 인덱스).
+    """
+    cur = _job_cursor_read(before) or _job_cursor_read(after)
+    backward = bool(_job_cursor_read(before))
+    anchor = _jobs_cursor_anchor(company, cur) if cur else None
+    got = _jobs_scan(company, flt, anchor, backward, limit + 1)
+    more = len(got) > limit
+    got = got[:limit]
+    if backward:
+        got.reverse()
+    if not got:
+        return {"items": [], "next": None, "prev": None}
+    first, last = got[0], got[-1]
+    has_next = (not backward and more) or (backward and bool(_jobs_scan(company, flt, last[:2], False, 1)))
+    has_prev = (backward and more) or (not backward and anchor is not None
+                                       and bool(_jobs_scan(company, flt, first[:2], True, 1)))
+    return {
+        "items": [(pos, jid) for _, pos, jid in got],
+        "next": _job_cursor_make(*last) if has_next else None,
+        "prev": _job_cursor_make(*first) if has_prev else None,
+    }
+
+def jobs_at(company: str, positions: list) -> list:
+    """위치 목록 -> 작업 목록(순서 유지, '_idx' 포함, 사본이라 고쳐도 캐시에 영향 없음)"""
+    if _use_sqlite():
+        return _sql_jobs_at(company, list(positions))
+    rows = _jobs_state(company)["rows"]
+    return [{**rows[pos], "_idx": pos} for pos in positions if 0 <= pos < len(rows)]
+
+# =========================================================
+# 재무 일별 합계 (매출/미수/수입/지출, 회사별 날짜 버킷)
+# =========================================================
+# 기간 카드는 원본 목록을 매번 훑지 않고 날짜 버킷만 더한다.
+#  - 작업: JSON 은 보조 색인의 daysum(저널 set/add 때 바뀐 작업만큼 갱신, del 이면 facets 로 다시),
+#          SQLite 는 저장할 때 계산해 둔 sales_won / due_won 을 날짜별로 합산
+#  - 수입/지출: 파일이 바뀔 때마다(버전=stat) 한 번 날짜 버킷으로 접어 둔다
+#  - 외주받음 자동 수입은 원본 작업이 '완납'일 때만 잡히므로 버킷 밖에 따로 두고 합산할 때 확인
+#  - 엑셀 요약 시트용 월별 집계(합계/기사/장비/원수급자/임차인)도 같은 방식:
+#    JSON 은 색인의 monthly 버킷, SQLite 는 amount_won 등 저장된 컬럼을 GROUP BY
+_FIN_ROWS_DAYS = {}   # (파일, 회사) -> (버전, 버킷)
+
+def _fin_is_auto_given(e: dict) -> bool:
+    return (e.get("source") == "auto_outsrc_given") or bool(e.get("category") == "외주줬음" and e.get("auto_key"))
+
+def _fin_job_days(company: str) -> dict:
+    """{"days": {날짜: (매출, 미수)}, "outsrc": {외주 자동항목 키: 원본 작업 요약}}"""
+    if _use_sqlite():
+        conn = _sql()
+        days = {d: (sv, dv) for d, sv, dv in conn.execute(
+            "SELECT day, SUM(sales_won), SUM(due_won) FROM jobs WHERE company = ? AND day != '' GROUP BY day",
+            (company,))}
+    else:
+        days = _jobs_index(_jobs_state(company))["daysum"]
+    return {"days": days, "outsrc": _fin_outsrc_info(_outsrc_jobs(company))}
+
+def _fin_outsrc_info(jobs) -> dict:
+    """외주 자동항목 키 -> 원본 작업 요약 (외주가 아닌 작업은 건너뜀)"""
+    info = {}
+    for j in jobs:
+        ot = (j.get("outsource_type") or "").lower()
+        if ot not in ("received", "given"):
+            continue
+        info[outsrc_auto_key(j, ot)] = {
+            "status": (j.get("status") or "").strip(),
+            "payment_status": (j.get("payment_status") or "").strip(),
+            "date": j.get("date") or "",
+            "worker": (j.get("worker") or j.get("driver") or ""),
+        }
+    return info
+
+def _fin_rows_version(filename: str, company: str):
+    # _json_rows_read 와 같은 순서(분할 파일 -> 레거시 통합 파일)
+    for p in (DATA_DIR / _shard_file(filename, company), DATA_DIR / filename):
+        try:
+            st = p.stat()
+            return (str(p), st.st_ino, st.st_mtime_ns, st.st_size)
+        except OSError:
+            continue
+    return ("", 0, 0, 0)
+
+def _fin_rows_days(filename: str, company: str) -> dict:
+    """수입/지출 -> {"days": {날짜: 금액 합}, "auto": [(날짜, 자동항목 키, 금액)]} (외주줬음 자동 지출은 0원 취급)"""
+    key = (filename, company)
+    ver = None if _use_sqlite() else _fin_rows_version(filename, company)
+    if ver is not None:
+        with _JSON_CACHE_LOCK:
+            hit = _FIN_ROWS_DAYS.get(key)
+        if hit is not None and hit[0] == ver:
+            return hit[1]
+    days, auto = {}, []
+    for r in _company_rows_read(filename, company):
+        d = _parse_date_safe(r.get("date"))
+        if d is None:
+            continue
+        day, amt = d.isoformat(), _to_number(r.get("amount"))
+        if filename == "incomes.json" and (r.get("source") or "") == "auto_outsrc_received":
+            auto.append((day, r.get("auto_key") or r.get("id"), amt))
+        elif filename == "expenses_db.json" and _fin_is_auto_given(r):
+            continue
+        else:
+            days[day] = days.get(day, 0) + amt
+    out = {"days": days, "auto": auto}
+    if ver is not None:
+        with _JSON_CACHE_LOCK:
+            _FIN_ROWS_DAYS[key] = (ver, out)
+    return out
+
+def finance_period_totals(company: str, start: date = None, end: date = None, half: str = "") -> dict:
+    """
+    기간 카드 합계: sales_total(완료·완납, 외주받음 제외) / outstanding_all / income_total(외주받음은 완납만)
+    / expense_total(외주줬음 자동항목 제외). half('H12'|'H34')는 작업에만 적용(대시보드와 동일).
+    "job_info" 는 외주 자동항목 키 -> 원본 작업 요약(표시 링크용).
+    """
+    lo = start.isoformat() if start else ""
+    hi = end.isoformat() if end else "9999-12-31"
+
+    def _in(day, use_half=False):
+        if not (lo <= day <= hi):
+            return False
+        if use_half and half == "H12": return day[5:7] <= "06"
+        if use_half and half == "H34": return day[5:7] >= "07"
+        return True
+
+    jd = _fin_job_days(company)
+    sales = due = 0
+    for day, (sv, dv) in jd["days"].items():
+        if _in(day, True):
+            sales += sv
+            due += dv
+    inc = _fin_rows_days("incomes.json", company)
+    income = sum(v for day, v in inc["days"].items() if _in(day))
+    income += sum(amt for day, k, amt in inc["auto"]
+                  if _in(day) and (jd["outsrc"].get(k) or {}).get("payment_status") == "완납")
+    exp = _fin_rows_days("expenses_db.json", company)
+    expense = sum(v for day, v in exp["days"].items() if _in(day))
+    return {
+        "sales_total": int(sales), "outstanding_all": int(due),
+        "income_total": int(income), "expense_total": int(expense),
+        "job_info": jd["outsrc"],
+    }
+
+def _month_last(day: str) -> str:
+    """'YYYY-MM-DD' -> 그 달 마지막 날"""
+    import calendar
+    y, m = int(day[:4]), int(day[5:7])
+    return f"{day[:7]}-{calendar.monthrange(y, m)[1]:02d}"
+
+def finance_monthly(company: str, start: date = None, end: date = None, half: str = "") -> dict:
+    """
+    기간 안 작업(외주받음/외주줬음 제외)의 월별 집계:
+    {차원: {이름: {"YYYY-MM": (건수, 금액, 완납 매출, 미수)}}}. 차원은 _FIN_MONTHLY_DIMS ("total" 의 이름은 "").
+    JSON 은 보조 색인의 월별 버킷을 쓰고 기간 양 끝의 잘린 달만 facets 로 더한다.
+    """
+    lo = start.isoformat() if start else ""
+    hi = end.isoformat() if end else "9999-12-31"
+
+    def _month_ok(m):
+        if half == "H12": return m[5:7] <= "06"
+        if half == "H34": return m[5:7] >= "07"
+        return True
+
+    flat = {}
+    def _add(key, vals):
+        cur = flat.get(key)
+        flat[key] = vals if cur is None else tuple(x + y for x, y in zip(cur, vals))
+
+    if _use_sqlite():
+        sql = ("SELECT substr(day, 1, 7), worker_any, plate, owner, tenant, COUNT(*), "
+               "SUM(amount_won), SUM(sales_won), SUM(due_won) FROM jobs "
+               "WHERE company = ? AND day != '' AND day >= ? AND day <= ? "
+               "AND outsource_type NOT IN ('received', 'given') "
+               "GROUP BY 1, worker_any, plate, owner, tenant")
+        for m, worker, plate, owner, tenant, *vals in _sql().execute(sql, (company, lo, hi)):
+            if not _month_ok(m):
+                continue
+            f = {"worker_any": worker, "plate": plate, "owner": owner, "tenant": tenant}
+            for dim, col in _FIN_MONTHLY_DIMS:
+                _add((m, dim, f[col] if col else ""), tuple(vals))
+    else:
+        ix = _jobs_index(_jobs_state(company))
+        # 기간이 달 중간에서 시작/끝나면 그 달은 날짜 범위로 직접 더한다
+        edges = []
+        lo_m, hi_m = lo[:7], hi[:7]
+        if lo and lo[8:] != "01":
+            edges.append((lo, hi if hi_m == lo_m else _month_last(lo)))
+        if hi[8:] != _month_last(hi)[8:] and not (edges and hi_m == lo_m):
+            edges.append((hi_m + "-01", hi))
+        partial = {a[:7] for a, _ in edges}
+        for key, vals in ix["monthly"].items():
+            m = key[0]
+            if lo_m <= m <= hi_m and m not in partial and _month_ok(m):
+                _add(key, vals)
+        days, facets = ix["days"], ix["facets"]
+        for a, b in edges:
+            a, b = max(a, lo), min(b, hi)
+            if a > b or not _month_ok(a[:7]):
+                continue
+            i = bisect.bisect_left(days, (a, -1))
+            k = bisect.bisect_right(days, (b, len(facets)))
+            for _, pos in days[i:k]:
+                f = facets[pos]
+                vals = (1, f["amount_won"], f["sales_won"], f["due_won"])
+                for key in _fin_monthly_keys(f):
+                    _add(key, vals)
+
+    out = {dim: {} for dim, _ in _FIN_MONTHLY_DIMS}
+    for (m, dim, name), vals in sorted(flat.items()):
+        out[dim].setdefault(name, {})[m] = vals
+    return out
 
 def _check_s3_config_and_flash():
     cfg = current_app.config
@@ -806,54 +2393,46 @@ def _check_s3_config_and_flash():
 # =========================================================
 # 외주 동기화(중복 방지·정리) — 결과 요약 반환으로 개선
 # =========================================================
-def _sync_outsourcing_entries(company, jobs):
-    incomes  = load_json("incomes.json", {})
-    expenses = load_json("expenses_db.json", {})
-    incomes.setdefault(company, [])
-    expenses.setdefault(company, [])
+def _outsrc_item(j: dict):
+    """외주 작업 -> (종류, 자동항목 키, 자동 수입/지출 항목). 외주 작업이 아니면 None"""
+    otype   = str(j.get("outsource_type","")).lower()  # 'received' | 'given' | 'none'
+    partner = (j.get("outsource_partner") or "").strip()
+    if not partner or otype in ("", "none"):
+        return None
+
+    amount = job_out_amount_won(j)  # 만원 → 원 환산 포함
+    key = outsrc_auto_key(j, otype)
 
+    item = {
+        "id": key,
+        "auto_key": key,
+        "source": "auto_outsrc_received" if otype == "received" else "auto_outsrc_given",
+        "date": j.get("date",""),
+        "category": "외주받음" if otype == "received" else "외주줬음",
+        "desc": partner,
+        "amount": amount,
+    }
+    return otype, key, item
+
+def _sync_outsourcing_entries(company, jobs, keys=None):
+    """
+    외주 작업 <-> 자동 수입/지출 항목 맞추기. keys 를 주면 그 자동항목 키만 다룬다
+    (jobs 에 그 키를 만드는 작업이 모두 들어 있어야 한다).
+    """
     want_inc, want_exp = {}, {}
 
     for j in (jobs or []):
-        otype   = str(j.get("outsource_type","")).lower()  # 'received' | 'given' | 'none'
-        partner = (j.get("outsource_partner") or "").strip()
-        if not partner or otype in ("", "none"):
+        it = _outsrc_item(j)
+        if it is None:
+            continue
+        otype, key, item = it
+        if keys is not None and key not in keys:
             continue
-
-        amount = job_out_amount_won(j)  # 만원 → 원 환산 포함
-        key = outsrc_auto_key(j, otype)
-
-        item = {
-            "id": key,
-            "auto_key": key,
-            "source": "auto_outsrc_received" if otype == "received" else "auto_outsrc_given",
-            "date": j.get("date",""),
-            "category": "외주받음" if otype == "received" else "외주줬음",
-            "desc": partner,
-            "amount": amount,
-        }
-
         if otype == "received":
             want_inc[key] = item
         else:
             want_exp[key] = item
 
-    def sync_list(cur_list, want_map):
-        # 기존 자동항목 인덱싱
-        idx = { (x.get("auto_key") or x.get("id")): i for i, x in enumerate(cur_list) if (x.get("auto_key") or x.get("id")) }
-        added = removed = 0
-        keep = []
-        for x in cur_list:
-            k = x.get("auto_key") or x.get("id")
-            if str(x.get("source","")).startswith("auto_outsrc_") and (k not in want_map):
-                removed += 1
-                continue
-            keep.append(x)
-        for k, v in want_map.items():
-            if k not in idx:
-                keep.append(v); added += 1
-        return keep, added, removed
-
     def sync_list(cur_list, want_map):
         idx = {}
         for i, x in enumerate(cur_list):
@@ -864,7 +2443,8 @@ def _sync_outsourcing_entries(company, jobs):
         keep = []
         for x in cur_list:
             k = x.get("auto_key") or x.get("id")
-            if x.get("source","").startswith("auto_outsrc_") and (k not in want_map):
+            if (x.get("source","").startswith("auto_outsrc_") and (k not in want_map)
+                    and (keys is None or k in keys)):
                 removed += 1
                 continue
             keep.append(x)
@@ -874,16 +2454,49 @@ def _sync_outsourcing_entries(company, jobs):
                 keep.append(v); added += 1
         return keep, added, removed
 
-    incomes[company],  inc_added, inc_removed = sync_list(incomes[company],  want_inc)
-    expenses[company], exp_added, exp_removed = sync_list(expenses[company], want_exp)
-
-    save_json("incomes.json", incomes)
-    save_json("expenses_db.json", expenses)
+    def apply(want_map):
+        def fn(rows):
+            keep, added, removed = sync_list(rows, want_map)
+            rows[:] = keep
+            return added, removed
+        return fn
+
+    def run(read, update, want_map):
+        # 일부 키만 다룰 때는 바뀔 게 없으면 파일을 다시 쓰지 않는다
+        if keys is not None and sync_list(list(read(company)), want_map)[1:] == (0, 0):
+            return 0, 0
+        return update(company, apply(want_map))
+
+    inc_added, inc_removed = run(incomes_read, incomes_update, want_inc)
+    exp_added, exp_removed = run(expenses_read, expenses_update, want_exp)
     return {
         "inc_added": inc_added, "inc_removed": inc_removed,
         "exp_added": exp_added, "exp_removed": exp_removed
     }
 
+def _outsrc_jobs(company: str) -> list:
+    """외주 작업만(목록 순서). JSON 은 보조 색인, SQLite 는 outsource_type 컬럼으로 고른다."""
+    if _use_sqlite():
+        return [_json_decode(d) for (d,) in _sql().execute(
+            "SELECT data FROM jobs WHERE company = ? AND lower(outsource_type) NOT IN ('', 'none') ORDER BY pos",
+            (company,))]
+    st = _jobs_state(company)
+    return [st["rows"][pos] for pos in sorted(_jobs_index(st)["outsrc"])]
+
+def outsourcing_touch(company: str, *jobs, keys=()):
+    """
+    작업 추가/수정/삭제 뒤에 부른다. 바뀌기 전·후 작업(jobs)이나 keys 중 외주 자동항목 키가 있으면
+    그 키들만 현재 작업 목록 기준으로 다시 맞춘다. 외주와 무관한 변경이면 아무것도 안 한다.
+    """
+    touched = {k for k in keys if k}
+    for j in jobs:
+        it = _outsrc_item(j) if isinstance(j, dict) else None
+        if it:
+            touched.add(it[1])
+    if not touched:
+        return None
+    return _sync_outsourcing_entries(company, _outsrc_jobs(company), touched)
+
 # =========================================================
 # 템플릿 필터/유틸
 # =========================================================
@@ -894,13 +2507,91 @@ def won(v):
     except Exception:
         return v
 
+# =========================================================
+# 사용자 색인 (전화번호 -> 아이디)
+# =========================================================
+# 로그인/가입 중복 확인이 users.json 을 통째로 훑지 않도록 색인을 둔다.
+#  - 버전(JSON: 파일 시그니처, SQLite: revs)이 바뀔 때, 즉 사용자 저장 뒤 첫 조회에서 한 번만 다시 만든다
+#  - 같은 번호가 여럿이면 예전 선형 탐색처럼 users.json 순서상 첫 계정
+_USERS_INDEX = {}   # "users" -> (버전, {"phone": {...}, "company_phone": {...}})
+
+def _users_version():
+    if _use_sqlite():
+        return (_sqlite_path(), _sql_rev("users.json", ""))
+    p = DATA_DIR / "users.json"
+    try:
+        st = p.stat()
+        return (str(p), st.st_ino, st.st_mtime_ns, st.st_size)
+    except OSError:
+        return (str(p), 0, 0, 0)
+
+def _users_index() -> dict:
+    ver = _users_version()
+    with _JSON_CACHE_LOCK:
+        hit = _USERS_INDEX.get("users")
+    if hit is not None and hit[0] == ver:
+        return hit[1]
+    by_phone, by_company_phone = {}, {}
+    for username, u in load_json('users.json', {}).items():
+        by_phone.setdefault(u.get('phone'), username)
+        by_company_phone.setdefault((u.get('company'), u.get('phone') or ''), username)
+    ix = {"phone": by_phone, "company_phone": by_company_phone}
+    with _JSON_CACHE_LOCK:
+        _USERS_INDEX["users"] = (ver, ix)
+    return ix
+
+def user_by_phone(phone, company=None):
+    """전화번호(회사를 주면 그 회사 안에서) -> 아이디, 없으면 None"""
+    ix = _users_index()
+    if company is None:
+        return ix["phone"].get(phone)
+    return ix["company_phone"].get((company, phone or ''))
+
+def user_get(username) -> dict:
+    """아이디 하나만 읽는다(SQLite 는 한 행만)"""
+    if not username:
+        return {}
+    if _use_sqlite():
+        return _sql_kv_get('users.json', username, {}) or {}
+    return load_json('users.json', {}).get(username, {}) or {}
+
 def get_current_user():
-    users = load_json('users.json', {})
-    return users.get(session.get('username'), {}) or {}
+    """로그인한 사용자. 요청마다 한 번만 읽어 g 에 둔다(users.json 을 저장하면 버림)"""
+    username = session.get('username')
+    if not username:
+        return {}
+    hit = g.get('_user')
+    if hit is None or hit[0] != username:
+        hit = (username, user_get(username))
+        g._user = hit
+    return hit[1]
+
+def _users_stamp() -> str:
+    # 세션 쿠키는 읽을 수 있으므로 경로 등은 해시로만
+    return hashlib.sha1("|".join(map(str, _users_version())).encode("utf-8")).hexdigest()[:12]
+
+@app.before_request
+def _session_user_refresh():
+    """
+    세션의 role/company 는 로그인 때 넣은 값. users.json 이 그 뒤로 바뀌었을 때만
+    (권한 부여/회수, 회사명 변경 등) 사용자를 다시 읽어 세션을 맞춘다. 안 바뀌었으면 아무것도 읽지 않는다.
+    """
+    if not session.get('username') or request.endpoint == 'static':
+        return
+    stamp = _users_stamp()
+    if session.get('uv') == stamp:
+        return
+    user = get_current_user()
+    if not user:   # 계정이 지워졌으면(직원 삭제 등) 예전 role 로 남지 않게 로그아웃
+        session.clear()
+        return
+    session['role'] = user.get('role')
+    session['company'] = user.get('company', '')
+    session['uv'] = stamp
 
 def is_admin(user=None):
-    if user is None:
-        user = get_current_user()
+    if user is None:   # 세션 role 은 _session_user_refresh 가 users.json 과 맞춰 둔다
+        return session.get('role') in ('boss', 'manager')
     return (user.get('role') in ('boss', 'manager'))
 
 def has_perm(perm: str) -> bool:
@@ -948,6 +2639,295 @@ app.jinja_env.filters['split'] = jinja_split
 app.jinja_env.globals['str'] = str
 app.jinja_env.filters['string'] = lambda x: '' if x is None else str(x)
 
+# =========================================================
+# 템플릿 조각 캐시
+# =========================================================
+# 자주 안 바뀌는 큰 조각(기사 드롭다운, 거래처 목록 등)은 렌더링한 HTML 을 그대로 둔다.
+#   {% call fragment("이름", company, ["workers.json", "jobs.json"], 선택값, ...) %} ... {% endcall %}
+#  - 키는 (이름, 회사, 나머지 인자). 그 회사 파일들의 데이터 버전(_data_version)을 같이 적어 두고
+#    다르면(저장됨) 다시 렌더링해 바꿔 넣는다 -> 회사별로, 그 조각이 기대는 파일이 바뀔 때만 다시 그림
+#  - 조각 안에서만 쓰는 무거운 값은 뷰에서 함수로 넘겨 다시 그릴 때만 계산되게 한다
+#  - 최대 FRAGMENT_CACHE_MAX 개, 오래 안 쓴 것부터 버린다(LRU). 0 이면 끔
+from collections import OrderedDict
+FRAGMENT_CACHE_MAX = int(os.environ.get("FRAGMENT_CACHE_MAX", "512"))
+_FRAGMENTS = OrderedDict()   # (이름, 회사, 인자) -> (버전들, Markup)
+_FRAGMENT_LOCK = threading.Lock()
+
+@app.template_global()
+def fragment(name, company, deps=(), *vary, caller):
+    if FRAGMENT_CACHE_MAX <= 0:
+        return caller()
+    company = company or ""
+    key = (name, company, vary)
+    ver = tuple(_data_version(f, company) for f in deps)   # 렌더링 전에 잰다(도중 저장되면 다음에 다시 그림)
+    with _FRAGMENT_LOCK:
+        hit = _FRAGMENTS.get(key)
+        if hit is not None and hit[0] == ver:
+            _FRAGMENTS.move_to_end(key)
+            return hit[1]
+    html = Markup(caller())
+    with _FRAGMENT_LOCK:
+        _FRAGMENTS[key] = (ver, html)
+        _FRAGMENTS.move_to_end(key)
+        while len(_FRAGMENTS) > FRAGMENT_CACHE_MAX:
+            _FRAGMENTS.popitem(last=False)
+    return html
+
+# =========================================================
+# 응답 압축 / 조건부 GET (ETag -> 304)
+# =========================================================
+# 모바일 데이터로 보는 현장 기사님들 때문에 HTML/JSON 은 압축해서 보내고,
+# 큰 목록 화면(작업 목록, 재무, 캘린더)은 다시 열 때 데이터가 그대로면 렌더링 없이 304 로 끝낸다.
+#  - 압축: 클라이언트가 받으면 br(brotli 설치 시) > gzip. COMPRESS_MIN_BYTES 미만, 파일 전송(send_file),
+#          스트리밍(엑셀), 이미 인코딩된 응답은 그대로. COMPRESS_MIN_BYTES=0 이면 끔
+#  - ETag(약한 검증자): (화면, 사용자/권한/회사, 쿼리 문자열, 오늘 날짜, 그 회사 관련 파일들의 데이터 버전,
+#          코드/템플릿 변경) 해시. 조각 캐시와 같은 _data_version 을 쓴다. 보낼 플래시 메시지가 있으면 안 붙인다
+import gzip
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", "1024"))
+COMPRESS_LEVEL = int(os.environ.get("COMPRESS_LEVEL", "6"))       # gzip 1~9
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", "5"))       # brotli 0~11
+_COMPRESS_TYPES = {"text/html", "text/plain", "text/css", "text/javascript",
+                   "application/javascript", "application/json"}
+
+def _compress_encoding():
+    acc = request.accept_encodings
+    if brotli is not None and acc["br"]:
+        return "br"
+    if acc["gzip"]:
+        return "gzip"
+    return None
+
+@app.after_request
+def _compress_response(resp):
+    if (COMPRESS_MIN_BYTES <= 0 or resp.status_code != 200 or resp.direct_passthrough
+            or resp.is_streamed or resp.mimetype not in _COMPRESS_TYPES
+            or "Content-Encoding" in resp.headers):
+        return resp
+    resp.vary.add("Accept-Encoding")
+    enc = _compress_encoding()
+    if enc is None:
+        return resp
+    body = resp.get_data()
+    if len(body) < COMPRESS_MIN_BYTES:
+        return resp
+    if enc == "br":
+        body = brotli.compress(body, quality=BROTLI_QUALITY)
+    else:
+        body = gzip.compress(body, COMPRESS_LEVEL, mtime=0)
+    resp.set_data(body)
+    resp.headers["Content-Encoding"] = enc
+    return resp
+
+_ETAG_SALT = {}   # "salt" -> 코드/템플릿 시그니처 (prod 는 한 번만 계산)
+
+def _in_docs_dir(path) -> bool:
+    """static/docs(업로드 문서) 아래인가. 업로드 파일은 자산 파이프라인(해시 주소, .gz/.br)에 넣지 않는다"""
+    return DOCS_DIR.resolve() in Path(path).resolve().parents
+
+def _static_assets() -> list:
+    """static/ 의 원본 파일들(업로드 문서 폴더, 미리 압축한 .gz/.br, 임시 파일 제외)"""
+    return [p for p in sorted(Path(app.static_folder).rglob("*"))
+            if p.is_file() and p.suffix not in (".gz", ".br", ".hash", ".tmp") and not _in_docs_dir(p)]
+
+def _etag_salt() -> str:
+    """app.py/템플릿/정적 파일이 바뀌면(배포) 예전 ETag 가 안 맞도록 섞는 값"""
+    hit = _ETAG_SALT.get("salt")
+    if hit is not None and not APP_DEV:
+        return hit
+    parts = []
+    for p in [Path(__file__), *sorted((Path(app.root_path) / "templates").rglob("*")), *_static_assets()]:
+        try:
+            st = p.stat()
+        except OSError:
+            continue
+        parts.append(f"{p.name}:{st.st_mtime_ns}:{st.st_size}")
+    salt = hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:12]
+    _ETAG_SALT["salt"] = salt
+    return salt
+
+def _page_etag(files: tuple) -> str:
+    company = session.get("company") or ""
+    basis = [request.endpoint, session.get("username"), session.get("role"), company, session.get("uv"),
+             request.query_string.decode("latin-1"), date.today().isoformat(), _storage_backend(),
+             _etag_salt(), [_data_version(f, company) for f in files]]
+    raw = json.dumps(basis, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+def etag_cached(*files: str):
+    """GET 화면에 약한 ETag 를 붙이고, If-None-Match 가 맞으면 뷰를 부르지 않고 304. files 는 화면이 기대는 회사별 파일"""
+    def deco(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            if request.method not in ("GET", "HEAD") or session.get("_flashes"):
+                return view(*args, **kwargs)
+            tag = _page_etag(files)
+            if request.if_none_match.contains_weak(tag):
+                resp = Response(status=304)
+                resp.vary.add("Accept-Encoding")
+            else:
+                resp = app.make_response(view(*args, **kwargs))
+                if resp.status_code != 200:
+                    return resp
+            resp.set_etag(tag, weak=True)
+            resp.headers["Cache-Control"] = "private, no-cache"
+            return resp
+        return wrapped
+    return deco
+
+# =========================================================
+# 정적 파일 (내용 해시 주소 + 오래 캐시 + 미리 압축한 파일)
+# =========================================================
+# 템플릿에서는 url_for('static', ...) 대신 {{ static_url('export.js') }} -> /static/export.3f2a9c1b0d.js
+#  - 해시는 파일 내용 sha1 앞 10자리. 내용이 바뀌면 주소도 바뀌므로 해시 주소는 STATIC_MAX_AGE(1년) + immutable.
+#    해시 없는 주소는 예전처럼 매번 확인(SEND_FILE_MAX_AGE_DEFAULT=0)
+#  - 주소의 해시가 지금 내용과 다르면(배포 직후 예전 페이지) 지금 파일을 캐시 없이 보낸다
+#  - 클라이언트가 받으면 옆의 .br / .gz 파일을 보낸다. 없거나 지금 원본 해시로 만든 것이 아니면(.hash 파일에 기록)
+#    첫 요청 때 다시 만든다. mtime 은 믿지 않는다(rsync -a 처럼 mtime 을 보존하는 배포)
+#    (gzip 은 항상, br 은 brotli 설치 시, 압축 대상 종류 + COMPRESS_MIN_BYTES 이상만. 배포 때 미리: python app.py compress-static)
+#  - 해시는 prod 에서 파일당 한 번, dev 는 파일이 바뀌면(mtime/크기) 다시 계산
+#  - static/docs(업로드 문서)는 빼고 예전처럼 보낸다(해시 주소·.gz/.br 없음)
+from werkzeug.security import safe_join
+
+STATIC_MAX_AGE = int(os.environ.get("STATIC_MAX_AGE", str(365 * 24 * 3600)))
+_ASSET_HASHES = {}   # 절대경로 -> ((mtime_ns, 크기), 해시)
+_ASSET_RE = re.compile(r"^(.+)\.([0-9a-f]{10})(\.[A-Za-z0-9]+)$")
+_ASSET_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+def _asset_hash(path: str) -> str:
+    hit = _ASSET_HASHES.get(path)
+    if hit is not None and not APP_DEV:
+        return hit[1]
+    st = os.stat(path)
+    sig = (st.st_mtime_ns, st.st_size)
+    if hit is not None and hit[0] == sig:
+        return hit[1]
+    h = hashlib.sha1()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 16), b""):
+            h.update(chunk)
+    digest = h.hexdigest()[:10]
+    _ASSET_HASHES[path] = (sig, digest)
+    return digest
+
+@app.template_global()
+def static_url(filename: str) -> str:
+    """url_for('static') + 내용 해시 파일명(파일이 없거나 확장자가 없으면 그냥 주소)"""
+    path = safe_join(app.static_folder, filename)
+    try:
+        digest = _asset_hash(path) if path and not _in_docs_dir(path) else None
+    except OSError:
+        digest = None
+    stem, dot, ext = filename.rpartition(".")
+    if digest and dot and stem and "/" not in ext:
+        filename = f"{stem}.{digest}.{ext}"
+    return url_for("static", filename=filename)
+
+def _asset_compressible(path: str) -> bool:
+    mimetype, encoding = mimetypes.guess_type(path)
+    return encoding is None and (mimetype in _COMPRESS_TYPES or mimetype == "image/svg+xml")
+
+def _asset_write(target: str, data: bytes):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(target), prefix=".asset.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp, target)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+def _asset_sibling_hash(sibling: str) -> str:
+    """미리 압축한 파일을 만들 때의 원본 내용 해시(없으면 "")"""
+    try:
+        with open(sibling + ".hash", "r", encoding="ascii") as fh:
+            return fh.read().strip()
+    except (OSError, ValueError):
+        return ""
+
+def _asset_compress(path: str, enc: str) -> bool:
+    """
+    path 옆에 .br/.gz 를 만들고(임시 파일 -> 교체) 원본 내용 해시를 .br.hash/.gz.hash 에 적는다.
+    못 만들면(brotli 없음, 읽기 전용 등) False
+    """
+    if enc == "br" and brotli is None:
+        return False
+    sibling = path + dict(_ASSET_ENCODINGS)[enc]
+    try:
+        raw = Path(path).read_bytes()
+        data = brotli.compress(raw, quality=11) if enc == "br" else gzip.compress(raw, 9, mtime=0)
+        _asset_write(sibling, data)
+        _asset_write(sibling + ".hash", hashlib.sha1(raw).hexdigest()[:10].encode("ascii"))
+    except OSError:
+        return False
+    return True
+
+def _asset_precompressed(path: str):
+    """클라이언트가 받는 인코딩의 미리 압축한 파일 -> (인코딩, 경로), 없으면(또는 압축을 껐으면) (None, None)"""
+    if COMPRESS_MIN_BYTES <= 0:
+        return None, None
+    try:
+        size, digest = os.stat(path).st_size, _asset_hash(path)
+    except OSError:
+        return None, None
+    acc = request.accept_encodings
+    for enc, ext in _ASSET_ENCODINGS:
+        if not acc[enc]:
+            continue
+        if _asset_sibling_hash(path + ext) == digest and os.path.isfile(path + ext):
+            return enc, path + ext
+        if size >= COMPRESS_MIN_BYTES and _asset_compress(path, enc) and _asset_sibling_hash(path + ext) == digest:
+            return enc, path + ext
+    return None, None
+
+def _static_file(filename):
+    head, _, name = filename.rpartition("/")
+    m = _ASSET_RE.match(name)
+    exact = safe_join(app.static_folder, filename)
+    if m is None or (exact and os.path.isfile(exact)):
+        return app.send_static_file(filename)
+    real = (head + "/" if head else "") + m.group(1) + m.group(3)
+    path = safe_join(app.static_folder, real)
+    if path is None or not os.path.isfile(path) or _in_docs_dir(path):
+        return app.send_static_file(filename)
+    compressible = COMPRESS_MIN_BYTES > 0 and _asset_compressible(path)
+    enc, sibling = _asset_precompressed(path) if compressible else (None, None)
+    if enc:
+        resp = send_file(sibling, mimetype=mimetypes.guess_type(path)[0], conditional=True, max_age=0)
+        resp.headers["Content-Encoding"] = enc
+    else:
+        resp = send_file(path, conditional=True, max_age=0)
+    if compressible:
+        resp.vary.add("Accept-Encoding")
+    if _asset_hash(path) == m.group(2):
+        resp.cache_control.no_cache = None
+        resp.cache_control.public = True
+        resp.cache_control.max_age = STATIC_MAX_AGE
+        resp.cache_control.immutable = True
+    return resp
+
+app.view_functions["static"] = _static_file
+
+def compress_static() -> int:
+    """static/ 의 압축 대상 파일마다 .gz(.br) 을 미리 만든다(업로드 문서 폴더 제외). 만든 파일 수"""
+    if COMPRESS_MIN_BYTES <= 0:
+        return 0
+    n = 0
+    for p in _static_assets():
+        if not _asset_compressible(str(p)):
+            continue
+        if p.stat().st_size < COMPRESS_MIN_BYTES:
+            continue
+        n += sum(_asset_compress(str(p), enc) for enc, _ in _ASSET_ENCODINGS)
+    return n
+
 # 파트너 IO
 def load_partners(company: str):
     data = load_json('partners.json', {})
@@ -955,14 +2935,24 @@ def load_partners(company: str):
     if not entry:
         legacy = load_json('clients.json', {}).get(company, [])
         entry = {"owners": legacy[:], "tenants": []}
-        data[company] = entry
-        save_json('partners.json', data)
+        update_json('partners.json', lambda db: db.setdefault(company, entry))
     return entry
 
 def save_partners(company: str, owners: list, tenants: list):
-    data = load_json('partners.json', {})
-    data[company] = {"owners": owners, "tenants": tenants}
-    save_json('partners.json', data)
+    update_json('partners.json', lambda db: db.__setitem__(company, {"owners": owners, "tenants": tenants}))
+
+def add_partners(company: str, owners=(), tenants=()):
+    """없는 이름만 추가(다른 요청이 그사이 추가한 항목을 덮어쓰지 않음)"""
+    owners, tenants = [x for x in owners if x], [x for x in tenants if x]
+    if not (owners or tenants):
+        return
+    def _add(db):
+        entry = db.get(company) or {"owners": [], "tenants": []}
+        for key, names in (("owners", owners), ("tenants", tenants)):
+            cur = entry.setdefault(key, [])
+            cur.extend(x for x in names if x not in cur)
+        db[company] = entry
+    update_json('partners.json', _add)
 
 def outsrc_auto_key(job: dict, kind: str) -> str:
     """외주(받음/줬음) 자동 수입/지출 항목의 안정 키"""
@@ -985,21 +2975,24 @@ def _delete_outsourcing_job_by_auto_item(company: str, auto_item: dict) -> bool:
     if not auto_item or not str(auto_item.get("source","")).startswith("auto_outsrc_"):
         return False
 
+    with jobs_lock(company):
+        i = _find_outsourcing_job(list(jobs_read(company)), auto_item)
+        if i is None:
+            return False
+        jobs_delete(company, [i])
+        return True
+
+def _find_outsourcing_job(job_list: list, auto_item: dict):
+    """자동 외주 항목에 대응하는 작업 위치(없으면 None)"""
     kind = "received" if auto_item["source"] == "auto_outsrc_received" else "given"
     auto_key = auto_item.get("auto_key") or auto_item.get("id") or ""
 
-    jobs_db = load_json('jobs.json', {})
-    job_list = list(jobs_db.get(company, []))
-
     # 1) auto_key로 정밀 매칭
     for i, j in enumerate(job_list):
         try:
             if (j.get("outsource_type","").lower() == kind
                 and outsrc_auto_key(j, kind) == auto_key):
-                job_list.pop(i)
-                jobs_db[company] = job_list
-                save_json('jobs.json', jobs_db)
-                return True
+                return i
         except Exception:
             pass
 
@@ -1018,12 +3011,9 @@ def _delete_outsourcing_job_by_auto_item(company: str, auto_item: dict) -> bool:
         if job_out_amount_won(j) != tgt_amount:
             continue
         # 충분히 동일하다고 판단
-        job_list.pop(i)
-        jobs_db[company] = job_list
-        save_json('jobs.json', jobs_db)
-        return True
+        return i
 
-    return False
+    return None
 
 def job_out_amount_won(job: dict) -> int:
     """외주 금액(원): out_amount > out_amount_man*1만 > amount_man*1만"""
@@ -1035,16 +3025,17 @@ def job_out_amount_won(job: dict) -> int:
 
 def _seed_company_containers(company):
     for fname, seed in [
-        ("workers.json", []),
-        ("machines.json", []),
         ("clients.json", []),
         ("partners.json", {"owners": [], "tenants": []}),
-        ("jobs.json", []),
     ]:
-        db = load_json(fname, {})
-        if company not in db:
-            db[company] = seed
-            save_json(fname, db)
+        if company not in load_json(fname, {}):
+            update_json(fname, lambda db: db.setdefault(company, seed))
+    for fname in ("workers.json", "machines.json"):
+        if not _company_rows_read(fname, company):
+            _company_rows_update(fname, company, lambda rows: None)
+    with jobs_lock(company):
+        if not jobs_read(company):   # 스냅샷 + 저널 기준으로 비어 있을 때만
+            jobs_write(company, [])
 
 # =========================================================
 # 인증/대시보드
@@ -1062,14 +3053,8 @@ def login():
         phone = request.form.get('phone')
         password = request.form.get('password')
 
-        users_db = load_json('users.json', {})
-        user = None
-        username = None
-        for u_name, u_data in users_db.items():
-            if u_data.get('phone') == phone:
-                user = u_data
-                username = u_name
-                break
+        username = user_by_phone(phone)
+        user = user_get(username) if username else None
 
         if user and user.get('password') == password:
             if user.get('role') == 'worker' and user.get('status', 'active') == 'pending':
@@ -1080,6 +3065,7 @@ def login():
             session['username'] = username
             session['role'] = user.get('role')
             session['company'] = user.get('company', '')
+            session['uv'] = _users_stamp()
 
             if user['role'] in ('boss', 'manager'):
                 return redirect(url_for('dashboard'))
@@ -1112,8 +3098,41 @@ def dashboard_worker():
 # =========================================================
 # 작업 목록/등록/수정/삭제/엑셀/결제/캘린더 (원기능 유지)
 # =========================================================
+def _jobs_list_filter(args) -> dict:
+    """작업 목록(/jobs) 쿼리 -> jobs_match 필터. CSV 전체 내보내기도 같은 규칙을 쓴다"""
+    raw_status = (args.get('status') or '').strip()
+    def _norm_status(s: str) -> str:
+        s = s.strip()
+        if s in ('pending','진행중','todo','ing'): return 'pending'
+        if s in ('done','완료','complete'):        return 'done'
+        return ''
+    status_filter = _norm_status(raw_status)
+
+    pay_filter = (args.get('pay') or '').strip()
+    spare  = (args.get('spare')  or '').strip()
+    outsrc = (args.get('outsrc') or '').strip()
+
+    overdue = (args.get('overdue') or '').strip()
+    dues    = (args.get('dues')    or '').strip()
+    if overdue == '1' and not status_filter:
+        status_filter = 'pending'
+    if dues == '1' and not pay_filter:
+        pay_filter = 'unpaid'
+
+    return {
+        "worker": (args.get('worker') or '').strip(),
+        "owner_ci": (args.get('owner') or args.get('client_primary') or args.get('client') or '').strip(),
+        "tenant_ci": (args.get('tenant') or args.get('client_tenant') or '').strip(),
+        "date": (args.get('date') or '').strip(),
+        "date_from": (args.get('date_from') or '').strip(),
+        "date_to": (args.get('date_to') or '').strip(),
+        "status": status_filter, "pay": pay_filter,
+        "spare": spare == '1', "outsrc": outsrc == '1',
+    }
+
 @app.route('/jobs', endpoint='view_jobs')
 @app.route('/view_jobs', endpoint='view_jobs_legacy')
+@etag_cached("jobs.json", "partners.json")
 def view_jobs():
     import math
     if 'username' not in session:
@@ -1124,106 +3143,54 @@ def view_jobs():
         return redirect(url_for('dashboard_worker'))
 
     company = user.get('company', '')
-    jobs_all = load_json('jobs.json', {}).get(company, [])
-    for i, j in enumerate(jobs_all):
-        j['_idx'] = i
 
     partners = load_partners(company)
     owners_list  = partners.get('owners', [])
     tenants_list = partners.get('tenants', [])
 
     # ---------- 쿼리 ----------
-    q_worker = (request.args.get('worker') or '').strip()
-    q_owner  = (request.args.get('owner') or request.args.get('client_primary') or request.args.get('client') or '').strip()
-    q_tenant = (request.args.get('tenant') or request.args.get('client_tenant') or '').strip()
-    q_date   = (request.args.get('date') or '').strip()
-    q_from   = (request.args.get('date_from') or '').strip()
-    q_to     = (request.args.get('date_to') or '').strip()
-
-    raw_status = (request.args.get('status') or '').strip()
-    def _norm_status(s: str) -> str:
-        s = s.strip()
-        if s in ('pending','진행중','todo','ing'): return 'pending'
-        if s in ('done','완료','complete'):        return 'done'
-        return ''
-    status_filter = _norm_status(raw_status)
-
-    pay_filter = (request.args.get('pay') or '').strip()
+    flt = _jobs_list_filter(request.args)
+    q_worker, q_owner, q_tenant = flt["worker"], flt["owner_ci"], flt["tenant_ci"]
+    q_date, q_from, q_to = flt["date"], flt["date_from"], flt["date_to"]
+    status_filter, pay_filter = flt["status"], flt["pay"]
     spare  = (request.args.get('spare')  or '').strip()
     outsrc = (request.args.get('outsrc') or '').strip()
 
-    overdue = (request.args.get('overdue') or '').strip()
-    dues    = (request.args.get('dues')    or '').strip()
-    if overdue == '1' and not status_filter:
-        status_filter = 'pending'
-    if dues == '1' and not pay_filter:
-        pay_filter = 'unpaid'
-
-    def _contains(hay, needle):
-        return (needle == '' or (hay or '').lower().find(needle.lower()) != -1)
-
-    jobs = jobs_all
-    if q_worker:
-        jobs = [j for j in jobs if (j.get('worker') or '') == q_worker]
-    if q_owner:
-        jobs = [j for j in jobs if _contains(j.get('client_primary') or j.get('client'), q_owner)]
-    if q_tenant:
-        jobs = [j for j in jobs if _contains(j.get('client_tenant'), q_tenant)]
-    if q_from or q_to:
-        def in_range(d):
-            if not d: return False
-            return (not q_from or d >= q_from) and (not q_to or d <= q_to)
-        jobs = [j for j in jobs if in_range((j.get('date') or '').strip())]
-    elif q_date:
-        jobs = [j for j in jobs if q_date == (j.get('date') or '')]
-
-    if status_filter == 'pending':
-        jobs = [j for j in jobs if (j.get('status') or '진행중').strip() != '완료']
-    elif status_filter == 'done':
-        jobs = [j for j in jobs if (j.get('status') or '').strip() == '완료']
-
-    def _to_int(x):
-        try: return int(x)
-        except: return 0
-    if pay_filter == 'unpaid':
-        jobs = [j for j in jobs if _to_int(j.get('amount_man')) > 0 and _to_int(j.get('paid_amount_man')) < _to_int(j.get('amount_man'))]
-    elif pay_filter == 'paid':
-        jobs = [j for j in jobs if _to_int(j.get('amount_man')) > 0 and _to_int(j.get('paid_amount_man')) >= _to_int(j.get('amount_man'))]
-
-    if spare == '1':
-        jobs = [j for j in jobs if bool(j.get('is_spare'))]
-    if outsrc == '1':
-        jobs = [j for j in jobs if (j.get('outsource_type') or 'none') != 'none']
-
-    def _dt_key(j):
-        d = (j.get('date') or '').strip()
-        t = (j.get('time') or '').strip() or "00:00"
-        try:
-            return _dt.datetime.strptime(f"{d} {t}", "%Y-%m-%d %H:%M")
-        except:
-            try:
-                return _dt.datetime.strptime(d, "%Y-%m-%d")
-            except:
-                return _dt.datetime.min
-    def _sort_key(j):
-        return (_dt_key(j), j.get('_idx', -1))
-    jobs = sorted(jobs, key=_sort_key, reverse=True)
-
     per_page = int(request.args.get('per_page', 20) or 20)
     page = int(request.args.get('page', 1) or 1)
-    total_count = len(jobs)
-    pages = max(1, math.ceil(total_count / per_page)) if per_page > 0 else 1
-    page = max(1, min(page, pages))
-    start = (page - 1) * per_page
-    end   = start + per_page
-    page_jobs = jobs[start:end]
-    all_ids = [j['_idx'] for j in jobs]
-
     args_dict = request.args.to_dict(flat=True)
+
+    # 커서 방식(?paging=cursor): 전체 건수/전체 id 없이 현재 페이지만 색인에서 바로 꺼낸다
+    cursor_mode = (request.args.get('paging') == 'cursor'
+                   or bool(request.args.get('after') or request.args.get('before')))
+    next_url = prev_url = None
+    if cursor_mode:
+        pg = jobs_page(company, flt, max(1, per_page),
+                       after=request.args.get('after') or '', before=request.args.get('before') or '')
+        page_jobs = jobs_at(company, [pos for pos, _ in pg["items"]])
+        all_ids = [jid or str(pos) for pos, jid in pg["items"]]
+        total_count, pages, page = len(page_jobs), 1, 1
+        base = {k: v for k, v in args_dict.items() if k not in ('page', 'after', 'before')}
+        base['paging'] = 'cursor'
+        if pg["next"]:
+            next_url = url_for('view_jobs', **base, after=pg["next"])
+        if pg["prev"]:
+            prev_url = url_for('view_jobs', **base, before=pg["prev"])
+    else:
+        # 필터 + 최신순 정렬은 (위치, id) 만으로 (보조 색인 / SQLite 인덱스 쿼리), 작업 본문은 현재 페이지만
+        hits = jobs_match(company, flt)
+        total_count = len(hits)
+        pages = max(1, math.ceil(total_count / per_page)) if per_page > 0 else 1
+        page = max(1, min(page, pages))
+        start = (page - 1) * per_page
+        end   = start + per_page
+        page_jobs = jobs_at(company, [pos for pos, _ in hits[start:end]])
+        all_ids = [jid or str(pos) for pos, jid in hits]
+
     def _build_cycle(param, next_val):
         q = args_dict.copy()
         q.pop('overdue', None); q.pop('dues', None)
-        q.pop('page', None)
+        q.pop('page', None); q.pop('after', None); q.pop('before', None)
         if next_val: q[param] = next_val
         else: q.pop(param, None)
         return url_for('view_jobs', **q)
@@ -1247,8 +3214,9 @@ def view_jobs():
     def _onoff(key):
         on  = args_dict.copy(); on[key] = '1'; on.pop('page', None)
         off = args_dict.copy(); off.pop(key, None); off.pop('page', None)
-        on.pop('overdue', None); on.pop('dues', None)
-        off.pop('overdue', None); off.pop('dues', None)
+        for q in (on, off):
+            for k in ('overdue', 'dues', 'after', 'before'):
+                q.pop(k, None)
         return url_for('view_jobs', **on), url_for('view_jobs', **off)
     spare_on_url,  spare_off_url  = _onoff('spare')
     outsrc_on_url, outsrc_off_url = _onoff('outsrc')
@@ -1263,34 +3231,468 @@ def view_jobs():
         outsrc=outsrc, outsrc_on_url=outsrc_on_url, outsrc_off_url=outsrc_off_url,
         status_filter=status_filter, status_label=status_label, status_cycle_url=status_cycle_url,
         pay_filter=pay_filter,       pay_label=pay_label,       pay_cycle_url=pay_cycle_url,
-        owners=owners_list, tenants=tenants_list,
-        all_ids=all_ids
+        owners=owners_list, tenants=tenants_list, company=company,
+        all_ids=all_ids,
+        cursor_mode=cursor_mode, next_url=next_url, prev_url=prev_url
     )
 
+# =========================================================
+# 엑셀 내보내기 엔진 (열 정의 -> 쓰기 전용 시트)
+# =========================================================
+# 네 가지 엑셀(작업목록/매출요약/수입/지출)이 같이 쓴다.
+#  - 열 정의 xcol(머리글, 값 꺼내는 함수, 종류, 최소 너비). 종류: "text"(왼쪽 정렬) / "money"(오른쪽, #,##0)
+#  - 서식은 워크북마다 이름 있는 스타일(_XLSX_STYLES)로 한 번 등록하고, 셀에는 미리 만든 스타일 배열을 복사해 붙인다
+#  - 값은 한 번만 꺼내면서 열 너비도 같이 잰다. 쓰기 전용 시트는 너비를 행보다 먼저 적어야 해서
+#    값 목록을 모았다가 스타일을 붙여 바로 흘려 쓴다(셀 객체를 시트에 쌓지 않는다)
+from copy import copy
+from operator import itemgetter
+
+_XLSX_STYLES = {
+    # 이름: (굵게, 정렬, 숫자 서식)
+    "x_head":    (True,  "center", None),
+    "x_text":    (False, "left",   None),
+    "x_money":   (False, "right",  "#,##0"),
+    "x_text_b":  (True,  "left",   None),
+    "x_right_b": (True,  "right",  None),
+    "x_money_b": (True,  "right",  "#,##0"),
+}
+_XLSX_KIND_STYLE = {"text": "x_text", "money": "x_money"}
+
+def xcol(header: str, get, kind: str = "text", min_width: int = 10) -> dict:
+    return {"header": header, "get": get, "kind": kind, "min_width": min_width}
+
+def _xlsx_workbook():
+    """쓰기 전용 워크북 + 공용 스타일 등록 (openpyxl 이 없으면 ImportError)"""
+    from openpyxl import Workbook
+    from openpyxl.styles import NamedStyle, Font, Border, Side, Alignment
+    wb = Workbook(write_only=True)
+    thin = Side(style='thin')
+    border = Border(left=thin, right=thin, top=thin, bottom=thin)
+    for name, (bold, align, fmt) in _XLSX_STYLES.items():
+        st = NamedStyle(name, border=border, alignment=Alignment(horizontal=align, vertical='center'))
+        if bold:
+            st.font = Font(bold=True)
+        if fmt:
+            st.number_format = fmt
+        wb.add_named_style(st)
+    return wb
+
+def _xlsx_sheet(wb, title: str, cols: list, items, *, bold=None, tail=(), freeze="A2",
+                max_width: int = 60, min_widths: dict = None, progress: bool = False):
+    """
+    cols 대로 items 를 한 시트에 쓴다. bold(item) 이 참인 행은 굵게.
+    tail 은 본문 뒤에 붙일 (값 목록, 스타일 이름 목록) 행들(빈 행은 ([], [])).
+    min_widths 는 열 번호(0부터) -> 최소 너비로 열 정의 값을 덮어쓴다(tail 이 더 넓을 때도).
+    """
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.utils import get_column_letter
+    ncols = max([len(cols)] + [len(v) for v, _ in tail])
+    widths = [0] * ncols
+
+    def _measure(values):
+        for i, v in enumerate(values):
+            s = "" if v is None else str(v)
+            n = max((len(x) for x in s.splitlines()), default=0)   # 줄바꿈이면 가장 긴 줄
+            if n > widths[i]:
+                widths[i] = n
+        return values
+
+    getters = [c["get"] for c in cols]
+    plain = [_XLSX_KIND_STYLE[c["kind"]] for c in cols]
+    strong = [st + "_b" for st in plain]
+    rows = [(_measure([c["header"] for c in cols]), ["x_head"] * len(cols))]
+    for it in items:
+        rows.append((_measure([g(it) for g in getters]), strong if bold and bold(it) else plain))
+    for values, styles in tail:
+        rows.append((_measure(list(values)), styles))
+
+    ws = wb.create_sheet(title)
+    mins = [c["min_width"] for c in cols] + [10] * (ncols - len(cols))
+    for i, w in (min_widths or {}).items():
+        mins[i] = w
+    for i in range(ncols):
+        ws.column_dimensions[get_column_letter(i + 1)].width = max(mins[i], min(max_width, widths[i] + 2))
+    if freeze:
+        ws.freeze_panes = freeze
+
+    # 이름 있는 스타일을 셀마다 찾지 않도록 스타일 배열을 한 번 만들어 복사해 쓴다
+    protos = {}
+    for st in _XLSX_STYLES:
+        c = WriteOnlyCell(ws)
+        c.style = st
+        protos[st] = c._style
+
+    total = len(rows)
+    for k, (values, styles) in enumerate(rows):
+        if progress and k % 1000 == 0:
+            _export_progress(k, total)
+        out = []
+        for v, st in zip(values, styles):
+            c = WriteOnlyCell(ws, value=v)
+            c._style = copy(protos[st])
+            out.append(c)
+        ws.append(out)
+    return ws
+
+# 엑셀 응답: 통째로 메모리에 두지 않고 임시 파일(작으면 메모리)에 저장한 뒤 조금씩 흘려보낸다
+_XLSX_SPOOL_MAX = 8 * 1024 * 1024
+_XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+def _xlsx_stream_response(wb, filename: str) -> Response:
+    import tempfile
+    from urllib.parse import quote
+    tmp = tempfile.SpooledTemporaryFile(max_size=_XLSX_SPOOL_MAX)
+    try:
+        wb.save(tmp)
+        size = tmp.tell()
+        tmp.seek(0)
+    except Exception:
+        tmp.close()
+        raise
+
+    def _chunks():
+        try:
+            while True:
+                buf = tmp.read(64 * 1024)
+                if not buf:
+                    break
+                yield buf
+        finally:
+            tmp.close()
+
+    q = quote(filename)
+    return Response(_chunks(), mimetype=_XLSX_MIME, direct_passthrough=True, headers={
+        "Content-Disposition": f"attachment; filename={q}; filename*=UTF-8''{q}",
+        "Content-Length": str(size),
+    })
+
+# =========================================================
+# 백그라운드 엑셀 내보내기 (큐 + 상태 폴링 + 내려받기)
+# =========================================================
+# 큰 엑셀은 요청 스레드를 몇 초씩 붙잡으므로, 폼에 _async=1 이 오면 작업 풀에 넘기고 바로 상태 URL 을 준다.
+#  - 같은 뷰 함수를 폼/세션을 복사한 요청 컨텍스트에서 그대로 실행 (동기 경로와 결과가 같다)
+#  - 동시에 EXPORT_WORKERS 개만 만들고, 사용자당 대기+실행은 EXPORT_MAX_PER_USER 개까지.
+#    둘 다 프로세스(gunicorn 워커)마다 따로 센다 -> 실제 상한은 (값 x 워커 수)
+#  - 결과 파일과 상태(.json)는 DATA_DIR/_exports 에 두고 EXPORT_TTL 초가 지나면 지운다
+#    (상태 파일이 있어 폴링이 다른 워커 프로세스로 가도 찾을 수 있다. 진행률은 EXPORT_PROGRESS_SAVE_SEC 마다 저장,
+#     대기 순번(position)은 작업을 받은 프로세스의 큐 기준이라 그 프로세스에서만 알려 준다)
+import time
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.datastructures import MultiDict
+
+EXPORT_WORKERS = int(os.environ.get("EXPORT_WORKERS", "2"))
+EXPORT_MAX_PER_USER = int(os.environ.get("EXPORT_MAX_PER_USER", "2"))
+EXPORT_TTL = int(os.environ.get("EXPORT_TTL", "1800"))
+EXPORT_PROGRESS_SAVE_SEC = float(os.environ.get("EXPORT_PROGRESS_SAVE_SEC", "1"))
+
+_EXPORT_POOL = None
+_EXPORT_JOBS = {}      # id -> {"id", "user", "state", "progress", "error", "disposition", "created", "finished"}
+_EXPORT_LOCK = threading.Lock()
+_EXPORT_LOCAL = threading.local()
+_EXPORT_META_KEYS = ("id", "user", "state", "progress", "error", "disposition", "created", "finished")
+
+def _export_dir() -> Path:
+    return DATA_DIR / "_exports"
+
+def _export_pool() -> ThreadPoolExecutor:
+    global _EXPORT_POOL
+    with _EXPORT_LOCK:
+        if _EXPORT_POOL is None:
+            _EXPORT_POOL = ThreadPoolExecutor(max_workers=max(1, EXPORT_WORKERS), thread_name_prefix="export")
+        return _EXPORT_POOL
+
+def _export_meta_save(job: dict):
+    with _EXPORT_LOCK:
+        meta = {k: job.get(k) for k in _EXPORT_META_KEYS}
+    _json_file_save(f"_exports/{meta['id']}.json", meta)
+
+def _export_job(job_id: str, user: str):
+    """id -> 작업 상태(다른 사용자 것이면 None). 이 프로세스에 없으면 상태 파일에서"""
+    with _EXPORT_LOCK:
+        job = _EXPORT_JOBS.get(job_id)
+        if job is not None:
+            job = dict(job)
+    if job is None and re.fullmatch(r"[A-Za-z0-9_-]{8,64}", job_id or ""):
+        try:
+            job = _json_decode((_export_dir() / f"{job_id}.json").read_bytes())
+        except (OSError, ValueError):
+            job = None
+    if not isinstance(job, dict) or job.get("user") != user:
+        return None
+    return job
+
+def _export_progress(done: int, total: int):
+    """엑셀 만드는 쪽에서 진행률을 알린다(백그라운드 작업이 아니면 아무것도 안 함)"""
+    job = getattr(_EXPORT_LOCAL, "job", None)
+    if job is None or total <= 0:
+        return
+    progress = min(99, int(done * 100 / total))
+    if progress == job.get("progress"):
+        return
+    job["progress"] = progress
+    # 다른 워커에서 폴링해도 보이도록 상태 파일에도(너무 자주 쓰지 않게 간격을 둔다)
+    now = time.monotonic()
+    if now - job.get("_saved", 0) >= EXPORT_PROGRESS_SAVE_SEC:
+        job["_saved"] = now
+        _export_meta_save(job)
+
+def _export_cleanup():
+    """끝난 지 EXPORT_TTL 초 지난 작업과 파일(재시작 전에 남은 것 포함)을 지운다"""
+    now = time.time()
+    with _EXPORT_LOCK:
+        for job_id in [k for k, j in _EXPORT_JOBS.items()
+                       if j.get("finished") and now - j["finished"] > EXPORT_TTL]:
+            del _EXPORT_JOBS[job_id]
+        live = set(_EXPORT_JOBS)
+    try:
+        entries = list(os.scandir(_export_dir()))
+    except OSError:
+        return
+    for e in entries:
+        if e.name.split(".", 1)[0] in live:
+            continue
+        try:
+            if now - e.stat().st_mtime > EXPORT_TTL:
+                os.unlink(e.path)
+        except OSError:
+            pass
+
+def _export_error_text(resp) -> str:
+    """엑셀 대신 돌아온 응답(리다이렉트/안내 문구)에서 사용자에게 보일 메시지를 뽑는다"""
+    if resp.status_code in (301, 302, 303, 307, 308):
+        from urllib.parse import urlsplit, parse_qs
+        err = parse_qs(urlsplit(resp.headers.get("Location", "")).query).get("error")
+        return err[0] if err else "로그인 또는 권한을 확인해 주세요."
+    text = resp.get_data(as_text=True).strip()
+    m = re.search(r"alert\((\".*?\")\)", text)
+    if m:
+        try:
+            return json.loads(m.group(1))
+        except ValueError:
+            pass
+    if text and len(text) <= 200 and "<" not in text:
+        return text
+    return "엑셀을 만들지 못했습니다."
+
+def _export_run(job: dict, view, path: str, form: list, sess: dict, kwargs: dict):
+    with _EXPORT_LOCK:
+        job["state"] = "running"
+    _export_meta_save(job)
+    _EXPORT_LOCAL.job = job
+    state, extra = "error", {}
+    try:
+        with app.test_request_context(path, method="POST", data=MultiDict(form)):
+            session.update(sess)
+            resp = app.make_response(view(**kwargs))
+            try:
+                if resp.status_code == 200 and resp.mimetype == _XLSX_MIME:
+                    out = _export_dir() / f"{job['id']}.xlsx"
+                    part = out.with_suffix(".part")
+                    with open(part, "wb") as fh:
+                        for chunk in resp.iter_encoded():
+                            fh.write(chunk)
+                    os.replace(part, out)
+                    state = "done"
+                    extra = {"progress": 100, "disposition": resp.headers.get("Content-Disposition", "")}
+                else:
+                    extra = {"error": _export_error_text(resp)}
+            finally:
+                resp.close()
+    except Exception:
+        app.logger.exception("export %s failed", job["id"])
+        extra = {"error": "엑셀을 만드는 중 오류가 발생했습니다."}
+    finally:
+        _EXPORT_LOCAL.job = None
+        with _EXPORT_LOCK:
+            job.update(state=state, finished=time.time(), **extra)
+        _export_meta_save(job)
+
+def export_async(view):
+    """엑셀 뷰에 붙이면 폼의 _async=1 요청을 백그라운드 큐로 넘기고 202 + 상태 URL(JSON)을 돌려준다"""
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        if request.form.get("_async") != "1":
+            return view(*args, **kwargs)
+        user = session.get("username")
+        if not user:
+            return jsonify(success=False, error="unauthorized"), 401
+        _export_cleanup()
+        with _EXPORT_LOCK:
+            busy = sum(1 for j in _EXPORT_JOBS.values()
+                       if j["user"] == user and j["state"] in ("queued", "running"))
+            if busy >= EXPORT_MAX_PER_USER:
+                return jsonify(success=False,
+                               error="이미 만들고 있는 엑셀이 있습니다. 끝난 뒤에 다시 시도해 주세요."), 429
+            job_id = secrets.token_urlsafe(12)
+            job = _EXPORT_JOBS[job_id] = {"id": job_id, "user": user, "state": "queued", "progress": 0,
+                                          "error": "", "disposition": "", "created": time.time(),
+                                          "finished": None}
+        _export_dir().mkdir(parents=True, exist_ok=True)
+        _export_meta_save(job)
+        form = [(k, v) for k, v in request.form.items(multi=True) if k != "_async"]
+        _export_pool().submit(_export_run, job, view, request.path, form, dict(session), kwargs)
+        return jsonify(success=True, id=job_id,
+                       status_url=url_for("export_status", job_id=job_id)), 202
+    return wrapped
+
+@app.get("/exports/<job_id>", endpoint="export_status")
+def export_status(job_id):
+    user = session.get("username")
+    if not user:
+        return jsonify(success=False, error="unauthorized"), 401
+    _export_cleanup()
+    job = _export_job(job_id, user)
+    if job is None:
+        return jsonify(success=False, error="not_found"), 404
+    out = {"success": True, "id": job_id, "state": job["state"], "progress": job.get("progress") or 0}
+    if job["state"] == "queued":
+        with _EXPORT_LOCK:
+            if job_id in _EXPORT_JOBS:   # 이 프로세스의 큐에 있는 작업만 순번을 안다
+                out["position"] = sum(1 for j in _EXPORT_JOBS.values()
+                                      if j["state"] == "queued" and j["created"] < job["created"])
+    elif job["state"] == "done":
+        out["download_url"] = url_for("export_download", job_id=job_id)
+    elif job["state"] == "error":
+        out["error"] = job.get("error") or ""
+    return jsonify(out)
+
+@app.get("/exports/<job_id>/download", endpoint="export_download")
+def export_download(job_id):
+    user = session.get("username")
+    if not user:
+        return redirect(url_for('login'))
+    job = _export_job(job_id, user)
+    path = _export_dir() / f"{job_id}.xlsx"
+    if job is None or job.get("state") != "done" or not path.exists():
+        return "내려받을 파일이 없습니다(시간이 지나 지워졌을 수 있습니다).", 404
+    resp = send_file(path, mimetype=_XLSX_MIME)
+    resp.headers["Content-Disposition"] = job.get("disposition") or "attachment"
+    return resp
+
+# =========================================================
+# 엑셀 결과 캐시 (같은 조건 + 같은 데이터면 파일만 다시 보낸다)
+# =========================================================
+# 키 = sha256(회사, 내보내기 종류, 정리한 폼 값(열 선택 포함), 오늘 날짜(기본 기간용), 관련 파일들의 데이터 버전).
+# 데이터 버전은 JSON 이면 파일 stat(작업은 저널 포함), SQLite 면 revs 변경 번호라
+# 데이터가 바뀌면 키가 달라져 예전 파일은 자연히 안 쓰이고, 전체 크기가 EXPORT_CACHE_MAX_MB 를 넘으면
+# 가장 오래 안 쓴 것(mtime)부터 지운다. EXPORT_CACHE_MAX_MB=0 이면 끈다.
+EXPORT_CACHE_MAX_MB = int(os.environ.get("EXPORT_CACHE_MAX_MB", "256"))
+
+def _export_cache_dir() -> Path:
+    return DATA_DIR / "_export_cache"
+
+def _data_version(filename: str, company: str):
+    if _use_sqlite():
+        # 공용 KV 파일(users/partners/documents)은 회사 구분 없이 파일 단위로 센다
+        return _sql_rev(filename, "" if filename in SQLITE_KV_FILES else company)
+    if filename == "jobs.json":
+        return _jobs_version(company)
+    return _fin_rows_version(filename, company)
+
+def _export_cache_key(kind: str, files: tuple) -> str:
+    companies = sorted({c for c in (session.get("company"), (get_current_user() or {}).get("company")) if c})
+    form = {}
+    for k, v in request.form.items(multi=True):
+        v = (v or "").strip()
+        if k != "_async" and v:
+            form.setdefault(k, []).append(v)
+    basis = [kind, companies, sorted(form.items()), date.today().isoformat(), _storage_backend(),
+             [[f, c, _data_version(f, c)] for c in companies for f in files]]
+    raw = json.dumps(basis, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def _export_cache_send(path: Path, disposition: str):
+    resp = send_file(path, mimetype=_XLSX_MIME, conditional=False, etag=False)
+    resp.headers["Content-Disposition"] = disposition
+    return resp
+
+def _export_cache_get(key: str):
+    path = _export_cache_dir() / f"{key}.xlsx"
+    try:
+        meta = _json_decode((_export_cache_dir() / f"{key}.json").read_bytes())
+        os.utime(path)   # LRU: 최근에 쓴 표시
+    except (OSError, ValueError):
+        return None
+    return _export_cache_send(path, meta.get("disposition") or "attachment")
+
+def _export_cache_put(key: str, resp):
+    """엑셀 응답을 캐시에 저장하고 저장된 파일로 응답한다"""
+    d = _export_cache_dir()
+    d.mkdir(parents=True, exist_ok=True)
+    path = d / f"{key}.xlsx"
+    disposition = resp.headers.get("Content-Disposition", "attachment")
+    fd, tmp = tempfile.mkstemp(dir=d, prefix=key + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            for chunk in resp.iter_encoded():
+                fh.write(chunk)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    finally:
+        resp.close()
+    _json_file_save(f"_export_cache/{key}.json", {"disposition": disposition})
+    _export_cache_evict(keep=key)
+    return _export_cache_send(path, disposition)
+
+def _export_cache_evict(keep: str = ""):
+    files = []
+    try:
+        for e in os.scandir(_export_cache_dir()):
+            if e.name.endswith(".xlsx"):
+                st = e.stat()
+                files.append((st.st_mtime, st.st_size, e.name[:-5]))
+    except OSError:
+        return
+    total, limit = sum(f[1] for f in files), EXPORT_CACHE_MAX_MB * 1024 * 1024
+    for _, size, key in sorted(files):
+        if total <= limit:
+            break
+        if key == keep:
+            continue
+        for ext in (".xlsx", ".json"):
+            try:
+                os.unlink(_export_cache_dir() / f"{key}{ext}")
+            except OSError:
+                pass
+        total -= size
+
+def export_cached(kind: str, *files: str):
+    """엑셀 뷰 결과를 (조건, 데이터 버전) 키로 디스크에 캐시한다. files 는 결과가 기대는 회사별 파일"""
+    def deco(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            if EXPORT_CACHE_MAX_MB <= 0 or not session.get("username"):
+                return view(*args, **kwargs)
+            key = _export_cache_key(kind, files)
+            hit = _export_cache_get(key)
+            if hit is not None:
+                return hit
+            resp = app.make_response(view(*args, **kwargs))
+            if resp.status_code != 200 or resp.mimetype != _XLSX_MIME:
+                return resp
+            return _export_cache_put(key, resp)
+        return wrapped
+    return deco
+
 @app.post('/export_selected_xlsx')
 @app.post('/jobs/export/xlsx')
+@export_async
+@export_cached("jobs", "jobs.json")
 def export_selected_xlsx():
-    from io import BytesIO
     import datetime as _dt
-    from urllib.parse import quote
     try:
-        import openpyxl
-        from openpyxl.styles import Alignment, Font, Border, Side
-        from openpyxl.utils import get_column_letter
+        import openpyxl  # noqa: F401  (엔진이 쓴다. 없으면 여기서 안내)
     except ImportError:
         return "openpyxl가 없습니다. venv에서 'pip install openpyxl' 실행 후 다시 시도하세요.", 500
 
-    # 1) 선택 인덱스 수집
-    idx_list = request.form.getlist("selected_jobs")
-    indices, _seen = [], set()
-    for x in idx_list:
-        try:
-            i = int(x)
-        except (TypeError, ValueError):
-            continue
-        if i not in _seen:
-            _seen.add(i)
-            indices.append(i)
+    # 1) 선택 작업(id, 예전 방식이면 위치) 수집
+    company = session.get("company")
+    indices = jobs_positions(company, request.form.getlist("selected_jobs"))
     if not indices:
         return "선택된 항목이 없습니다.", 400
 
@@ -1312,10 +3714,11 @@ def export_selected_xlsx():
         "outsource_recv":"외주받음", "outsource_give":"외주줬음", "spare":"스페어"
     }
 
-    # 3) 데이터 로드
-    company = session.get("company")
-    all_jobs = load_json('jobs.json', {}).get(company, [])
-    pick = [all_jobs[i] for i in indices if 0 <= i < len(all_jobs)]
+    # 3) 데이터 로드 + 정렬(최신순, 캐시된 정렬 키)
+    all_jobs, sort_keys = jobs_read_keyed(company)
+    indices = [i for i in indices if 0 <= i < len(all_jobs)]
+    indices.sort(key=sort_keys.__getitem__, reverse=True)
+    pick = [all_jobs[i] for i in indices]
 
     # 기간(파일명용): 폼에서 start/end가 오면 사용, 없으면 선택 항목의 최소/최대 날짜 사용
     def _safe_date(s):
@@ -1331,20 +3734,7 @@ def export_selected_xlsx():
     start_code = (req_start or min_d).strftime('%Y%m%d')
     end_code   = (req_end   or max_d).strftime('%Y%m%d')
 
-    # 4) 정렬
-    def _dt_key(j):
-        d = (j.get('date') or '').strip()
-        t = (j.get('time') or '').strip() or "00:00"
-        try:
-            return _dt.datetime.strptime(f"{d} {t}", "%Y-%m-%d %H:%M")
-        except Exception:
-            try:
-                return _dt.datetime.strptime(d, "%Y-%m-%d")
-            except Exception:
-                return _dt.datetime.min
-    pick.sort(key=_dt_key, reverse=True)
-
-    # 5) 행 생성
+    # 4) 행 생성
     def row_from_job(j):
         amount_man = int(j.get("amount_man") or 0)
         paid_man   = int(j.get("paid_amount_man") or 0)
@@ -1382,114 +3772,31 @@ def export_selected_xlsx():
             "outsource_give": give,
             "spare": "스페어" if j.get("is_spare") else "",
         }
-        return [mapping[c] for c in cols]
-
-    # 6) 엑셀 작성
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "작업목록"
+        return mapping
 
-    # 머리글
-    ws.append([header_map[c] for c in cols])
-    header = ws[1]
-    for c in header:
-        c.font = Font(bold=True)
-        c.alignment = Alignment(horizontal='center', vertical='center')
+    # 6) 엑셀 작성 (열 정의 -> 공용 엔진). 열별 최소 너비(내용 기준 + 최소너비 보정, 최대 70)
+    min_w = {"date": 12, "owner": 22, "tenant": 22, "machine_name": 16, "machine_number": 12,
+             "machine_alias": 10, "worker": 12, "amount_full": 14, "remaining_full": 14,
+             "status": 12, "location": 16, "note": 18, "outsource_recv": 12, "outsource_give": 12,
+             "spare": 8}
+    spec = [xcol(header_map[c], itemgetter(c), "money" if c in ("amount_full", "remaining_full") else "text",
+                 min_w.get(c, 10)) for c in cols]
 
-    # 본문
-    for j in pick:
-        ws.append(row_from_job(j))
-
-    # (요청사항) 화살표 제거: 자동필터 설정하지 않음 (아래 두 줄 모두 없음)
-    # ws.auto_filter.ref = ws.dimensions
-    # ws.auto_filter.add_filter_column(...)
-
-    # 필요하면 헤더 고정만 유지
-    ws.freeze_panes = "A2"
-
-    # 숫자 열 서식/정렬
-    head_to_col = {ws.cell(row=1, column=i).value: i for i in range(1, ws.max_column+1)}
-    right_cols = []
-    for title in ("금액(원)", "잔액(원)"):
-        col = head_to_col.get(title)
-        if col:
-            right_cols.append(col)
-            for r in range(2, ws.max_row+1):
-                cell = ws.cell(row=r, column=col)
-                cell.number_format = "#,##0"
-                cell.alignment = Alignment(horizontal='right', vertical='center')
-
-    # 나머지는 좌측 정렬
-    for r in range(2, ws.max_row+1):
-        for c in range(1, ws.max_column+1):
-            if c not in right_cols:
-                ws.cell(row=r, column=c).alignment = Alignment(horizontal='left', vertical='center')
-
-    # 테두리(지출엑셀과 동일한 얇은 테두리)
-    thin = Border(left=Side(style='thin'), right=Side(style='thin'),
-                  top=Side(style='thin'),  bottom=Side(style='thin'))
-    for r in ws.iter_rows(min_row=1, max_row=ws.max_row, min_col=1, max_col=ws.max_column):
-        for cell in r:
-            cell.border = thin
-
-    # 자동 열 너비(내용 기준 + 최소너비 보정)
-    def _autofit_worksheet(ws, min_widths=None, max_width=60):
-        min_widths = min_widths or {}
-        for col_idx in range(1, ws.max_column + 1):
-            letter = get_column_letter(col_idx)
-            max_len = 0
-            for cell in ws[letter]:
-                val = "" if cell.value is None else str(cell.value)
-                # 줄바꿈 고려(가장 긴 줄 기준)
-                max_len = max(max_len, max((len(x) for x in val.splitlines()), default=0))
-            target = max(min_widths.get(col_idx, 10), min(max_width, max_len + 2))
-            ws.column_dimensions[letter].width = target
-
-    # 헤더명 -> 열번호 매핑으로 최소너비 지정
-    minw = {}
-    def set_min(header_text, w):
-        col = head_to_col.get(header_text)
-        if col: minw[col] = w
-
-    set_min("날짜", 12)
-    set_min("원수급자", 22)
-    set_min("임차인", 22)
-    set_min("장비명", 16)
-    set_min("차량번호", 12)
-    set_min("별칭", 10)
-    set_min("기사", 12)
-    set_min("금액(원)", 14)
-    set_min("잔액(원)", 14)
-    set_min("작업상태", 12)
-    set_min("위치", 16)
-    set_min("요청사항", 18)
-    set_min("외주받음", 12)
-    set_min("외주줬음", 12)
-    set_min("스페어", 8)
-
-    _autofit_worksheet(ws, min_widths=minw, max_width=70)
+    wb = _xlsx_workbook()
+    # (요청사항) 화살표 제거: 자동필터 설정하지 않음. 헤더 고정만 유지
+    _xlsx_sheet(wb, "작업목록", spec, [row_from_job(j) for j in pick], max_width=70, progress=True)
 
     # 7) 다운로드
-    bio = BytesIO()
-    wb.save(bio); bio.seek(0)
-
-    filename = f"작업목록 {start_code}_{end_code}.xlsx"
-    q = quote(filename)
-    return Response(
-        bio.getvalue(),
-        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={q}; filename*=UTF-8''{q}"}
-    )
+    return _xlsx_stream_response(wb, f"작업목록 {start_code}_{end_code}.xlsx")
 
 @app.route('/add_job', methods=['GET', 'POST'])
 @perm_required('manage_jobs')
 def add_job():
-    users_db = load_json('users.json', {})
     username = session.get('username')
-    company = users_db.get(username, {}).get('company', '')
+    company = get_current_user().get('company', '')
 
-    workers   = load_json('workers.json',   {}).get(company, [])
-    machines  = load_json('machines.json',  {}).get(company, [])
+    workers   = workers_read(company)
+    machines  = machines_read(company)
     locations = load_json('locations.json', {}).get(company, [])
     partners  = load_partners(company)
     owners    = partners.get('owners', [])
@@ -1515,11 +3822,12 @@ def add_job():
         if request.form.get('same_as_owner'):
             client_tenant = client_primary
 
+        new_owners, new_tenants = [], []
         if request.form.get('save_owner') == '1' and client_primary and client_primary not in owners:
-            owners.append(client_primary)
+            owners.append(client_primary); new_owners.append(client_primary)
         if request.form.get('save_tenant') == '1' and client_tenant and client_tenant not in tenants:
-            tenants.append(client_tenant)
-        save_partners(company, owners, tenants)
+            tenants.append(client_tenant); new_tenants.append(client_tenant)
+        add_partners(company, new_owners, new_tenants)
 
         location = (request.form.get('location_input') or request.form.get('location') or '').strip()
         note     = (request.form.get('note') or '').strip()
@@ -1585,19 +3893,16 @@ def add_job():
         }
 
         try:
-            locdb = load_json('locations.json', {})
-            locs = locdb.get(company, [])
             if location:
-                locs = [location] + [x for x in locs if x != location]
-                locs = locs[:20]
-                locdb[company] = locs
-                save_json('locations.json', locdb)
+                def _push_location(locdb):
+                    locs = [location] + [x for x in locdb.get(company, []) if x != location]
+                    locdb[company] = locs[:20]
+                update_json('locations.json', _push_location)
         except Exception:
             pass
 
-        jobs_db = load_json('jobs.json', {})
-        jobs_db.setdefault(company, []).append(new_job)
-        save_json('jobs.json', jobs_db)
+        jobs_add(company, new_job)
+        outsourcing_touch(company, new_job)
 
         return render_template(
             'add_job.html',
@@ -1611,21 +3916,19 @@ def add_job():
                            workers=workers, machines=machines, locations=locations,
                            owners=owners, tenants=tenants, prev={}, job_registered=False)
 
-@app.route('/edit_job/<int:job_index>', methods=['GET', 'POST'])
+@app.route('/edit_job/<job_id>', methods=['GET', 'POST'])
 @perm_required('manage_jobs')
-def edit_job(job_index):
+def edit_job(job_id):
     username = session['username']
-    users_db = load_json('users.json', {})
-    company  = users_db.get(username, {}).get('company')
+    company  = get_current_user().get('company')
 
-    jobs_db  = load_json('jobs.json', {})
-    job_list = jobs_db.get(company, [])
-    if not (0 <= job_index < len(job_list)):
+    job_index, job = job_lookup(company, job_id)
+    if job is None:
         return "작업을 찾을 수 없습니다.", 404
-    job = job_list[job_index]
+    before = dict(job)
 
-    machines  = load_json('machines.json',  {}).get(company, [])
-    workers   = load_json('workers.json',   {}).get(company, [])
+    machines  = machines_read(company)
+    workers   = workers_read(company)
     locations = load_json('locations.json', {}).get(company, [])
     partners  = load_partners(company)
     owners    = partners.get('owners', [])
@@ -1652,11 +3955,12 @@ def edit_job(job_index):
         job['client_tenant']  = client_tenant
         job['client']         = client_primary
 
+        new_owners, new_tenants = [], []
         if request.form.get('save_owner') == '1' and client_primary and client_primary not in owners:
-            owners.append(client_primary)
+            owners.append(client_primary); new_owners.append(client_primary)
         if request.form.get('save_tenant') == '1' and client_tenant and client_tenant not in tenants:
-            tenants.append(client_tenant)
-        save_partners(company, owners, tenants)
+            tenants.append(client_tenant); new_tenants.append(client_tenant)
+        add_partners(company, new_owners, new_tenants)
 
         job['location'] = (request.form.get('location') or '').strip()
         job['note']     = (request.form.get('note') or '').strip()
@@ -1691,7 +3995,12 @@ def edit_job(job_index):
         job['duration_type']  = (request.form.get('duration_type') or '하루').strip()
         job['duration_hours'] = (request.form.get('duration_hours') or '').strip() if job['duration_type'] == 'N시간' else ''
 
-        save_json('jobs.json', jobs_db)
+        with jobs_lock(company):
+            job_index, _ = job_lookup(company, job_id)   # 그사이 다른 삭제로 위치가 바뀌었을 수 있음
+            if job_index is None:
+                return "작업을 찾을 수 없습니다.", 404
+            jobs_set(company, {job_index: {k: v for k, v in job.items() if before.get(k, object()) != v}})
+        outsourcing_touch(company, before, job)
 
         params = {}
         for k, v in request.form.items():
@@ -1700,159 +4009,152 @@ def edit_job(job_index):
         return redirect(url_for('view_jobs', **params))
 
     return render_template('edit_job.html',
-                           job=job, job_index=job_index,
+                           job=job, job_index=job_index, job_id=job.get('id') or job_index,
                            machines=machines, workers=workers, locations=locations,
                            owners=owners, tenants=tenants)
 
-@app.route('/delete_job/<int:job_index>')
+@app.route('/delete_job/<job_id>', methods=['POST'])
 @perm_required('manage_jobs')
-def delete_job(job_index):
+def delete_job(job_id):
     username = session['username']
-    users_db = load_json('users.json', {})
-    company = users_db.get(username, {}).get('company', '')
-
-    jobs_db = load_json('jobs.json', {})
-    job_list = jobs_db.get(company, [])
-    if not (0 <= job_index < len(job_list)):
-        return "작업을 찾을 수 없습니다.", 404
-
-    job_list.pop(job_index)
-    save_json('jobs.json', jobs_db)
+    company = get_current_user().get('company', '')
+
+    with jobs_lock(company):
+        job_index, job = job_lookup(company, job_id)
+        if job_index is None:
+            return "작업을 찾을 수 없습니다.", 404
+        jobs_delete(company, [job_index])
+    outsourcing_touch(company, job)
     return redirect(url_for('view_jobs', **request.args))
 
 @app.route('/bulk_action', methods=['POST'])
 @perm_required('manage_jobs')
 def bulk_action():
     action = request.form.get('action', '').strip()
-    try:
-        selected = [int(x) for x in request.form.getlist('selected_jobs')]
-    except ValueError:
-        selected = []
 
-    users_db = load_json('users.json', {})
-    user = users_db.get(session['username'], {})
+    user = get_current_user()
     company = user.get('company', '')
 
-    db = load_json('jobs.json', {})
-    jobs = db.get(company, [])
-
-    if action == 'complete':
-        for idx in selected:
-            if 0 <= idx < len(jobs):
-                jobs[idx]['status'] = '완료'
-    elif action == 'delete':
-        for idx in sorted(set(selected), reverse=True):
-            if 0 <= idx < len(jobs):
-                jobs.pop(idx)
+    removed = []
+    with jobs_lock(company):
+        selected = jobs_positions(company, request.form.getlist('selected_jobs'))
 
-    db[company] = jobs
-    save_json('jobs.json', db)
+        if action == 'complete':
+            jobs_set(company, {idx: {'status': '완료'} for idx in selected})
+        elif action == 'delete':
+            removed = jobs_at(company, selected)
+            jobs_delete(company, selected)
+    outsourcing_touch(company, *removed)
     return redirect(url_for('view_jobs'))
 
-@app.route('/export_selected', methods=['POST'])
+_EXPORT_CSV_HEADER = [
+    'index','date','time','worker',
+    'machine_name','machine_number','machine_alias',
+    'client_primary','client_tenant','location',
+    'status','duration_type','duration_hours',
+    'amount_man','share_amount',
+    'outsource_type','outsource_partner',
+    'payment_status','paid_amount_man','id'
+]
+
+def _export_csv_row(idx: int, j: dict) -> list:
+    return [
+        idx,
+        j.get('date',''),
+        j.get('time',''),
+        j.get('worker',''),
+        j.get('machine_name',''),
+        j.get('machine_number',''),
+        j.get('machine_alias',''),
+        (j.get('client_primary') or j.get('client','')),
+        j.get('client_tenant',''),
+        j.get('location',''),
+        j.get('status',''),
+        j.get('duration_type',''),
+        j.get('duration_hours',''),
+        int(j.get('amount_man') or 0),
+        'Y' if j.get('share_amount') else '',
+        j.get('outsource_type',''),
+        j.get('outsource_partner',''),
+        j.get('payment_status',''),
+        int(j.get('paid_amount_man') or 0),
+        j.get('id',''),
+    ]
+
+def _export_csv_stream(company: str, positions: list, chunk: int = 500):
+    """BOM -> 머리글 -> 작업 chunk 건씩(그만큼만 읽어서) CSV 문자열 조각으로 내보낸다"""
+    buf = StringIO()
+    writer = csv.writer(buf)
+    buf.write('\ufeff')
+    writer.writerow(_EXPORT_CSV_HEADER)
+    for k in range(0, len(positions), chunk):
+        for j in jobs_at(company, positions[k:k + chunk]):
+            writer.writerow(_export_csv_row(j["_idx"], j))
+        yield buf.getvalue()
+        buf.seek(0); buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+@app.route('/export_selected', methods=['GET', 'POST'])
 @perm_required('manage_jobs')
 def export_selected():
-    users_db = load_json('users.json', {})
-    user = users_db.get(session['username'], {})
+    """
+    작업 CSV. 기본은 선택한 작업(selected_jobs), scope=all 이면 작업 목록과 같은 필터
+    (worker/owner/tenant/date/date_from/date_to/status/pay/spare/outsrc)에 맞는 작업 전체를 최신순으로.
+    """
+    user = get_current_user()
     company = user.get('company', '')
 
-    try:
-        selected = [int(x) for x in request.form.getlist('selected_jobs')]
-    except ValueError:
-        selected = []
-    if not selected:
-        return back_with_error("선택된 작업이 없습니다.")
-
-    db = load_json('jobs.json', {})
-    jobs = db.get(company, [])
-
-    rows = []
-    for idx in selected:
-        if 0 <= idx < len(jobs):
-            j = jobs[idx]
-            rows.append([
-                idx,
-                j.get('date',''),
-                j.get('time',''),
-                j.get('worker',''),
-                j.get('machine_name',''),
-                j.get('machine_number',''),
-                j.get('machine_alias',''),
-                (j.get('client_primary') or j.get('client','')),
-                j.get('client_tenant',''),
-                j.get('location',''),
-                j.get('status',''),
-                j.get('duration_type',''),
-                j.get('duration_hours',''),
-                int(j.get('amount_man') or 0),
-                'Y' if j.get('share_amount') else '',
-                j.get('outsource_type',''),
-                j.get('outsource_partner',''),
-                j.get('payment_status',''),
-                int(j.get('paid_amount_man') or 0),
-            ])
-
-    if not rows:
-        return back_with_error("선택된 작업이 없습니다.")
-
-    filename = f"jobs_selected_{_dt.datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-    s = StringIO(); s.write('\ufeff')
-    writer = csv.writer(s)
-    writer.writerow([
-        'index','date','time','worker',
-        'machine_name','machine_number','machine_alias',
-        'client_primary','client_tenant','location',
-        'status','duration_type','duration_hours',
-        'amount_man','share_amount',
-        'outsource_type','outsource_partner',
-        'payment_status','paid_amount_man'
-    ])
-    writer.writerows(rows)
-    data = s.getvalue()
+    if (request.values.get('scope') or '').strip() == 'all':
+        selected = [pos for pos, _ in jobs_match(company, _jobs_list_filter(request.values))]
+        filename = f"jobs_all_{_dt.datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    else:
+        if request.method != 'POST':
+            return back_with_error("선택된 작업이 없습니다.")
+        selected = jobs_positions(company, request.form.getlist('selected_jobs'))
+        if not selected:
+            return back_with_error("선택된 작업이 없습니다.")
+        filename = f"jobs_selected_{_dt.datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
 
     return Response(
-        data,
+        _export_csv_stream(company, selected),
         mimetype='text/csv; charset=utf-8',
         headers={'Content-Disposition': f'attachment; filename="{filename}"'}
     )
 
-@app.route('/api/toggle_complete/<int:job_index>', methods=['POST'])
-def toggle_complete_api(job_index):
+@app.route('/api/toggle_complete/<job_id>', methods=['POST'])
+def toggle_complete_api(job_id):
     if 'username' not in session:
         return jsonify(success=False, error='unauthorized'), 401
 
-    users_db = load_json('users.json', {})
-    user = users_db.get(session['username'], {})
+    user = get_current_user()
     company = user.get('company', '')
     role = (user.get('role') or '').strip()
     username = session['username']
 
-    db = load_json('jobs.json', {})
-    jobs = db.get(company, [])
-    if not (0 <= job_index < len(jobs)):
-        return jsonify(success=False, error='index_out_of_range'), 400
-
-    if role == 'worker' and (jobs[job_index].get('worker') or '') != username:
-        return jsonify(success=False, error='forbidden'), 403
+    with jobs_lock(company):
+        job_index, job = job_lookup(company, job_id)
+        if job is None:
+            return jsonify(success=False, error='not_found'), 404
 
-    cur = (jobs[job_index].get('status') or '진행중').strip()
-    new_status = '완료' if cur != '완료' else '진행중'
-    jobs[job_index]['status'] = new_status
+        if role == 'worker' and (job.get('worker') or '') != username:
+            return jsonify(success=False, error='forbidden'), 403
 
-    db[company] = jobs
-    save_json('jobs.json', db)
+        cur = (job.get('status') or '진행중').strip()
+        new_status = '완료' if cur != '완료' else '진행중'
+        jobs_set(company, {job_index: {'status': new_status}})
     return jsonify(success=True, status=new_status)
 
 # 캘린더
 @app.route('/calendar')
+@etag_cached("jobs.json")
 def calendar_view():
     if 'username' not in session:
         return redirect(url_for('login'))
 
-    users_db = load_json('users.json', {})
-    user = users_db.get(session['username'], {})
+    user = get_current_user()
     company = user.get('company', '')
-    jobs = load_json('jobs.json', {}).get(company, [])
+    jobs = jobs_read(company)
 
     total_count = len(jobs)
     complete_count = sum(1 for j in jobs if (j.get('status') or '').strip() == '완료')
@@ -1883,46 +4185,41 @@ def calendar_view():
         events=json.dumps(events, ensure_ascii=False)
     )
 
-@app.route('/api/payment/<int:job_index>', methods=['POST'], endpoint='payment_api')
+@app.route('/api/payment/<job_id>', methods=['POST'], endpoint='payment_api')
 @perm_required('manage_payments')
-def payment_api(job_index):
-    users_db = load_json('users.json', {})
-    user = users_db.get(session['username'], {})
+def payment_api(job_id):
+    user = get_current_user()
     company = user.get('company', '')
 
-    db = load_json('jobs.json', {})
-    jobs = db.get(company, [])
-    if not (0 <= job_index < len(jobs)):
-        return jsonify(success=False, error='index_out_of_range'), 400
-
-    job = jobs[job_index]
-    amount = int(job.get('amount_man') or 0)
-    paid   = int(job.get('paid_amount_man') or 0)
-
-    data = request.get_json(silent=True) or {}
-    action = (data.get('action') or '').strip()
-
-    if action == 'full':
-        if amount <= 0: return jsonify(success=False, error='no_amount'), 400
-        paid = amount; status = '완납'
-    elif action == 'unpay':
-        paid = 0; status = '미납' if amount > 0 else '미설정'
-    elif action == 'partial':
-        if amount <= 0: return jsonify(success=False, error='no_amount'), 400
-        try: add = int(data.get('amount_man'))
-        except (TypeError, ValueError):
-            return jsonify(success=False, error='invalid_amount'), 400
-        paid = max(0, min(amount, paid + add))
-        if paid == 0: status = '미납'
-        elif paid >= amount: status = '완납'
-        else: status = '부분'
-    else:
-        return jsonify(success=False, error='invalid_action'), 400
+    with jobs_lock(company):
+        job_index, job = job_lookup(company, job_id)
+        if job is None:
+            return jsonify(success=False, error='not_found'), 404
+
+        amount = int(job.get('amount_man') or 0)
+        paid   = int(job.get('paid_amount_man') or 0)
+
+        data = request.get_json(silent=True) or {}
+        action = (data.get('action') or '').strip()
+
+        if action == 'full':
+            if amount <= 0: return jsonify(success=False, error='no_amount'), 400
+            paid = amount; status = '완납'
+        elif action == 'unpay':
+            paid = 0; status = '미납' if amount > 0 else '미설정'
+        elif action == 'partial':
+            if amount <= 0: return jsonify(success=False, error='no_amount'), 400
+            try: add = int(data.get('amount_man'))
+            except (TypeError, ValueError):
+                return jsonify(success=False, error='invalid_amount'), 400
+            paid = max(0, min(amount, paid + add))
+            if paid == 0: status = '미납'
+            elif paid >= amount: status = '완납'
+            else: status = '부분'
+        else:
+            return jsonify(success=False, error='invalid_action'), 400
 
-    job['paid_amount_man'] = paid
-    job['payment_status']  = status
-    db[company] = jobs
-    save_json('jobs.json', db)
+        jobs_set(company, {job_index: {'paid_amount_man': paid, 'payment_status': status}})
 
     remaining = max(0, amount - paid)
     return jsonify(success=True, payment_status=status, remaining=remaining,
@@ -1931,14 +4228,21 @@ def payment_api(job_index):
 # =========================================================
 # 직원/장비/거래처/회사 (원기능 유지)
 # =========================================================
+def _worker_patch(company: str, username: str, fields: dict):
+    """workers.json 의 해당 기사 항목에 fields 반영(잠금 안에서 다시 읽어 수정)"""
+    def fn(lst):
+        for w in lst:
+            if w.get('username') == username:
+                w.update(fields)
+                break
+    workers_update(company, fn)
+
 @app.route('/add_worker', methods=['GET', 'POST'])
 @perm_required('manage_workers')
 def add_worker():
-    users_db = load_json('users.json', {})
-    company = users_db.get(session['username'], {}).get('company', '')
+    company = get_current_user().get('company', '')
 
-    workers_db = load_json('workers.json', {})
-    workers = workers_db.get(company, [])
+    workers = workers_read(company)
 
     if request.method == 'POST':
         name  = (request.form.get('name')  or '').strip()
@@ -1961,21 +4265,19 @@ def add_worker():
             "role": "worker",
             "status": "active"
         }
-        workers.append(new_worker)
-        workers_db[company] = workers
-        save_json('workers.json', workers_db)
+        workers_update(company, lambda rows: rows.append(new_worker))
 
-        udb = load_json('users.json', {})
         default_pw = (phone[-4:] if len(phone) >= 4 else phone) or "0000"
-        udb[username] = {
-            'password': udb.get(username, {}).get('password', default_pw),
-            'role': 'worker',
-            'company': company,
-            'name': name,
-            'phone': phone,
-            'status': 'active'
-        }
-        save_json('users.json', udb)
+        def _put_user(udb):
+            udb[username] = {
+                'password': udb.get(username, {}).get('password', default_pw),
+                'role': 'worker',
+                'company': company,
+                'name': name,
+                'phone': phone,
+                'status': 'active'
+            }
+        update_json('users.json', _put_user)
 
         return redirect_with_from('add_worker')
 
@@ -1990,11 +4292,9 @@ def manage_machines_alias():
 @app.route('/add_machine', methods=['GET', 'POST'])
 @perm_required('manage_machines')
 def add_machine():
-    users_db = load_json('users.json', {})
-    company = users_db[session['username']]['company']
+    company = get_current_user().get('company', '')
 
-    machines_db = load_json('machines.json', {})
-    machines = machines_db.get(company, [])
+    machines = machines_read(company)
     error = None
 
     if request.method == 'POST':
@@ -2010,9 +4310,7 @@ def add_machine():
             elif any(m.get('number') == number for m in machines):
                 error = f"차량번호 {number} 는 이미 등록되어 있습니다."
             else:
-                machines.append({'name': name, 'number': number, 'alias': alias})
-                machines_db[company] = machines
-                save_json('machines.json', machines_db)
+                machines_update(company, lambda rows: rows.append({'name': name, 'number': number, 'alias': alias}))
                 return redirect_with_from('add_machine')
 
         elif action == 'edit_save':
@@ -2020,19 +4318,22 @@ def add_machine():
                 idx = int(request.form.get('edit_idx', '-1'))
             except ValueError:
                 idx = -1
-            if 0 <= idx < len(machines):
-                machines[idx]['name'] = request.form.get('machine_name', '').strip()
-                machines[idx]['number'] = request.form.get('machine_number', '').strip()
-                machines[idx]['alias'] = request.form.get('machine_alias', '').strip()
-                machines_db[company] = machines
-                save_json('machines.json', machines_db)
+            fields = {
+                'name': request.form.get('machine_name', '').strip(),
+                'number': request.form.get('machine_number', '').strip(),
+                'alias': request.form.get('machine_alias', '').strip(),
+            }
+            def _edit(rows):
+                if 0 <= idx < len(rows):
+                    rows[idx].update(fields)
+            machines_update(company, _edit)
             return redirect_with_from('add_machine')
 
         elif action == 'delete':
             number = request.form.get('machine_number', '').strip()
-            machines = [m for m in machines if m.get('number') != number]
-            machines_db[company] = machines
-            save_json('machines.json', machines_db)
+            def _drop(rows):
+                rows[:] = [m for m in rows if m.get('number') != number]
+            machines_update(company, _drop)
             return redirect_with_from('add_machine')
 
     edit_machine = None
@@ -2056,10 +4357,9 @@ def add_machine():
 @perm_required('manage_workers')
 def manage_workers():
     company = session['company']
-    workers_db = load_json('workers.json', {})
     users_db = load_json('users.json', {})
 
-    workers = workers_db.get(company, [])
+    workers = workers_read(company)
     for w in workers:
         user_info = users_db.get(w['username'])
         w['role'] = (user_info or {}).get('role', 'worker')
@@ -2068,31 +4368,28 @@ def manage_workers():
 @app.route('/approve_worker/<username>', methods=['POST'])
 @perm_required('approve_workers')
 def approve_worker(username):
-    users = load_json('users.json', {})
-    workers_db = load_json('workers.json', {})
-    company = load_json('users.json', {}).get(session['username'], {}).get('company','')
+    company = get_current_user().get('company','')
 
-    u = users.get(username)
-    if not u:
+    def _approve(users):
+        u = users.get(username)
+        if not u:
+            return None
+        u['status'] = 'active'
+        pending = dict(u.get('pending_update') or {})
+        if 'phone' in pending and pending['phone']:
+            u['phone'] = pending['phone']
+            u.pop('pending_update', None)
+        return u.get('company','') or company, pending
+
+    res = update_json('users.json', _approve)
+    if res is None:
         return back_with_error("사용자 정보를 찾을 수 없습니다.")
+    target_company, pending = res
 
-    u['status'] = 'active'
-    pending = (u.get('pending_update') or {})
+    fields = {'status': 'active'}
     if 'phone' in pending and pending['phone']:
-        u['phone'] = pending['phone']
-        u.pop('pending_update', None)
-
-    lst = workers_db.get(u.get('company','') or company, [])
-    for w in lst:
-        if w.get('username') == username:
-            w['status'] = 'active'
-            if 'phone' in pending and pending['phone']:
-                w['phone'] = pending['phone']
-            break
-    workers_db[u.get('company','') or company] = lst
-
-    save_json('users.json', users)
-    save_json('workers.json', workers_db)
+        fields['phone'] = pending['phone']
+    _worker_patch(target_company, username, fields)
     return redirect_with_from('add_worker')
 
 @app.route('/delete_worker', methods=['POST'])
@@ -2103,17 +4400,12 @@ def delete_worker(username=None):
     if not username:
         return back_with_error('add_worker', '대상 사용자를 찾을 수 없습니다.')
 
-    users = load_json('users.json', {})
-    workers_db = load_json('workers.json', {})
-    company = load_json('users.json', {}).get(session['username'], {}).get('company','')
-
-    lst = workers_db.get(company, [])
-    workers_db[company] = [w for w in lst if w.get('username') != username]
-    if username in users:
-        users.pop(username, None)
+    company = get_current_user().get('company','')
 
-    save_json('workers.json', workers_db)
-    save_json('users.json', users)
+    def _drop(lst):
+        lst[:] = [w for w in lst if w.get('username') != username]
+    workers_update(company, _drop)
+    update_json('users.json', lambda users: users.pop(username, None))
     return redirect_with_from('add_worker')
 
 @app.route('/grant_manager', methods=['POST'])
@@ -2124,9 +4416,8 @@ def grant_manager(username=None):
     if not username:
         return back_with_error('add_worker', '대상 사용자를 찾을 수 없습니다.')
 
-    users = load_json('users.json', {})
-    workers_db = load_json('workers.json', {})
-    company = load_json('users.json', {}).get(session['username'], {}).get('company','')
+    company = get_current_user().get('company','')
+    workers_db = {company: workers_read(company)}
 
     def ensure_user_entry(users_db, workers_db, company, username):
         if username in users_db:
@@ -2149,18 +4440,16 @@ def grant_manager(username=None):
         }
         return users_db[username]
 
-    u = ensure_user_entry(users, workers_db, company, username)
-    if not u:
-        return back_with_error('add_worker', '사용자 정보를 찾을 수 없습니다.')
-
-    u['role'] = 'manager'
-    for w in workers_db.get(company, []):
-        if w.get('username') == username:
-            w['role'] = 'manager'
-            break
+    def _grant(users):
+        u = ensure_user_entry(users, workers_db, company, username)
+        if not u:
+            return False
+        u['role'] = 'manager'
+        return True
 
-    save_json('users.json', users)
-    save_json('workers.json', workers_db)
+    if not update_json('users.json', _grant):
+        return back_with_error('add_worker', '사용자 정보를 찾을 수 없습니다.')
+    _worker_patch(company, username, {'role': 'manager'})
     return redirect_with_from('add_worker')
 
 @app.route('/revoke_manager', methods=['POST'])
@@ -2171,33 +4460,26 @@ def revoke_manager(username=None):
     if not username:
         return back_with_error('add_worker', '대상 사용자를 찾을 수 없습니다.')
 
-    users = load_json('users.json', {})
-    workers_db = load_json('workers.json', {})
-    company = load_json('users.json', {}).get(session['username'], {}).get('company','')
-
-    if username not in users:
-        return back_with_error('add_worker', '사용자 정보를 찾을 수 없습니다.')
-    if users[username].get('role') == 'boss':
-        return back_with_error('add_worker', '사장 권한은 해제할 수 없습니다.')
+    company = get_current_user().get('company','')
 
-    users[username]['role'] = 'worker'
-    for w in workers_db.get(company, []):
-        if w.get('username') == username:
-            w['role'] = 'worker'
-            break
+    def _revoke(users):
+        if username not in users:
+            return '사용자 정보를 찾을 수 없습니다.'
+        if users[username].get('role') == 'boss':
+            return '사장 권한은 해제할 수 없습니다.'
+        users[username]['role'] = 'worker'
 
-    save_json('users.json', users)
-    save_json('workers.json', workers_db)
+    err = update_json('users.json', _revoke)
+    if err:
+        return back_with_error('add_worker', err)
+    _worker_patch(company, username, {'role': 'worker'})
     return redirect_with_from('add_worker')
 
 @app.route('/update_worker/<username>', methods=['GET', 'POST'])
 @perm_required('manage_workers')
 def update_worker(username):
     company = session['company']
-    users_db = load_json('users.json', {})
-    workers_db = load_json('workers.json', {})
-
-    user = users_db.get(username)
+    user = user_get(username)
     if not user or user.get('company') != company:
         return redirect('/manage_workers')
 
@@ -2207,17 +4489,11 @@ def update_worker(username):
     if request.method == 'POST':
         name = (request.form.get('name') or '').strip()
         phone = (request.form.get('phone') or '').strip()
-        if name:  user['name'] = name
-        if phone: user['phone'] = phone
-        save_json('users.json', users_db)
-
-        for w in workers_db.get(company, []):
-            if w.get('username') == username:
-                if name:  w['name'] = name
-                if phone: w['phone'] = phone
-                break
-        workers_db[company] = workers_db.get(company, [])
-        save_json('workers.json', workers_db)
+        fields = {}
+        if name:  fields['name'] = name
+        if phone: fields['phone'] = phone
+        update_json('users.json', lambda users: users.get(username, {}).update(fields))
+        _worker_patch(company, username, fields)
         return redirect('/manage_workers')
 
     return render_template('update_worker.html', user=user)
@@ -2239,23 +4515,27 @@ def manage_clients():
         if kind not in ('primary', 'tenant') or action not in ('add', 'delete'):
             return redirect_with_from('manage_clients')
 
-        lst = owners if kind == 'primary' else tenants
-        if action == 'add':
-            if name and name not in lst:
-                lst.append(name)
-        elif action == 'delete':
-            idx = request.form.get('idx')
-            if idx not in (None, ''):
-                try:
-                    i = int(idx)
-                    if 0 <= i < len(lst):
-                        lst.pop(i)
-                except ValueError:
-                    pass
-            elif name in lst:
-                lst.remove(name)
-
-        save_partners(company, owners, tenants)
+        with data_lock('partners.json'):
+            entry   = load_partners(company)
+            owners  = entry.get('owners', [])
+            tenants = entry.get('tenants', [])
+            lst = owners if kind == 'primary' else tenants
+            if action == 'add':
+                if name and name not in lst:
+                    lst.append(name)
+            elif action == 'delete':
+                idx = request.form.get('idx')
+                if idx not in (None, ''):
+                    try:
+                        i = int(idx)
+                        if 0 <= i < len(lst):
+                            lst.pop(i)
+                    except ValueError:
+                        pass
+                elif name in lst:
+                    lst.remove(name)
+
+            save_partners(company, owners, tenants)
         return redirect_with_from('manage_clients')
 
     return render_template('manage_clients.html', owners=owners, tenants=tenants)
@@ -2264,8 +4544,7 @@ def manage_clients():
 @perm_required('manage_roles')
 def company_info():
     username = session['username']
-    users_db = load_json('users.json', {})
-    user = users_db.get(username, {})
+    user = get_current_user()
 
     if user.get('role') != 'boss':
         return "권한이 없습니다.", 403
@@ -2283,28 +4562,37 @@ def company_info():
         new_password = request.form['password']
         new_company_code = request.form['company_code']
 
-        if len(new_company_code) != 6:
-            error = '회사 코드는 6자리여야 합니다.'
-        elif new_company_name != company and new_company_name in companies:
-            error = '이미 존재하는 회사명입니다.'
-        else:
-            if new_company_name != company:
-                moved = companies.pop(company, {})
-                companies[new_company_name] = moved
-                users_db[username]['company'] = new_company_name
-                company = new_company_name
+        # 잠금 순서: companies.json -> users.json
+        def _save_company(companies):
+            if new_company_name != company and new_company_name in companies:
+                return None
 
-            users_db[username]['phone'] = new_phone
-            if new_password.strip():
-                users_db[username]['password'] = new_password
-            save_json('users.json', users_db)
+            def _save_user(users_db):
+                if new_company_name != company:
+                    users_db[username]['company'] = new_company_name
+                users_db[username]['phone'] = new_phone
+                if new_password.strip():
+                    users_db[username]['password'] = new_password
+            update_json('users.json', _save_user)
 
-            companies.setdefault(company, {})
-            companies[company]['phone'] = new_phone
-            companies[company]['code'] = new_company_code
-            save_json('companies.json', companies)
+            if new_company_name != company:
+                companies[new_company_name] = companies.pop(company, {})
+            companies.setdefault(new_company_name, {})
+            companies[new_company_name]['phone'] = new_phone
+            companies[new_company_name]['code'] = new_company_code
+            return new_company_name
 
-            success = '회사 정보가 성공적으로 수정되었습니다.'
+        if len(new_company_code) != 6:
+            error = '회사 코드는 6자리여야 합니다.'
+        else:
+            saved = update_json('companies.json', _save_company)
+            if saved is None:
+                error = '이미 존재하는 회사명입니다.'
+            else:
+                company = saved
+                user = get_current_user()          # 저장하면서 버려졌으니 새로 읽힌다
+                session['company'] = company
+                success = '회사 정보가 성공적으로 수정되었습니다.'
 
     return render_template(
         'company_info.html',
@@ -2328,33 +4616,39 @@ def register_boss():
         if not (password and company and phone and len(company_code) == 6):
             return render_template('register_boss.html', error='모든 값을 올바르게 입력해 주세요.')
 
-        users = load_json('users.json', {})
-        companies = load_json('companies.json', {})
-
-        if company in companies:
-            return render_template('register_boss.html', error='이미 존재하는 회사명입니다.')
-        if any(u.get('phone') == phone for u in users.values()):
-            return render_template('register_boss.html', error='해당 전화번호로 이미 가입된 계정이 있습니다.')
-
-        base_username = f"{company}boss"
-        username = base_username
-        i = 1
-        while username in users:
-            username = f"{base_username}{i}"
-            i += 1
-
-        users[username] = {
-            "password": password,
-            "role": "boss",
-            "company": company,
-            "phone": phone,
-            "company_code": company_code,
-            "name": "사장님",
-        }
-        save_json('users.json', users)
-
-        companies[company] = {"code": company_code, "phone": phone}
-        save_json('companies.json', companies)
+        # 잠금 순서: companies.json -> users.json
+        def _register(companies):
+            if company in companies:
+                return '이미 존재하는 회사명입니다.'
+
+            def _add_boss(users):
+                if user_by_phone(phone) is not None:
+                    return '해당 전화번호로 이미 가입된 계정이 있습니다.'
+
+                base_username = f"{company}boss"
+                username = base_username
+                i = 1
+                while username in users:
+                    username = f"{base_username}{i}"
+                    i += 1
+
+                users[username] = {
+                    "password": password,
+                    "role": "boss",
+                    "company": company,
+                    "phone": phone,
+                    "company_code": company_code,
+                    "name": "사장님",
+                }
+
+            err = update_json('users.json', _add_boss)
+            if err:
+                return err
+            companies[company] = {"code": company_code, "phone": phone}
+
+        err = update_json('companies.json', _register)
+        if err:
+            return render_template('register_boss.html', error=err)
 
         _seed_company_containers(company)
 
@@ -2371,18 +4665,21 @@ def register_boss():
 @app.route('/_repair_companies_once')
 def _repair_companies_once():
     users = load_json('users.json', {})
-    companies = load_json('companies.json', {})
-    changed = 0
-    for u in users.values():
-        if u.get('role') == 'boss':
-            c = (u.get('company') or '').strip()
-            if not c: continue
-            code = (u.get('company_code') or '').strip()
-            phone = (u.get('phone') or '').strip()
-            if c not in companies or companies[c].get('code') != code or companies[c].get('phone') != phone:
-                companies[c] = {"code": code, "phone": phone}
-                changed += 1
-    save_json('companies.json', companies)
+
+    def _repair(companies):
+        changed = 0
+        for u in users.values():
+            if u.get('role') == 'boss':
+                c = (u.get('company') or '').strip()
+                if not c: continue
+                code = (u.get('company_code') or '').strip()
+                phone = (u.get('phone') or '').strip()
+                if c not in companies or companies[c].get('code') != code or companies[c].get('phone') != phone:
+                    companies[c] = {"code": code, "phone": phone}
+                    changed += 1
+        return changed
+
+    changed = update_json('companies.json', _repair)
     return f"repaired: {changed}"
 
 @app.route('/register/worker', methods=['GET', 'POST'])
@@ -2405,104 +4702,104 @@ def register_worker():
                 error = '회사 코드가 올바르지 않습니다.'
                 return render_template('register_worker.html', companies=sorted(companies.keys()), error=error)
 
-            users_db = load_json('users.json', {})
-            workers_db = load_json('workers.json', {})
-            workers_db.setdefault(company, [])
+            with data_lock(_shard_file('workers.json', company), 'users.json'):
+                users_db = load_json('users.json', {})
+                workers_db = {company: workers_read(company)}
 
-            for u_name, u in users_db.items():
-                if u.get('company') == company and (u.get('phone') or '') == phone:
+                dup = user_by_phone(phone, company)
+                if dup is not None:
                     return render_template(
                         'register_worker_conflict.html',
                         company=company,
                         name=name,
-                        existing_name=u.get('name',''),
+                        existing_name=users_db[dup].get('name',''),
                         existing_phone=phone,
                         message='이미 동일한 전화번호로 가입된 계정이 있습니다.',
                         show_homonym=False
                     )
 
-            exists = None
-            for w in workers_db[company]:
-                if (w.get('name') or '').strip() == name:
-                    exists = w
-                    break
-
-            if exists:
-                ex_username = exists.get('username') or f"{company}{name}"
+                exists = None
+                for w in workers_db[company]:
+                    if (w.get('name') or '').strip() == name:
+                        exists = w
+                        break
 
-                def ensure_user_entry(users_db, workers_db, company, username):
-                    if username in users_db:
+                if exists:
+                    ex_username = exists.get('username') or f"{company}{name}"
+
+                    def ensure_user_entry(users_db, workers_db, company, username):
+                        if username in users_db:
+                            return users_db[username]
+                        worker = None
+                        for w in workers_db.get(company, []):
+                            if w.get('username') == username:
+                                worker = w; break
+                        if not worker:
+                            return None
+                        phone = (worker.get('phone') or '').strip()
+                        default_pw = (phone[-4:] if len(phone) >= 4 else phone) or "0000"
+                        users_db[username] = {
+                            'password': default_pw,
+                            'role': worker.get('role') or 'worker',
+                            'company': company,
+                            'name': worker.get('name', ''),
+                            'phone': phone,
+                            'status': worker.get('status') or 'active',
+                        }
                         return users_db[username]
-                    worker = None
-                    for w in workers_db.get(company, []):
-                        if w.get('username') == username:
-                            worker = w; break
-                    if not worker:
-                        return None
-                    phone = (worker.get('phone') or '').strip()
-                    default_pw = (phone[-4:] if len(phone) >= 4 else phone) or "0000"
-                    users_db[username] = {
-                        'password': default_pw,
-                        'role': worker.get('role') or 'worker',
-                        'company': company,
-                        'name': worker.get('name', ''),
-                        'phone': phone,
-                        'status': worker.get('status') or 'active',
-                    }
-                    return users_db[username]
-
-                ensure_user_entry(users_db, workers_db, company, ex_username)
-                users_db[ex_username]['status'] = 'pending'
-                users_db[ex_username]['pending_update'] = {'phone': phone}
 
-                for w in workers_db[company]:
-                    if w.get('username') == ex_username:
-                        w['status'] = 'pending'
-                        break
+                    ensure_user_entry(users_db, workers_db, company, ex_username)
+                    users_db[ex_username]['status'] = 'pending'
+                    users_db[ex_username]['pending_update'] = {'phone': phone}
+
+                    for w in workers_db[company]:
+                        if w.get('username') == ex_username:
+                            w['status'] = 'pending'
+                            break
 
+                    save_json('users.json', users_db)
+                    workers_write(company, workers_db[company])
+
+                    return render_template(
+                        'register_worker_conflict.html',
+                        company=company,
+                        name=name,
+                        existing_name=exists.get('name',''),
+                        existing_phone=exists.get('phone',''),
+                        new_phone=phone,
+                        password=password,
+                        message=f'해당 회사에 {name}({exists.get("phone","")}) 기사가 존재합니다. 관리자/사장님에게 가입승인을 요청했습니다.',
+                        show_homonym=True
+                    )
+
+                base_username = f"{company}{name}"
+                username = base_username
+                suffix = 1
+                while username in users_db:
+                    username = f"{base_username}{suffix}"
+                    suffix += 1
+
+                users_db[username] = {
+                    'password': password,
+                    'role': 'worker',
+                    'company': company,
+                    'name': name,
+                    'phone': phone,
+                    'status': 'pending'
+                }
                 save_json('users.json', users_db)
-                save_json('workers.json', workers_db)
-
-                return render_template(
-                    'register_worker_conflict.html',
-                    company=company,
-                    name=name,
-                    existing_name=exists.get('name',''),
-                    existing_phone=exists.get('phone',''),
-                    new_phone=phone,
-                    password=password,
-                    message=f'해당 회사에 {name}({exists.get("phone","")}) 기사가 존재합니다. 관리자/사장님에게 가입승인을 요청했습니다.',
-                    show_homonym=True
-                )
-
-            base_username = f"{company}{name}"
-            username = base_username
-            suffix = 1
-            while username in users_db:
-                username = f"{base_username}{suffix}"
-                suffix += 1
-
-            users_db[username] = {
-                'password': password,
-                'role': 'worker',
-                'company': company,
-                'name': name,
-                'phone': phone,
-                'status': 'pending'
-            }
-            save_json('users.json', users_db)
 
-            workers_db[company] = [w for w in workers_db[company] if w.get('phone') != phone]
-            workers_db[company].append({
-                'username': username,
-                'name': name,
-                'phone': phone,
-                'role': 'worker',
-                'status': 'pending'
-            })
-            save_json('workers.json', workers_db)
+                workers_db[company] = [w for w in workers_db[company] if w.get('phone') != phone]
+                workers_db[company].append({
+                    'username': username,
+                    'name': name,
+                    'phone': phone,
+                    'role': 'worker',
+                    'status': 'pending'
+                })
+                workers_write(company, workers_db[company])
 
-            return render_template('register_worker_pending.html', name=name, company=company)
+                return render_template('register_worker_pending.html', name=name, company=company)
 
         return render_template('register_worker.html', companies=sorted(companies.keys()))
 
@@ -2517,55 +4814,55 @@ def resolve_homonym():
     company = (request.form.get('company') or '').strip()
     password = (request.form.get('password') or '').strip()
 
-    users_db = load_json('users.json', {})
-    workers_db = load_json('workers.json', {})
-    workers_db.setdefault(company, [])
-
-    ex = None
-    for w in workers_db[company]:
-        if (w.get('name') or '').strip() == name and (w.get('status') or '') == 'pending':
-            ex = w; break
-    if not ex:
-        for w in workers_db[company]:
-            if (w.get('name') or '').strip() == name:
-                ex = w; break
-    if not ex:
-        return back_with_error("기존 기사를 찾을 수 없습니다.")
-
-    ex_username = ex.get('username') or f"{company}{name}"
-
-    ex['name'] = f"{name}(A)"
-    ex['status'] = 'active'
-    if ex_username in users_db:
-        users_db[ex_username]['name'] = f"{name}(A)"
-        users_db[ex_username]['status'] = 'active'
-        users_db[ex_username].pop('pending_update', None)
-
-    base_username = f"{company}{name}"
-    username = base_username
-    i = 1
-    while username in users_db:
-        username = f"{base_username}{i}"
-        i += 1
-
-    users_db[username] = {
-        'password': password,
-        'role': 'worker',
-        'company': company,
-        'name': f"{name}(B)", 
-        'phone': phone,
-        'status': 'pending'
-    }
-    workers_db[company].append({
-        'username': username,
-        'name': f"{name}(B)",
-        'phone': phone,
-        'role': 'worker',
-        'status': 'pending'
-    })
+    with data_lock(_shard_file('workers.json', company), 'users.json'):
+        users_db = load_json('users.json', {})
+        workers_db = {company: workers_read(company)}
+
+        ex = None
+        for w in workers_db[company]:
+            if (w.get('name') or '').strip() == name and (w.get('status') or '') == 'pending':
+                ex = w; break
+        if not ex:
+            for w in workers_db[company]:
+                if (w.get('name') or '').strip() == name:
+                    ex = w; break
+        if not ex:
+            return back_with_error("기존 기사를 찾을 수 없습니다.")
+
+        ex_username = ex.get('username') or f"{company}{name}"
+
+        ex['name'] = f"{name}(A)"
+        ex['status'] = 'active'
+        if ex_username in users_db:
+            users_db[ex_username]['name'] = f"{name}(A)"
+            users_db[ex_username]['status'] = 'active'
+            users_db[ex_username].pop('pending_update', None)
+
+        base_username = f"{company}{name}"
+        username = base_username
+        i = 1
+        while username in users_db:
+            username = f"{base_username}{i}"
+            i += 1
+
+        users_db[username] = {
+            'password': password,
+            'role': 'worker',
+            'company': company,
+            'name': f"{name}(B)", 
+            'phone': phone,
+            'status': 'pending'
+        }
+        workers_db[company].append({
+            'username': username,
+            'name': f"{name}(B)",
+            'phone': phone,
+            'role': 'worker',
+            'status': 'pending'
+        })
 
-    save_json('users.json', users_db)
-    save_json('workers.json', workers_db)
+        save_json('users.json', users_db)
+        workers_write(company, workers_db[company])
 
     return render_template('register_worker_pending.html', name=f"{name}(B)", company=company)
 
@@ -2575,8 +4872,7 @@ def edit_worker():
         return redirect('/login')
 
     worker_username = request.args.get('worker_username')
-    users_db = load_json('users.json', {})
-    current_user = users_db.get(session['username'], {})
+    current_user = get_current_user()
     is_admin_user = current_user.get('role') in ('boss', 'manager')
 
     if worker_username and is_admin_user:
@@ -2588,7 +4884,7 @@ def edit_worker():
         back_endpoint = 'dashboard_worker' if current_user.get('role') == 'worker' else 'dashboard'
         back_label = '🏠 메인화면으로 돌아가기'
 
-    user_info = users_db.get(username_to_edit)
+    user_info = user_get(username_to_edit)
     if not user_info:
         return "사용자 정보를 찾을 수 없습니다.", 404
 
@@ -2600,23 +4896,13 @@ def edit_worker():
         phone = (request.form.get('phone') or '').strip()
         password = (request.form.get('password') or '').strip()
 
-        if name:     user_info['name'] = name
-        if phone:    user_info['phone'] = phone
-        if password: user_info['password'] = password
+        fields = {}
+        if name:     fields['name'] = name
+        if phone:    fields['phone'] = phone
+        user_fields = dict(fields, password=password) if password else fields
+        update_json('users.json', lambda users: users.setdefault(username_to_edit, user_info).update(user_fields))
 
-        users_db[username_to_edit] = user_info
-        save_json('users.json', users_db)
-
-        target_company = user_info.get('company', '')
-        workers_db = load_json('workers.json', {})
-        lst = workers_db.get(target_company, [])
-        for w in lst:
-            if w.get('username') == username_to_edit:
-                if name:  w['name'] = name
-                if phone: w['phone'] = phone
-                break
-        workers_db[target_company] = lst
-        save_json('workers.json', workers_db)
+        _worker_patch(user_info.get('company', ''), username_to_edit, fields)
 
         return redirect_with_from(back_endpoint)
 
@@ -2626,6 +4912,7 @@ def edit_worker():
 # 재무(요약/수입/지출)
 # =========================================================
 @app.route("/finance")
+@etag_cached("jobs.json", "incomes.json", "expenses_db.json", "workers.json")
 def finance_dashboard():
     company = (session.get("company") or (get_current_user() or {}).get("company", "")).strip()
 
@@ -2680,23 +4967,10 @@ def finance_dashboard():
     except Exception:
         page = 1
 
-    def _half_ok(d: date) -> bool:
-        if not d: return False
-        if half == "H12": return 1 <= d.month <= 6
-        if half == "H34": return 7 <= d.month <= 12
-        return True
-
-    # ===== 작업 로드 + 외주 자동동기화 =====
-    jobs_db = load_json("jobs.json", {})
-    jobs_all_company = jobs_db.get(company, [])
-    for i, j in enumerate(jobs_all_company):
-        j["_idx"] = i
-    _sync_outsourcing_entries(company, jobs_all_company)  # 버튼 없이 자동
+    # 외주 자동 수입/지출은 작업을 바꿀 때 맞춘다(outsourcing_touch) — 여기서는 읽기만
 
-    incomes_db  = load_json("incomes.json", {})
-    expenses_db = load_json("expenses_db.json", {})
-    inc_all = incomes_db.get(company, [])
-    exp_all = expenses_db.get(company, [])
+    inc_all = incomes_read(company)
+    exp_all = expenses_read(company)
 
     # 기간 필터
     inc_in_range = [r for r in inc_all if _in_range(_parse_date_safe(r.get("date")), start, end)]
@@ -2712,29 +4986,9 @@ def finance_dashboard():
     if exp_desc:
         exp_in_range = [r for r in exp_in_range if exp_desc.lower() in (r.get("desc","").lower())]
 
-    # ===== 외주 자동항목 ↔ 원본 작업 매핑 =====
-    import hashlib as _h
-    def _out_key_for_job(j: dict, kind: str) -> str:
-        base = "|".join([
-            str(j.get("date","")),
-            str(j.get("worker","")),
-            str(j.get("machine_number","")),
-            str(j.get("outsource_partner","")),
-            kind.lower().strip()
-        ])
-        return "auto-" + _h.md5(base.encode("utf-8")).hexdigest()[:16]
-
-    job_info_by_key = {}
-    for j in jobs_all_company:
-        ot = (j.get("outsource_type") or "").lower()
-        if ot in ("received","given"):
-            k = _out_key_for_job(j, ot)
-            job_info_by_key[k] = {
-                "status": (j.get("status") or "").strip(),
-                "payment_status": (j.get("payment_status") or "").strip(),
-                "date": j.get("date") or "",
-                "worker": (j.get("worker") or j.get("driver") or ""),
-            }
+    # ===== 기간 합계(일별 버킷) + 외주 자동항목 ↔ 원본 작업 매핑 =====
+    totals = finance_period_totals(company, start, end, half)
+    job_info_by_key = totals["job_info"]
 
     # ===== 표시 텍스트/링크 주입 =====
     # (1) 수입: 외주받음이 '완납'이 아니면 금액 칸에 텍스트, 외주 자동항목에만 링크
@@ -2771,76 +5025,58 @@ def finance_dashboard():
         ji = job_info_by_key.get(k)
         return bool(ji and ji.get("payment_status") == "완납")
 
-    income_total  = int(sum(_to_number(i.get("amount")) for i in inc_in_range if _count_income(i)))
-    expense_total = int(sum(e.get("display_amount", _to_number(e.get("amount"))) for e in exp_in_range))
+    # 검색 필터가 걸린 탭이면 걸러진 목록으로, 아니면 일별 버킷 합계
+    if inc_cat or inc_desc:
+        income_total = int(sum(_to_number(i.get("amount")) for i in inc_in_range if _count_income(i)))
+    else:
+        income_total = totals["income_total"]
+    if exp_cat or exp_desc:
+        expense_total = int(sum(e.get("display_amount", _to_number(e.get("amount"))) for e in exp_in_range))
+    else:
+        expense_total = totals["expense_total"]
 
     # ===== 상단 매출/미수 (외주받음 제외) =====
-    import datetime as _dt
-    completed, outstanding_all = [], 0
-    for j in jobs_all_company:
-        d = _parse_date_safe(j.get("date"))
-        if not (_in_range(d, start, end) and _half_ok(d)):
-            continue
-        amt  = _amount_won(j)
-        paid = _paid_won(j)
-        outstanding_all += max(0, amt - min(amt, paid))
-        if (j.get("status") or "진행중").strip() == "완료":
-            if (j.get("outsource_type") or "none") != "received":
-                completed.append((amt, paid))
-    sales_total = sum(a for a, p in completed if a > 0 and p >= a)
+    sales_total = totals["sales_total"]
+    outstanding_all = totals["outstanding_all"]
     profit_total = int((sales_total or 0) - (expense_total or 0) + (income_total or 0))
 
     # ===== 요약/내역 표(외주 작업 제외) =====
-    def _dt_key(j):
-        d = (j.get("date") or "").strip()
-        t = (j.get("time") or "").strip() or "00:00"
-        try:
-            return _dt.datetime.strptime(f"{d} {t}", "%Y-%m-%d %H:%M")
-        except:
-            try:
-                return _dt.datetime.strptime(d, "%Y-%m-%d")
-            except:
-                return _dt.datetime.min
+    if unpaid_only or pay == "unpaid":
+        colors = ("unpaid", "partial")
+    elif pay == "paid":
+        colors = ("paid",)
+    else:
+        colors = ()
+    flt = {
+        "day_from": start.isoformat(), "day_to": end.isoformat(), "half": half,
+        "no_outsrc": True,
+        "worker_has": (sel_worker or input_worker).strip() if by_worker else "",
+        "plate_has": q_plate if by_machine else "",
+        "owner_has": q_owner if by_client else "",
+        "tenant_has": q_tenant if by_client else "",
+        "colors": colors,
+        "status": {"todo": "pending", "done": "done"}.get(status_f, ""),
+    }
+    # 커서 방식(?paging=cursor): 표에 넣을 작업은 현재 페이지만 꺼내고, 건수/합계는 색인(SQLite: COUNT/SUM)으로만
+    cursor_mode = (request.args.get("paging") == "cursor"
+                   or bool(request.args.get("after") or request.args.get("before")))
+    next_cursor = prev_cursor = None
+    if cursor_mode:
+        pg = jobs_page(company, flt, page_size,
+                       after=request.args.get("after") or "", before=request.args.get("before") or "")
+        next_cursor, prev_cursor = pg["next"], pg["prev"]
+        matched = jobs_at(company, [pos for pos, _ in pg["items"]])
+        total, list_total_all = jobs_match_total(company, flt)
+    else:
+        matched = jobs_query(company, flt)
 
     rows = []
-    for j in jobs_all_company:
+    for j in matched:
         d = _parse_date_safe(j.get("date"))
-        if not (_in_range(d, start, end) and _half_ok(d)):
-            continue
-        if (j.get("outsource_type") or "none") in ("received", "given"):
-            continue
-
-        if by_worker:
-            target = (sel_worker or input_worker).strip()
-            if target and target not in ((j.get("worker") or j.get("driver") or "")):
-                continue
-        if by_machine and q_plate:
-            plate = (j.get("machine_number") or j.get("plate") or "")
-            if q_plate not in plate:
-                continue
-        if by_client:
-            owner  = (j.get("client_primary") or j.get("client") or "")
-            tenant = (j.get("client_tenant") or "")
-            if q_owner and q_owner not in owner:    continue
-            if q_tenant and q_tenant not in tenant: continue
-
         amt   = _amount_won(j)
         paid  = _paid_won(j)
         color = _color_by_payment(amt, paid, j.get("payment_status") or "")
-
-        if unpaid_only or pay == "unpaid":
-            if color not in ("unpaid","partial"):
-                continue
-        elif pay == "paid":
-            if color != "paid":
-                continue
-
-        st = (j.get("status") or "진행중").strip()
-        is_todo = (st != "완료")
-        if status_f == "todo" and not is_todo:
-            continue
-        if status_f == "done" and is_todo:
-            continue
+        is_todo = ((j.get("status") or "진행중").strip() != "완료")
 
         rows.append({
             "raw": j,
@@ -2855,28 +5091,31 @@ def finance_dashboard():
             "paid_won": paid,
             "color": color,
             "is_todo": is_todo,
-            "_sort": (_dt_key(j), j.get("_idx",-1)),
         })
 
-    rows.sort(key=lambda x: x["_sort"], reverse=True)
-    list_total_all = sum(r["amount_won"] for r in rows)
-    total = len(rows)
-    total_pages = max(1, (total + page_size - 1)//page_size)
-    page = min(page, total_pages)
-    sidx, eidx = (page - 1) * page_size, (page - 1) * page_size + page_size
-    rows_page = rows[sidx:eidx]
-
-    # 기사 드롭다운
-    registered_workers = []
-    workers_db = load_json("workers.json", {})
-    for w in workers_db.get(company, []):
-        nm = (w.get("name") or w.get("username") or "").strip()
-        if nm and nm not in registered_workers:
-            registered_workers.append(nm)
-    for j in jobs_all_company:
-        nm = (j.get("worker") or j.get("driver") or "").strip()
-        if nm and nm not in registered_workers:
-            registered_workers.append(nm)
+    if cursor_mode:
+        total_pages, page = 1, 1
+        rows_page = rows
+    else:
+        list_total_all = sum(r["amount_won"] for r in rows)
+        total = len(rows)
+        total_pages = max(1, (total + page_size - 1)//page_size)
+        page = min(page, total_pages)
+        sidx, eidx = (page - 1) * page_size, (page - 1) * page_size + page_size
+        rows_page = rows[sidx:eidx]
+
+    # 기사 드롭다운: 작업 전체를 훑으므로 템플릿 조각 캐시가 다시 그릴 때만 부른다
+    def registered_workers():
+        names = []
+        for w in workers_read(company):
+            nm = (w.get("name") or w.get("username") or "").strip()
+            if nm and nm not in names:
+                names.append(nm)
+        for j in jobs_read(company):
+            nm = (j.get("worker") or j.get("driver") or "").strip()
+            if nm and nm not in names:
+                names.append(nm)
+        return names
 
     # 삭제 후에도 현재 필터 유지
     from urllib.parse import urlencode
@@ -2911,6 +5150,7 @@ def finance_dashboard():
         # 목록(요약)
         jobs=rows_page, total=total, page=page, total_pages=total_pages, page_size=page_size,
         list_total_all=list_total_all,
+        cursor_mode=cursor_mode, next_cursor=next_cursor, prev_cursor=prev_cursor,
         # 컨트롤 상태
         tab=tab, company=company, half=half,
         by_worker=by_worker, by_machine=by_machine, by_client=by_client,
@@ -2933,18 +5173,15 @@ def finance_delete_job():
     user = get_current_user() or {}
     company = (user.get('company') or '').strip()
 
-    try:
-        job_index = int(request.form.get('job_index', '-1'))
-    except Exception:
-        job_index = -1
+    ref = request.form.get('job_id') or request.form.get('job_index')
 
-    db = load_json('jobs.json', {})
-    arr = db.get(company, [])
-
-    if 0 <= job_index < len(arr):
-        del arr[job_index]
-        db[company] = arr
-        save_json('jobs.json', db)
+    with jobs_lock(company):
+        job_index, job = job_lookup(company, ref)
+        ok = job_index is not None
+        if ok:
+            jobs_delete(company, [job_index])
+    if ok:
+        outsourcing_touch(company, job)
         flash('작업이 삭제되었습니다.')
     else:
         flash('삭제 대상이 올바르지 않습니다.', 'error')
@@ -2964,16 +5201,8 @@ def finance_sync_outsourcing():
         user = get_current_user() or {}
         company = (user.get('company') or '').strip()
 
-        # jobs 읽기
-        jobs_db = load_json('jobs.json', {})
-        jobs = (jobs_db.get(company, []) if isinstance(jobs_db, dict) else [])
-
-        # incomes/expenses 내부에서 list/dict 혼합 상태가 들어와도 터지지 않게 보장
-        # (_sync_outsourcing_entries) 진입 전에 파일 형태부터 맞춰둡니다.
-        incomes_db  = _ensure_company_bucket(load_json("incomes.json", {}), company)
-        expenses_db = _ensure_company_bucket(load_json("expenses_db.json", {}), company)
-        save_json("incomes.json", incomes_db)
-        save_json("expenses_db.json", expenses_db)
+        # jobs 읽기 (list/dict 혼합 레거시 형태는 _company_rows_read에서 정리됨)
+        jobs = jobs_read(company)
 
         summary = _sync_outsourcing_entries(company, jobs)
         return jsonify(success=True, **summary), 200
@@ -2996,18 +5225,14 @@ def finance_income_add():
     desc = (request.form.get('desc') or '').strip()
     amt  = int(_to_number(request.form.get('amount') or 0))  # _as_int 제거
 
-    incomes_db = load_json("incomes.json", {})
-    rows = list(incomes_db.get(company, []))
-    rows.append({
+    incomes_update(company, lambda rows: rows.append({
         "id": uuid.uuid4().hex,
         "date": date_s,
         "category": cat,
         "desc": desc,
         "amount": amt,
         "created_at": _now_str(),
-    })
-    incomes_db[company] = rows
-    save_json("incomes.json", incomes_db)
+    }))
 
     params = _carry_params_from_form()
     params["tab"] = "income_list"
@@ -3019,12 +5244,9 @@ def finance_income_delete(iid):
         return redirect(url_for('login'))
     company = (get_current_user() or {}).get('company','')
 
-    incomes_db = load_json("incomes.json", {})
-    rows = list(incomes_db.get(company, []))
-
     # 삭제 대상 찾기 (먼저 찾아야 원본 작업 삭제 가능)
     target = None
-    for r in rows:
+    for r in incomes_read(company):
         if str(r.get("id")) == str(iid):
             target = r
             break
@@ -3034,9 +5256,12 @@ def finance_income_delete(iid):
         _delete_outsourcing_job_by_auto_item(company, target)
 
     # 수입 행 삭제
-    rows = [r for r in rows if str(r.get("id")) != str(iid)]
-    incomes_db[company] = rows
-    save_json("incomes.json", incomes_db)
+    def _drop(rows):
+        rows[:] = [r for r in rows if str(r.get("id")) != str(iid)]
+    incomes_update(company, _drop)
+    if target and str(target.get("source","")).startswith("auto_outsrc_"):
+        # 같은 키를 만드는 작업이 더 남아 있으면 항목을 다시 맞춘다
+        outsourcing_touch(company, keys=[target.get("auto_key") or target.get("id")])
 
     # 🔁 쿼리스트링 유지해서 리다이렉트 (페이지/검색 유지)
     params = request.args.to_dict(flat=True)
@@ -3046,18 +5271,62 @@ def finance_income_delete(iid):
     return redirect(url_for('finance_dashboard', **params))
 
 
+def _fin_income_rows(incomes, job_info: dict, start: str, end: str, cat: str = "", desc: str = "") -> list:
+    """수입 엑셀 대상: 기간(문자열, 빈 값이면 열림)/카테고리/내역 필터, 완납이 아닌 외주수입 제외"""
+    rows = []
+    for r in incomes:
+        d = (r.get('date') or '').strip()
+        if not ((not start or d >= start) and (not end or d <= end)):
+            continue
+        if cat and cat not in (r.get('category') or '').lower():
+            continue
+        if desc and desc not in (r.get('desc') or '').lower():
+            continue
+
+        src = (r.get('source') or '')
+        if src == "auto_outsrc_received":
+            k = r.get("auto_key") or r.get("id")
+            # 완납이 아닌 외주수입 → 제외
+            if (job_info.get(k) or {}).get("payment_status") != "완납":
+                continue
+
+        rows.append(r)
+    return rows
+
+def _fin_income_desc(r: dict) -> str:
+    return r.get('desc', '')
+
+def _fin_expense_desc(e: dict) -> str:
+    return e.get("desc") or e.get("memo") or e.get("detail") or ""
+
+def _fin_expense_rows(expenses, start: date, end: date, cat: str = "", desc: str = "") -> list:
+    """지출 엑셀 대상: 기간/카테고리/내역 필터, 외주줬음 자동항목 제외"""
+    rows = []
+    for e in expenses:
+        d = _parse_date_safe(e.get("date"))
+        if not _in_range(d, start, end):              continue
+        if cat and cat not in (e.get("category","").lower()): continue
+        if desc and desc not in str(_fin_expense_desc(e)).lower(): continue
+        if _fin_is_auto_given(e):                      continue
+        rows.append(e)
+    return rows
+
+def _fin_rows_xlsx_cols(desc) -> list:
+    """수입/지출 엑셀 열: (항목, 금액) 쌍에서 일자/카테고리/내역/금액(원)"""
+    return [
+        xcol("일자", lambda x: x[0].get('date', ''), "text", 12),
+        xcol("카테고리", lambda x: x[0].get('category', ''), "text", 16),
+        xcol("내역", lambda x: desc(x[0]), "text", 24),
+        xcol("금액(원)", itemgetter(1), "money", 14),
+    ]
+
 @app.post("/finance/income/export", endpoint="finance_income_export_xlsx")
+@export_async
+@export_cached("income", "incomes.json", "jobs.json")
 def finance_income_export_xlsx():
     if 'username' not in session:
         return redirect(url_for('login'))
 
-    from io import BytesIO
-    from urllib.parse import quote
-    import datetime as dt
-    import hashlib as _h
-    from openpyxl import Workbook
-    from openpyxl.styles import Border, Side, Alignment, Font
-    from openpyxl.utils import get_column_letter
 
     user = get_current_user() or {}
     company = (user.get('company') or '').strip()
@@ -3068,112 +5337,23 @@ def finance_income_export_xlsx():
     inc_cat  = (request.form.get('inc_cat') or '').strip().lower()
     inc_desc = (request.form.get('inc_desc') or '').strip().lower()
 
-    # 열 너비 자동조절
-    def _autofit_worksheet(ws, min_widths=None, max_width=60):
-        min_widths = min_widths or {}
-        for col_idx in range(1, ws.max_column + 1):
-            letter = get_column_letter(col_idx)
-            max_len = 0
-            for cell in ws[letter]:
-                s = "" if cell.value is None else str(cell.value)
-                max_len = max(max_len, max((len(x) for x in s.splitlines()), default=0))
-            ws.column_dimensions[letter].width = max(min_widths.get(col_idx, 10),
-                                                     min(max_width, max_len + 2))
-
-    # --- 외주받음 정산 상태 확인용 매핑 (jobs.json) ---
-    def _out_key_for_job(j: dict, kind: str) -> str:
-        base = "|".join([
-            str(j.get("date","")),
-            str(j.get("worker","")),
-            str(j.get("machine_number","")),
-            str(j.get("outsource_partner","")),
-            kind.lower().strip()
-        ])
-        return "auto-" + _h.md5(base.encode("utf-8")).hexdigest()[:16]
-
-    jobs = load_json("jobs.json", {}).get(company, [])
-    job_pay_by_key = {}
-    for j in jobs:
-        if (j.get("outsource_type") or "").lower() == "received":
-            k = _out_key_for_job(j, "received")
-            job_pay_by_key[k] = (j.get("payment_status") or "").strip()
+    # --- 외주받음 정산 상태 확인용 매핑 (외주 작업만, 재무 집계와 공유) ---
+    job_info = _fin_job_days(company)["outsrc"]
 
     # --- 데이터 필터링 (정산되지 않은 외주수입 제외) ---
-    rows = []
-    for r in incomes_read(company):
-        d = (r.get('date') or '').strip()
-        if not ((not start or d >= start) and (not end or d <= end)):
-            continue
-        if inc_cat and inc_cat not in (r.get('category') or '').lower():
-            continue
-        if inc_desc and inc_desc not in (r.get('desc') or '').lower():
-            continue
-
-        src = (r.get('source') or '')
-        if src == "auto_outsrc_received":
-            k = r.get("auto_key") or r.get("id")
-            # 완납이 아닌 외주수입 → 제외
-            if job_pay_by_key.get(k) != "완납":
-                continue
-
-        rows.append(r)
+    rows = _fin_income_rows(incomes_read(company), job_info, start, end, inc_cat, inc_desc)
 
     # --- 엑셀 작성 ---
-    wb = Workbook(); ws = wb.active; ws.title = "수입"
-    headers = ["일자","카테고리","내역","금액(원)"]; ws.append(headers)
-    thin = Border(left=Side(style='thin'), right=Side(style='thin'),
-                  top=Side(style='thin'), bottom=Side(style='thin'))
-    center = Alignment(horizontal='center', vertical='center')
-    left   = Alignment(horizontal='left',   vertical='center')
-    right  = Alignment(horizontal='right',  vertical='center')
-
-    for c in ws[1]:
-        c.font = Font(bold=True); c.alignment = center; c.border = thin
-
-    total_income = 0
-    for r in rows:
-        amt = int(_to_number(r.get('amount')))
-        total_income += amt
-        row = [r.get('date',''), r.get('category',''), r.get('desc',''), amt]
-        ws.append(row)
-
-    # 본문 테두리/정렬/숫자서식
-    if ws.max_row >= 2:
-        amt_col = 4
-        for rr in ws.iter_rows(min_row=2, max_row=ws.max_row, max_col=ws.max_column):
-            for i, c in enumerate(rr, start=1):
-                c.border = thin
-                if i == amt_col:
-                    c.number_format = "#,##0"
-                    c.alignment = right
-                else:
-                    c.alignment = left
+    amounts = [int(_to_number(r.get('amount'))) for r in rows]
+    wb = _xlsx_workbook()
+    _xlsx_sheet(wb, "수입", _fin_rows_xlsx_cols(_fin_income_desc), list(zip(rows, amounts)),
+                tail=[(["총 수입", "", "", sum(amounts)], ["x_right_b"] * 3 + ["x_money_b"])], freeze=None)
 
-    # 합계 행
-    ws.append(["총 수입","","", total_income])
-    for i, c in enumerate(ws[ws.max_row], start=1):
-        c.border = thin
-        c.font = Font(bold=True)
-        c.alignment = right if i == 4 else right
-        if i == 4: c.number_format = "#,##0"
-
-    # 열너비 자동
-    _autofit_worksheet(ws, min_widths={1:12, 2:16, 3:24, 4:14})
-
-    bio = BytesIO(); wb.save(bio); bio.seek(0)
-    from urllib.parse import quote
     start_dt   = _parse_date_safe(request.form.get('start')) or date.today().replace(month=1, day=1)
     end_dt     = _parse_date_safe(request.form.get('end'))   or date.today()
     start_code = start_dt.strftime('%Y%m%d')
     end_code   = end_dt.strftime('%Y%m%d')
-    filename   = f"수입내역 {start_code}_{end_code}.xlsx"
-    q = quote(filename)
-
-    return Response(
-        bio.getvalue(),
-        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={q}; filename*=UTF-8''{q}"}
-    )
+    return _xlsx_stream_response(wb, f"수입내역 {start_code}_{end_code}.xlsx")
 
 # ----- 지출
 @app.route("/finance/expense/add", methods=["POST"])
@@ -3193,18 +5373,14 @@ def finance_expense_add():
         params = _carry_params_from_form(); params["tab"] = "expense_list"
         return redirect(url_for("finance_dashboard", **params))
 
-    expenses_db = load_json("expenses_db.json", {})
-    lst = list(expenses_db.get(company, []))
-    lst.append({
+    expenses_update(company, lambda lst: lst.append({
         "id": uuid.uuid4().hex[:8],
         "date": d_str,
         "category": category,
         "desc": desc,
         "amount": amount,
         "created_at": _now_str(),
-    })
-    expenses_db[company] = lst
-    save_json("expenses_db.json", expenses_db)
+    }))
     flash("지출이 등록되었습니다.")
 
     params = _carry_params_from_form()
@@ -3217,12 +5393,9 @@ def finance_expense_delete(eid):
         return redirect(url_for('login'))
     company = (get_current_user() or {}).get("company","")
 
-    expenses_db = load_json("expenses_db.json", {})
-    lst = list(expenses_db.get(company, []))
-
     # 삭제 대상 먼저 찾기
     target = None
-    for e in lst:
+    for e in expenses_read(company):
         if str(e.get("id")) == str(eid):
             target = e
             break
@@ -3232,9 +5405,11 @@ def finance_expense_delete(eid):
         _delete_outsourcing_job_by_auto_item(company, target)
 
     # 지출 행 삭제
-    lst = [e for e in lst if str(e.get("id")) != str(eid)]
-    expenses_db[company] = lst
-    save_json("expenses_db.json", expenses_db)
+    def _drop(lst):
+        lst[:] = [e for e in lst if str(e.get("id")) != str(eid)]
+    expenses_update(company, _drop)
+    if target and str(target.get("source","")).startswith("auto_outsrc_"):
+        outsourcing_touch(company, keys=[target.get("auto_key") or target.get("id")])
 
     # 🔁 쿼리스트링 유지해서 리다이렉트 (페이지/검색 유지)
     params = request.args.to_dict(flat=True)
@@ -3243,29 +5418,11 @@ def finance_expense_delete(eid):
         params["page"] = "1"
     return redirect(url_for('finance_dashboard', **params))
 
-from urllib.parse import quote
-
 @app.route("/finance/expense_export_xlsx", methods=["POST"])
 @perm_required('manage_jobs')
+@export_async
+@export_cached("expense", "expenses_db.json")
 def finance_expense_export_xlsx():
-    from io import BytesIO
-    from urllib.parse import quote
-    import datetime as dt
-    from openpyxl import Workbook
-    from openpyxl.styles import Border, Side, Alignment, Font
-    from openpyxl.utils import get_column_letter
-
-    # 열 너비 자동조절
-    def _autofit_worksheet(ws, min_widths=None, max_width=60):
-        min_widths = min_widths or {}
-        for col_idx in range(1, ws.max_column + 1):
-            letter = get_column_letter(col_idx)
-            max_len = 0
-            for cell in ws[letter]:
-                s = "" if cell.value is None else str(cell.value)
-                max_len = max(max_len, max((len(x) for x in s.splitlines()), default=0))
-            ws.column_dimensions[letter].width = max(min_widths.get(col_idx, 10),
-                                                     min(max_width, max_len + 2))
 
     company = (session.get("company") or (get_current_user() or {}).get("company", "")).strip()
     start_s = (request.form.get("start") or "").strip()
@@ -3276,93 +5433,68 @@ def finance_expense_export_xlsx():
     exp_cat  = (request.form.get("exp_cat")  or "").strip().lower()
     exp_desc = (request.form.get("exp_desc") or "").strip().lower()
 
-    def _is_auto_given(e):
-        return (e.get("source") == "auto_outsrc_given") or (
-            e.get("category") == "외주줬음" and e.get("auto_key")
-        )
-
-    exps_out = []
-    for e in expenses_read(company):
-        # 기간/검색 필터
-        d = _parse_date_safe(e.get("date"))
-        if not _in_range(d, start, end):              continue
-        if exp_cat and exp_cat not in (e.get("category","").lower()): continue
-        desc_text = str(e.get("desc") or e.get("memo") or e.get("detail") or "")
-        if exp_desc and exp_desc not in desc_text.lower():            continue
-        # 외주줬음 자동항목 제외
-        if _is_auto_given(e):                          continue
-        exps_out.append(e)
+    exps_out = _fin_expense_rows(expenses_read(company), start, end, exp_cat, exp_desc)
 
     # 엑셀
-    wb = Workbook(); ws = wb.active; ws.title = "지출"
-    headers = ["일자","카테고리","내역","금액(원)"]; ws.append(headers)
-    thin   = Border(left=Side(style='thin'), right=Side(style='thin'),
-                    top=Side(style='thin'), bottom=Side(style='thin'))
-    center = Alignment(horizontal='center', vertical='center')
-    left   = Alignment(horizontal='left',   vertical='center')
-    right  = Alignment(horizontal='right',  vertical='center')
-
-    for c in ws[1]:
-        c.font = Font(bold=True); c.alignment = center; c.border = thin
-
-    total_expense = 0
-    for e in exps_out:
-        amt = int(_to_number(e.get("amount") or 0))
-        total_expense += amt
-        ws.append([
-            e.get("date",""),
-            e.get("category",""),
-            e.get("desc") or e.get("memo") or e.get("detail") or "",
-            amt
-        ])
-
-    # 본문 서식
-    if ws.max_row >= 2:
-        amt_col_idx = 4
-        for r in ws.iter_rows(min_row=2, max_row=ws.max_row, max_col=ws.max_column):
-            for i, c in enumerate(r, start=1):
-                c.border = thin
-                if i == amt_col_idx:
-                    c.number_format = "#,##0"; c.alignment = right
-                else:
-                    c.alignment = left
-
-    # 합계 행
-    ws.append(["총 지출","","", total_expense])
-    for i, c in enumerate(ws[ws.max_row], start=1):
-        c.border = thin
-        c.font = Font(bold=True)
-        c.alignment = right if i == 4 else right
-        if i == 4: c.number_format = "#,##0"
-
-    # 열너비 자동
-    _autofit_worksheet(ws, min_widths={1:12, 2:16, 3:24, 4:14})
+    amounts = [int(_to_number(e.get("amount") or 0)) for e in exps_out]
+    wb = _xlsx_workbook()
+    _xlsx_sheet(wb, "지출", _fin_rows_xlsx_cols(_fin_expense_desc), list(zip(exps_out, amounts)),
+                tail=[(["총 지출", "", "", sum(amounts)], ["x_right_b"] * 3 + ["x_money_b"])], freeze=None)
 
-    bio = BytesIO(); wb.save(bio); bio.seek(0)
-    from urllib.parse import quote
     start_code = start.strftime('%Y%m%d')
     end_code   = end.strftime('%Y%m%d')
-    filename   = f"지출내역 {start_code}_{end_code}.xlsx"
-    q = quote(filename)
-
-    return Response(
-        bio.getvalue(),
-        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={q}; filename*=UTF-8''{q}"}
-    )
+    return _xlsx_stream_response(wb, f"지출내역 {start_code}_{end_code}.xlsx")
 
 # ====== (신규) 매출 요약 엑셀 추출 ======
+_FIN_SALES_HEADERS = {
+    "date": "일자",
+    "owner": "원수급자",
+    "tenant": "임차인",
+    "machine_name": "장비명",
+    "machine_number": "차량번호",
+    "worker": "기사",
+    "amount": "금액(원)",
+    "status": "납부여부",
+}
+# 컬럼별 최소 너비 조금 넉넉히 (원수급자/임차인은 길어질 수 있어 22)
+_FIN_SALES_MIN_W = {"owner": 22, "tenant": 22, "machine_name": 14, "machine_number": 14, "worker": 14,
+                    "date": 12, "amount": 14}
+
+def _fin_sales_row(j: dict, color: str) -> dict:
+    """매출요약 한 행 (color 는 _color_by_payment 결과)"""
+    return {
+        "date_str": j.get("date") or "",
+        "owner": (j.get("client_primary") or j.get("client") or ""),
+        "tenant": j.get("client_tenant") or "",
+        "machine_name": (j.get("machine_name") or j.get("machine_alias") or j.get("machine") or ""),
+        "machine_number": (j.get("machine_number") or j.get("plate") or ""),
+        "worker": (j.get("worker") or j.get("driver") or j.get("기사") or "-"),
+        "amount_won": int(_amount_won(j)),
+        "status": ("미납" if color=="unpaid" else ("부분납부" if color=="partial" else "완납")),
+    }
+
+def _fin_sales_sheet(wb, title: str, cols: list, rows: list,
+                     sales_total, expense_total, income_total, outstanding_all):
+    """매출 상세(cols 순서) + 하단 요약 박스 시트"""
+    get = {"date": itemgetter("date_str"), "amount": lambda r: int(r["amount_won"])}
+    spec = [xcol(_FIN_SALES_HEADERS[c], get.get(c) or itemgetter(c), "money" if c == "amount" else "text",
+                 _FIN_SALES_MIN_W.get(c, 12)) for c in cols]
+    profit_total = int(sales_total - expense_total + income_total)
+    n = max(len(cols), 2)
+    box = [("총 매출", sales_total), ("지출", expense_total), ("수입", income_total),
+           ("미정산 총액", outstanding_all), ("수익 (총 매출 - 지출 + 수입)", profit_total)]
+    tail = [([], []), (["요약", "금액(원)"] + [None] * (n - 2), ["x_head"] * n)]
+    tail += [([k, v], ["x_text", "x_money"]) for k, v in box]
+    # 요약 박스용 두 열도 최소폭 14
+    widths = {i: max(spec[i]["min_width"] if i < len(spec) else 12, 14) for i in (n - 2, n - 1)}
+    return _xlsx_sheet(wb, title, spec, rows, tail=tail, min_widths=widths)
+
 @app.post("/finance/export/xlsx", endpoint="finance_export_xlsx")
+@export_async
+@export_cached("finance", "jobs.json", "incomes.json", "expenses_db.json")
 def finance_export_xlsx():
-    # ── imports
-    from io import BytesIO
-    from urllib.parse import quote
-    import datetime as _dt
-    import hashlib as _h
     try:
-        from openpyxl import Workbook
-        from openpyxl.styles import Border, Side, Alignment, Font
-        from openpyxl.utils import get_column_letter
+        import openpyxl  # noqa: F401  (엔진이 쓴다. 없으면 여기서 안내)
     except Exception:
         return back_with_error(
             'finance_dashboard',
@@ -3386,6 +5518,8 @@ def finance_export_xlsx():
     by_worker  = truthy(request.form.get("by_worker"))
     by_machine = truthy(request.form.get("by_machine"))
     by_client  = truthy(request.form.get("by_client"))
+    # 요약 시트만: 원본 작업을 읽지 않고 월별 집계로만 만든다
+    summary_only = truthy(request.form.get("summary_only"))
 
     status_f = (request.form.get("status") or "").strip().lower()   # 'todo' / 'done' / ''
     pay_f    = (request.form.get("pay") or "").strip().lower()      # 'unpaid' / 'paid' / ''
@@ -3398,17 +5532,7 @@ def finance_export_xlsx():
 
     # 헤더 컬럼 선택
     cols_req = request.form.getlist("cols")
-    header_map = {
-        "date": "일자",
-        "owner": "원수급자",
-        "tenant": "임차인",
-        "machine_name": "장비명",
-        "machine_number": "차량번호",
-        "worker": "기사",
-        "amount": "금액(원)",
-        "status": "납부여부",
-    }
-    cols = [c for c in cols_req if c in header_map] or list(header_map.keys())
+    cols = [c for c in cols_req if c in _FIN_SALES_HEADERS] or list(_FIN_SALES_HEADERS)
 
     def _half_ok(d: date) -> bool:
         if not d: return False
@@ -3416,50 +5540,15 @@ def finance_export_xlsx():
         if half == "H34": return 7 <= d.month <= 12
         return True
 
-    # ── 작업/수입/지출 로드
-    jobs_all = load_json("jobs.json", {}).get(company, [])
+    # ── 작업 로드 (상세 내역이 있을 때만)
+    jobs_all, sort_keys = ([], []) if summary_only else jobs_read_keyed(company)
     for i, j in enumerate(jobs_all): j["_idx"] = i
 
-    incomes_db  = load_json("incomes.json",    {})
-    expenses_db = load_json("expenses_db.json",{})
-    inc_all = incomes_db.get(company, [])
-    exp_all = expenses_db.get(company, [])
-
-    # ── 외주 키 생성 & 외주 작업 상태 매핑(수입/지출 합계 계산용)
-    def _out_key_for_job(j: dict, kind: str) -> str:
-        base = "|".join([
-            str(j.get("date","")),
-            str(j.get("worker","")),
-            str(j.get("machine_number","")),
-            str(j.get("outsource_partner","")),
-            kind.lower().strip()
-        ])
-        return "auto-" + _h.md5(base.encode("utf-8")).hexdigest()[:16]
-
-    job_info_by_key = {}
-    for j in jobs_all:
-        ot = (j.get("outsource_type") or "").lower()
-        if ot in ("received","given"):
-            k = _out_key_for_job(j, ot)
-            job_info_by_key[k] = {
-                "status": (j.get("status") or "").strip(),            # 진행중/완료
-                "payment_status": (j.get("payment_status") or "").strip(), # 완납/미납/부분
-            }
-
     # ── 요약/내역 표 데이터 만들기 (외주 작업 제외)
-    def _dt_key(j):
-        d = (j.get("date") or "").strip()
-        t = (j.get("time") or "").strip() or "00:00"
-        try:
-            return _dt.datetime.strptime(f"{d} {t}", "%Y-%m-%d %H:%M")
-        except:
-            try:
-                return _dt.datetime.strptime(d, "%Y-%m-%d")
-            except:
-                return _dt.datetime.min
-
     rows = []
-    for j in jobs_all:
+    for k, j in enumerate(jobs_all):
+        if k % 1000 == 0:
+            _export_progress(k, len(jobs_all))
         d = _parse_date_safe(j.get("date"))
         if not (_in_range(d, start, end) and _half_ok(d)):
             continue
@@ -3498,179 +5587,170 @@ def finance_export_xlsx():
         if status_f == "done" and is_todo:
             continue
 
-        rows.append({
-            "date_str": j.get("date") or "",
-            "owner": (j.get("client_primary") or j.get("client") or ""),
-            "tenant": j.get("client_tenant") or "",
-            "machine_name": (j.get("machine_name") or j.get("machine_alias") or j.get("machine") or ""),
-            "machine_number": (j.get("machine_number") or j.get("plate") or ""),
-            "worker": (j.get("worker") or j.get("driver") or j.get("기사") or "-"),
-            "amount_won": int(_amount_won(j)),
-            "status": ("미납" if color=="unpaid" else ("부분납부" if color=="partial" else "완납")),
-            "_sort": (_dt_key(j), j.get("_idx",-1)),
-        })
+        row = _fin_sales_row(j, color)
+        row["_sort"] = (sort_keys[j["_idx"]], j["_idx"])
+        rows.append(row)
 
     rows.sort(key=lambda x: x["_sort"], reverse=True)
 
-    # ── 대시보드와 동일한 합계 계산
-    # 총 매출(완료+완납, 외주받음 제외) & 미정산 총액
-    completed, outstanding_all = [], 0
-    for j in jobs_all:
-        d = _parse_date_safe(j.get("date"))
-        if not (_in_range(d, start, end) and _half_ok(d)):
-            continue
-        amt  = _amount_won(j)
-        paid = _paid_won(j)
-        outstanding_all += max(0, amt - min(amt, paid))
-        if (j.get("status") or "진행중").strip() == "완료":
-            if (j.get("outsource_type") or "none") != "received":
-                completed.append((amt, paid))
-    sales_total = int(sum(a for a, p in completed if a > 0 and p >= a))
-
-    # 수입 합계(외주받음은 '완납'만 포함)
-    def _count_income(i: dict) -> bool:
-        if (i.get("source") or "") != "auto_outsrc_received":
-            return True
-        k = i.get("auto_key") or i.get("id")
-        ji = job_info_by_key.get(k)
-        return bool(ji and ji.get("payment_status") == "완납")
-
-    income_total = int(sum(
-        _to_number(i.get("amount"))
-        for i in inc_all
-        if _in_range(_parse_date_safe(i.get("date")), start, end) and _count_income(i)
-    ))
-
-    # 지출 합계(외주줬음 자동항목 제외)
-    def _is_auto_given(e):
-        return (e.get("source") == "auto_outsrc_given") or (
-            e.get("category") == "외주줬음" and e.get("auto_key")
-        )
-    expense_total = int(sum(
-        _to_number(e.get("amount"))
-        for e in exp_all
-        if _in_range(_parse_date_safe(e.get("date")), start, end) and not _is_auto_given(e)
-    ))
-
-    profit_total = int(sales_total - expense_total + income_total)
-
-    # ── 워크시트 작성
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "매출요약"
-    ws.freeze_panes = "A2"
-
-    # 헤더
-    ws.append([header_map[c] for c in cols])
-
-    # 본문
-    def row_to_list(r):
-        mapping = {
-            "date": r["date_str"],
-            "owner": r["owner"],
-            "tenant": r["tenant"],
-            "machine_name": r["machine_name"],
-            "machine_number": r["machine_number"],
-            "worker": r["worker"],
-            "amount": int(r["amount_won"]),
-            "status": r["status"],
-        }
-        return [mapping[c] for c in cols]
-
-    for r in rows:
-        ws.append(row_to_list(r))
-
-    # ── 스타일(헤더/본문/숫자서식/테두리)
-    thin   = Border(left=Side(style='thin'), right=Side(style='thin'),
-                    top=Side(style='thin'), bottom=Side(style='thin'))
-    center = Alignment(horizontal='center', vertical='center')
-    left   = Alignment(horizontal='left',   vertical='center')
-    right  = Alignment(horizontal='right',  vertical='center')
-
-    # 헤더
-    for c in ws[1]:
-        c.font = Font(bold=True)
-        c.alignment = center
-        c.border = thin
-
-    # 본문
-    amt_col_idx = (cols.index("amount") + 1) if "amount" in cols else None
-    if ws.max_row >= 2:
-        for rr in ws.iter_rows(min_row=2, max_row=ws.max_row, max_col=ws.max_column):
-            for i, c in enumerate(rr, start=1):
-                c.border = thin
-                if amt_col_idx and i == amt_col_idx:
-                    c.number_format = "#,##0"
-                    c.alignment = right
-                else:
-                    c.alignment = left
-
-    # ── 하단 요약 박스
-    ws.append([])
-    ws.append(["요약", "금액(원)"])
-    ws.append(["총 매출", sales_total])
-    ws.append(["지출", expense_total])
-    ws.append(["수입", income_total])
-    ws.append(["미정산 총액", outstanding_all])
-    ws.append(["수익 (총 매출 - 지출 + 수입)", profit_total])
-
-    # 요약 영역 스타일
-    sum_start = ws.max_row - 5  # "총 매출" 행 번호
-    # 헤더(요약 제목)
-    for c in ws[sum_start-1]:
-        c.font = Font(bold=True)
-        c.alignment = center
-        c.border = thin
-    # 데이터
-    for r in ws.iter_rows(min_row=sum_start, max_row=ws.max_row, min_col=1, max_col=2):
-        r[0].alignment = left
-        r[1].alignment = right
-        r[1].number_format = "#,##0"
-        for c in r:
-            c.border = thin
-
-    # ── 열 너비 자동
-    def _autofit_worksheet(ws, min_widths=None, max_width=60):
-        min_widths = min_widths or {}
-        for col_idx in range(1, ws.max_column + 1):
-            letter = get_column_letter(col_idx)
-            max_len = 0
-            for cell in ws[letter]:
-                s = "" if cell.value is None else str(cell.value)
-                max_len = max(max_len, max((len(x) for x in s.splitlines()), default=0))
-            ws.column_dimensions[letter].width = max(min_widths.get(col_idx, 10),
-                                                     min(max_width, max_len + 2))
-
-    # 컬럼별 최소 너비 조금 넉넉히
-    # (원수급자/임차인은 길어질 수 있어 22)
-    min_widths = {}
-    for idx, key in enumerate(cols, start=1):
-        if key in ("owner","tenant"): min_widths[idx] = 22
-        elif key in ("machine_name","machine_number","worker"): min_widths[idx] = 14
-        elif key == "date": min_widths[idx] = 12
-        elif key == "amount": min_widths[idx] = 14
-        else: min_widths[idx] = 12
-    # 요약 박스용 두 열도 최소폭 설정
-    col_cnt = ws.max_column
-    min_widths[col_cnt-1] = max(min_widths.get(col_cnt-1, 12), 14)
-    min_widths[col_cnt]   = max(min_widths.get(col_cnt,   12), 14)
-
-    _autofit_worksheet(ws, min_widths=min_widths)
+    # ── 대시보드와 동일한 합계 계산(일별 버킷)
+    totals = finance_period_totals(company, start, end, half)
+    sales_total, outstanding_all = totals["sales_total"], totals["outstanding_all"]
+    income_total, expense_total = totals["income_total"], totals["expense_total"]
+
+    # ── 매출요약 시트: 상세 내역 + 하단 요약 박스
+    wb = _xlsx_workbook()
+    _fin_sales_sheet(wb, "매출요약", cols, rows, sales_total, expense_total, income_total, outstanding_all)
+
+    # ── 월별 요약 시트 (기간/반기만 반영, 상세 필터는 적용하지 않음)
+    monthly = finance_monthly(company, start, end, half)
+    money = [xcol(h, itemgetter(i), "money", 14) for i, h in
+             enumerate(["건수", "금액(원)", "완납 매출(원)", "미수(원)"], start=2)]
+
+    def _sum(vals):
+        return [sum(v[k] for v in vals) for k in range(4)]
+
+    months = monthly["total"].get("", {})
+    m_rows = [(m, None, *v) for m, v in months.items()] + [("합계", None, *_sum(months.values()))]
+    _xlsx_sheet(wb, "월별 합계", [xcol("월", itemgetter(0), "text", 14)] + money, m_rows,
+                bold=lambda r: r[0] == "합계")
+
+    for dim, title, head in (("worker", "기사별", "기사"), ("machine", "장비별", "차량번호"),
+                             ("owner", "원수급자별", "원수급자"), ("tenant", "임차인별", "임차인")):
+        d_rows = []
+        for name, per_month in sorted(monthly[dim].items()):
+            label = name or "-"
+            d_rows += [(label, m, *v) for m, v in per_month.items()]
+            d_rows.append((label, "소계", *_sum(per_month.values())))
+        _xlsx_sheet(wb, title, [xcol(head, itemgetter(0), "text", 14), xcol("월", itemgetter(1), "text", 14)] + money,
+                    d_rows, bold=lambda r: r[1] == "소계")
 
     # ── 반환
-    bio = BytesIO()
-    wb.save(bio); bio.seek(0)
-    from urllib.parse import quote
     start_code = start.strftime('%Y%m%d')
     end_code   = end.strftime('%Y%m%d')
-    filename   = f"정산서 {start_code}_{end_code}.xlsx"
-    q = quote(filename)
+    return _xlsx_stream_response(wb, f"정산서 {start_code}_{end_code}.xlsx")
 
-    return Response(
-        bio.getvalue(),
-        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={q}; filename*=UTF-8''{q}"}
-    )
+# =========================================================
+# 연간 보고서 엑셀 (작업 요약/수입/지출/기사별/장비별을 한 파일로)
+# =========================================================
+# - jobs/incomes/expenses_db 를 한 번씩만 읽은 스냅샷을 시트들이 나눠 쓴다(읽기만 함)
+# - 시트별 행 준비는 보고서 전용 스레드 풀에서 동시에 하고, 엑셀 쓰기는 요청 스레드에서 한 번
+#   (이 뷰는 내보내기 큐 풀 안에서도 도므로 그 풀에 다시 맡기면 서로 기다리다 멈출 수 있다)
+REPORT_WORKERS = int(os.environ.get("REPORT_WORKERS", "4"))
+_REPORT_POOL = None
+
+def _report_pool() -> ThreadPoolExecutor:
+    global _REPORT_POOL
+    with _EXPORT_LOCK:
+        if _REPORT_POOL is None:
+            _REPORT_POOL = ThreadPoolExecutor(max_workers=max(1, REPORT_WORKERS), thread_name_prefix="report")
+        return _REPORT_POOL
+
+def _report_sales(year_jobs: list, keys: list):
+    """작업 요약 행(외주 제외, 최신순)과 요약 박스용 총 매출/미정산 (대시보드 합계와 같은 규칙)"""
+    rows, sales, due = [], 0, 0
+    for i, j, _d in year_jobs:
+        a, p = _amount_won(j), _paid_won(j)
+        due += max(0, a - min(a, p))
+        ot = j.get("outsource_type") or "none"
+        if (j.get("status") or "진행중").strip() == "완료" and ot != "received" and a > 0 and p >= a:
+            sales += a
+        if ot in ("received", "given"):
+            continue
+        row = _fin_sales_row(j, _color_by_payment(a, p, j.get("payment_status") or ""))
+        row["_sort"] = (keys[i], i)
+        rows.append(row)
+    rows.sort(key=itemgetter("_sort"), reverse=True)
+    return rows, int(sales), int(due)
+
+def _report_pivot(year_jobs: list, name_of) -> list:
+    """이름별 월 매출 피벗(외주 제외): (이름, 건수, 1~12월, 합계) 행들 + 맨 끝 합계 행"""
+    acc = {}
+    for _i, j, d in year_jobs:
+        if (j.get("outsource_type") or "none") in ("received", "given"):
+            continue
+        v = acc.setdefault(name_of(j) or "-", [0] * 13)
+        v[0] += 1
+        v[d.month] += int(_amount_won(j))
+    rows = [(name, *v, sum(v[1:])) for name, v in sorted(acc.items())]
+    rows.append(("합계", *[sum(r[k] for r in rows) for k in range(1, 15)]))
+    return rows
+
+def _report_pivot_cols(head: str) -> list:
+    return ([xcol(head, itemgetter(0), "text", 14), xcol("건수", itemgetter(1), "money", 8)]
+            + [xcol(f"{m}월", itemgetter(m + 1), "money", 12) for m in range(1, 13)]
+            + [xcol("합계", itemgetter(14), "money", 14)])
+
+def _with_amounts(rows: list) -> list:
+    """수입/지출 행 -> (행, 원 단위 금액)"""
+    return [(r, int(_to_number(r.get("amount") or 0))) for r in rows]
+
+@app.post("/finance/report/xlsx", endpoint="finance_report_xlsx")
+@perm_required('manage_jobs')   # 지출 시트가 들어가므로 지출 엑셀과 같은 권한
+@export_async
+@export_cached("report", "jobs.json", "incomes.json", "expenses_db.json")
+def finance_report_xlsx():
+    try:
+        import openpyxl  # noqa: F401  (엔진이 쓴다. 없으면 여기서 안내)
+    except Exception:
+        return back_with_error(
+            'finance_dashboard',
+            "openpyxl이 없습니다. 'pip install openpyxl' 후 다시 시도해 주세요."
+        )
+
+    company = ((get_current_user() or {}).get('company') or '').strip()
+    try:
+        year = int(request.form.get("year") or date.today().year)
+    except ValueError:
+        year = date.today().year
+    if not 1900 <= year <= 2999:
+        year = date.today().year
+    start, end = date(year, 1, 1), date(year, 12, 31)
+
+    # ── 스냅샷 (세 파일을 한 번씩)
+    jobs, keys = jobs_read_keyed(company)
+    incomes = incomes_read(company)
+    expenses = expenses_read(company)
+    year_jobs = []
+    for i, j in enumerate(jobs):
+        d = _parse_date_safe(j.get("date"))
+        if _in_range(d, start, end):
+            year_jobs.append((i, j, d))
+
+    # ── 시트별 행 준비 (동시에)
+    pool = _report_pool()
+    f_sales = pool.submit(_report_sales, year_jobs, keys)
+    f_inc = pool.submit(lambda: _with_amounts(
+        _fin_income_rows(incomes, _fin_outsrc_info(jobs), start.isoformat(), end.isoformat())))
+    f_exp = pool.submit(lambda: _with_amounts(_fin_expense_rows(expenses, start, end)))
+    f_worker = pool.submit(_report_pivot, year_jobs,
+                           lambda j: j.get("worker") or j.get("driver") or j.get("기사"))
+    f_machine = pool.submit(_report_pivot, year_jobs,
+                            lambda j: j.get("machine_number") or j.get("plate"))
+
+    sales_rows, sales_total, outstanding_all = f_sales.result()
+    inc, exp = f_inc.result(), f_exp.result()
+    income_total = sum(a for _r, a in inc)
+    expense_total = sum(a for _e, a in exp)
+    by_worker, by_machine = f_worker.result(), f_machine.result()
+
+    # ── 엑셀 쓰기 (한 번)
+    wb = _xlsx_workbook()
+    _export_progress(0, 5)
+    _fin_sales_sheet(wb, "작업 요약", list(_FIN_SALES_HEADERS), sales_rows,
+                     sales_total, expense_total, income_total, outstanding_all)
+    _export_progress(1, 5)
+    _xlsx_sheet(wb, "수입", _fin_rows_xlsx_cols(_fin_income_desc), inc,
+                tail=[(["총 수입", "", "", income_total], ["x_right_b"] * 3 + ["x_money_b"])], freeze=None)
+    _export_progress(2, 5)
+    _xlsx_sheet(wb, "지출", _fin_rows_xlsx_cols(_fin_expense_desc), exp,
+                tail=[(["총 지출", "", "", expense_total], ["x_right_b"] * 3 + ["x_money_b"])], freeze=None)
+    _export_progress(3, 5)
+    _xlsx_sheet(wb, "기사별", _report_pivot_cols("기사"), by_worker, bold=lambda r: r is by_worker[-1])
+    _export_progress(4, 5)
+    _xlsx_sheet(wb, "장비별", _report_pivot_cols("차량번호"), by_machine, bold=lambda r: r is by_machine[-1])
+
+    return _xlsx_stream_response(wb, f"연간 보고서 {year}.xlsx")
 
 # =========================================================
 # 거래처 정리
@@ -3679,9 +5759,8 @@ def finance_export_xlsx():
 @app.post("/manage_clients/prune")
 @perm_required('manage_jobs')
 def clients_prune():
-    users_db = load_json('users.json', {})
     username = session.get('username')
-    company = users_db.get(username, {}).get('company', '')
+    company = get_current_user().get('company', '')
 
     kind = (request.form.get('kind') or 'primary').strip()
     try:
@@ -3692,57 +5771,58 @@ def clients_prune():
         days = 30
     cutoff = date.today() - timedelta(days=days)
 
-    partners = load_partners(company)
-    owners   = partners.get('owners',  [])
-    tenants  = partners.get('tenants', [])
-
-    def canon(s: str) -> str:
-        s = (s or '').strip().lower()
-        s = re.sub(r'\s+', '', s)
-        s = s.replace('㈜', '').replace('(주)', '').replace('주식회사', '')
-        for w in ('크레인', '중기', '건설', '기계', '장비'):
-            s = s.replace(w, '')
-        s = s.replace('(', '').replace(')', '')
-        return s
-
-    jobs = load_json('jobs.json', {}).get(company, [])
-    last_used_owner  = {}
-    last_used_tenant = {}
-    for j in jobs:
-        d = _parse_date_safe(j.get('date'))
-        if not d: continue
-        o_raw = (j.get('client_primary') or j.get('client') or '').strip()
-        t_raw = (j.get('client_tenant') or '').strip()
-        if o_raw:
-            co = canon(o_raw)
-            last_used_owner[co] = max(last_used_owner.get(co, d), d)
-        if t_raw:
-            ct = canon(t_raw)
-            last_used_tenant[ct] = max(last_used_tenant.get(ct, d), d)
-
-    removed = []
-    if kind == 'tenant':
-        keep = []
-        for name in tenants:
-            lu = last_used_tenant.get(canon(name))
-            if not lu or lu < cutoff:
-                removed.append(name)
-            else:
-                keep.append(name)
-        partners['tenants'] = keep
-        label = '임차인'
-    else:
-        keep = []
-        for name in owners:
-            lu = last_used_owner.get(canon(name))
-            if not lu or lu < cutoff:
-                removed.append(name)
-            else:
-                keep.append(name)
-        partners['owners'] = keep
-        label = '원수급자'
+    with data_lock('partners.json'):
+        partners = load_partners(company)
+        owners   = partners.get('owners',  [])
+        tenants  = partners.get('tenants', [])
+
+        def canon(s: str) -> str:
+            s = (s or '').strip().lower()
+            s = re.sub(r'\s+', '', s)
+            s = s.replace('㈜', '').replace('(주)', '').replace('주식회사', '')
+            for w in ('크레인', '중기', '건설', '기계', '장비'):
+                s = s.replace(w, '')
+            s = s.replace('(', '').replace(')', '')
+            return s
+
+        jobs = jobs_read(company)
+        last_used_owner  = {}
+        last_used_tenant = {}
+        for j in jobs:
+            d = _parse_date_safe(j.get('date'))
+            if not d: continue
+            o_raw = (j.get('client_primary') or j.get('client') or '').strip()
+            t_raw = (j.get('client_tenant') or '').strip()
+            if o_raw:
+                co = canon(o_raw)
+                last_used_owner[co] = max(last_used_owner.get(co, d), d)
+            if t_raw:
+                ct = canon(t_raw)
+                last_used_tenant[ct] = max(last_used_tenant.get(ct, d), d)
+
+        removed = []
+        if kind == 'tenant':
+            keep = []
+            for name in tenants:
+                lu = last_used_tenant.get(canon(name))
+                if not lu or lu < cutoff:
+                    removed.append(name)
+                else:
+                    keep.append(name)
+            partners['tenants'] = keep
+            label = '임차인'
+        else:
+            keep = []
+            for name in owners:
+                lu = last_used_owner.get(canon(name))
+                if not lu or lu < cutoff:
+                    removed.append(name)
+                else:
+                    keep.append(name)
+            partners['owners'] = keep
+            label = '원수급자'
 
-    save_partners(company, partners.get('owners', []), partners.get('tenants', []))
+        save_partners(company, partners.get('owners', []), partners.get('tenants', []))
 
     try:
         flash(f"최근 {days}일간 미사용 {label} {len(removed)}건 삭제", "success")
@@ -4072,8 +6152,66 @@ def env_check():
         },
     })
 
+# =========================================================
+# 템플릿 미리 컴파일 (prod)
+# =========================================================
+# 필터/전역을 모두 등록한 뒤(여기)라야 컴파일된다.
+#  - prod 는 시작할 때 모든 템플릿을 컴파일해 jinja 캐시에 올린다(auto_reload 꺼짐 -> 다시 안 봄)
+#  - TEMPLATES_COMPILED_DIR 에 `python app.py compile-templates` 로 만든 바이트코드 모듈이 있으면
+#    그것을 먼저 쓴다(시작 시 파싱/컴파일도 생략). 템플릿을 고치면 배포 때 다시 만들어야 한다
+def compile_templates_to(target: str) -> int:
+    """templates/ 전체를 jinja 파이썬 모듈로 컴파일해 target 폴더에 쓴다. 만든 개수를 돌려준다"""
+    names = app.jinja_loader.list_templates()
+    env = app.jinja_env.overlay(loader=app.jinja_loader)
+    done = []
+    def _log(msg):
+        if msg.startswith("Compiled"):
+            done.append(msg)
+        elif msg.startswith("Could not"):
+            app.logger.warning(msg)
+    env.compile_templates(target, zip=None, filter_func=names.__contains__, log_function=_log)
+    return len(done)
+
+def _templates_warm() -> int:
+    n = 0
+    for name in app.jinja_loader.list_templates():
+        try:
+            app.jinja_env.get_template(name)
+            n += 1
+        except Exception as e:   # 깨진 템플릿 하나 때문에 시작이 막히지 않게(그 페이지에서 다시 오류남)
+            app.logger.warning("template %s: %s", name, e)
+    return n
+
+if not APP_DEV:
+    _compiled = app.config.get("TEMPLATES_COMPILED_DIR")
+    if _compiled and Path(_compiled).is_dir():
+        from jinja2 import ChoiceLoader, ModuleLoader
+        app.jinja_env.loader = ChoiceLoader([ModuleLoader(_compiled), app.jinja_env.loader])
+    _templates_warm()
+
 # =========================================================
 # run
 # =========================================================
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    import sys
+    if sys.argv[1:2] == ["compile-templates"]:
+        # 사용법: python app.py compile-templates [폴더]  (기본: TEMPLATES_COMPILED_DIR 또는 templates_compiled)
+        out = (sys.argv[2:3] or [app.config.get("TEMPLATES_COMPILED_DIR") or str(BASE_DIR / "templates_compiled")])[0]
+        print(f"compiled {compile_templates_to(out)} templates -> {out}")
+    elif sys.argv[1:2] == ["migrate-shards"]:
+        # 사용법: python app.py migrate-shards  (레거시 통합 파일 -> 회사별 파일, 모든 회사. 서버를 멈추고 실행)
+        print(json.dumps(_migrate_to_shards(), ensure_ascii=False))
+    elif sys.argv[1:2] == ["backfill-job-ids"]:
+        # 사용법: python app.py backfill-job-ids  (id 없는 예전 작업에 id 부여, 모든 회사)
+        print(json.dumps(_backfill_job_ids(), ensure_ascii=False))
+    elif sys.argv[1:2] == ["import-sqlite"]:
+        # 사용법: python app.py import-sqlite [--force]  (data/*.json -> SQLite. DB 가 비어 있을 때만, --force 면 덮어씀)
+        try:
+            print(json.dumps(_sqlite_import_json(force="--force" in sys.argv[2:]), ensure_ascii=False))
+        except RuntimeError as e:
+            sys.exit(str(e))
+    elif sys.argv[1:2] == ["compress-static"]:
+        # 사용법: python app.py compress-static  (static/ 옆에 .gz/.br 미리 만들기)
+        print(f"compressed {compress_static()} static files")
+    else:
+        app.run(debug=APP_DEV, host='0.0.0.0', port=5000)
@@ -0,0 +1,89 @@
+"""
+엑셀 내보내기 엔진 벤치마크 (작업 1만 건당)
+
+    python bench_export.py            # 1만, 10만
+    python bench_export.py 50000      # 원하는 건수
+
+이전: 일반 Workbook 에 행을 넣고 셀마다 Font/Border/Alignment 를 다시 붙인 뒤
+      열마다 전체 셀을 훑어 너비 계산(_autofit_worksheet)
+이후: 열 정의(xcol) + 이름 있는 스타일 + write-only 시트(_xlsx_sheet), 한 번에 너비 계산
+"""
+import os, sys, time, tempfile, statistics
+from pathlib import Path
+
+os.environ.setdefault("FLASK_SECRET_KEY", "bench")
+os.environ["STORAGE_BACKEND"] = "json"
+import app as A
+from bench_json import make_jobs
+
+_COLS = [("date", "일자", 12), ("worker", "기사", 14), ("machine_number", "차량번호", 14),
+         ("client_primary", "원수급자", 22), ("client_tenant", "임차인", 22), ("location", "현장", 12)]
+
+
+def old_build(rows, out):
+    # 예전 finance_export_xlsx 매출요약 시트 방식
+    from openpyxl import Workbook
+    from openpyxl.styles import Border, Side, Alignment, Font
+    from openpyxl.utils import get_column_letter
+    wb = Workbook(); ws = wb.active; ws.title = "매출요약"
+    ws.append([h for _, h, _ in _COLS] + ["금액(원)"])
+    thin = Border(left=Side(style='thin'), right=Side(style='thin'),
+                  top=Side(style='thin'), bottom=Side(style='thin'))
+    center = Alignment(horizontal='center', vertical='center')
+    left = Alignment(horizontal='left', vertical='center')
+    right = Alignment(horizontal='right', vertical='center')
+    for c in ws[1]:
+        c.font = Font(bold=True); c.alignment = center; c.border = thin
+    for j in rows:
+        ws.append([j.get(k, "") for k, _, _ in _COLS] + [A._amount_won(j)])
+    for rr in ws.iter_rows(min_row=2, max_row=ws.max_row, max_col=ws.max_column):
+        for i, c in enumerate(rr, start=1):
+            c.border = thin
+            if i == len(_COLS) + 1:
+                c.number_format = "#,##0"; c.alignment = right
+            else:
+                c.alignment = left
+    mins = [w for _, _, w in _COLS] + [14]
+    for col_idx in range(1, ws.max_column + 1):
+        letter = get_column_letter(col_idx)
+        max_len = max(len("" if c.value is None else str(c.value)) for c in ws[letter])
+        ws.column_dimensions[letter].width = max(mins[col_idx - 1], min(60, max_len + 2))
+    ws.freeze_panes = "A2"
+    wb.save(out)
+
+
+def new_build(rows, out):
+    spec = [A.xcol(h, lambda j, k=k: j.get(k, ""), "text", w) for k, h, w in _COLS]
+    spec.append(A.xcol("금액(원)", A._amount_won, "money", 14))
+    wb = A._xlsx_workbook()
+    A._xlsx_sheet(wb, "매출요약", spec, rows)
+    wb.save(out)
+
+
+def timeit(fn, repeat: int) -> float:
+    out = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        out.append(time.perf_counter() - t)
+    return statistics.median(out) * 1000.0
+
+
+def run(n: int):
+    rows = make_jobs(n)
+    repeat = 3 if n <= 20000 else 1
+    per = 10_000 / n
+    with tempfile.TemporaryDirectory() as d:
+        out = Path(d) / "x.xlsx"
+        before = timeit(lambda: old_build(rows, out), repeat)
+        after = timeit(lambda: new_build(rows, out), repeat)
+
+    print(f"\n== 작업 {n:,}건 (ms, 1만 건당) ==")
+    print(f"{'셀마다 스타일 + autofit (이전)':28} {before * per:9.1f}")
+    print(f"{'열 정의 엔진 (이후)':28} {after * per:9.1f}")
+
+
+if __name__ == "__main__":
+    sizes = [int(x) for x in sys.argv[1:]] or [10_000, 100_000]
+    for n in sizes:
+        run(n)
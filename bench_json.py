@@ -0,0 +1,85 @@
+"""
+JSON 저장소 코덱 벤치마크 (회사 1곳 작업 1만/10만 건)
+
+    python bench_json.py            # 1만, 10만
+    python bench_json.py 50000      # 원하는 건수
+
+코덱(orjson/msgspec/json) x 저장 형식(들여쓰기/한 줄)별로
+저장 시간, 캐시 없이 읽는 시간, 파일 크기를 출력한다.
+"""
+import os, sys, time, random, tempfile, statistics
+from pathlib import Path
+
+os.environ.setdefault("FLASK_SECRET_KEY", "bench")
+import app as A
+
+
+def make_jobs(n: int) -> list:
+    rnd = random.Random(n)
+    workers = [f"기사{i}" for i in range(12)]
+    owners = [f"{x}건설" for x in "가나다라마바사아자차카타파하"]
+    jobs = []
+    for i in range(n):
+        amount = rnd.choice([0, 25, 30, 45, 60, 80])
+        paid = rnd.choice([0, amount // 2, amount])
+        jobs.append({
+            "date": f"202{rnd.randint(3, 5)}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}",
+            "time": f"{rnd.randint(6, 18):02d}:{rnd.choice(['00', '30'])}",
+            "worker": rnd.choice(workers),
+            "machine_name": "카고크레인",
+            "machine_number": f"{rnd.randint(10, 99)}가{rnd.randint(1000, 9999)}",
+            "machine_alias": "",
+            "client_primary": rnd.choice(owners),
+            "client_tenant": rnd.choice(owners),
+            "client": "",
+            "location": "서울시 강남구 테헤란로 123",
+            "note": "상차 후 이동" if i % 7 == 0 else "",
+            "status": rnd.choice(["완료", "진행중"]),
+            "is_spare": False,
+            "outsource_type": "none",
+            "outsource_partner": "",
+            "amount_man": amount,
+            "paid_amount_man": paid,
+            "payment_status": "완납" if paid == amount else "미납",
+            "share_amount": False,
+            "duration_type": "하루",
+            "duration_hours": "",
+        })
+    return jobs
+
+
+def timeit(fn, repeat: int) -> float:
+    out = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        out.append(time.perf_counter() - t)
+    return statistics.median(out) * 1000.0
+
+
+def run(n: int):
+    jobs = make_jobs(n)
+    repeat = 5 if n <= 20000 else 3
+    codecs = ["json"] + [c for c, mod in (("orjson", A.orjson), ("msgspec", A.msgspec)) if mod]
+    print(f"\n== 작업 {n:,}건 ==")
+    print(f"{'codec':8} {'format':7} {'save ms':>9} {'load ms':>9} {'size KB':>9}")
+    with tempfile.TemporaryDirectory() as d:
+        A.DATA_DIR = Path(d)
+        name = "jobs/bench.json"
+        for codec in codecs:
+            for compact in ("", "1"):
+                os.environ["JSON_CODEC"], os.environ["JSON_COMPACT"] = codec, compact
+                save = timeit(lambda: A._json_file_save(name, jobs), repeat)
+
+                def cold_load():
+                    A._JSON_CACHE.clear()
+                    A._json_file_load(name, [])
+                load = timeit(cold_load, repeat)
+                size = (A.DATA_DIR / name).stat().st_size / 1024
+                print(f"{codec:8} {'compact' if compact else 'indent':7} {save:9.1f} {load:9.1f} {size:9.0f}")
+
+
+if __name__ == "__main__":
+    sizes = [int(x) for x in sys.argv[1:]] or [10_000, 100_000]
+    for n in sizes:
+        run(n)
@@ -0,0 +1,69 @@
+"""
+작업 정렬 키 벤치마크 (작업 1만 건당)
+
+    python bench_sort.py            # 1만, 10만
+    python bench_sort.py 50000      # 원하는 건수
+
+이전: 정렬할 때마다 작업마다 strptime(_dt_key)
+이후: 정렬 키를 한 번 계산해 두고(jobs_read_keyed) 문자열/튜플 비교만
+"""
+import os, sys, time, tempfile, statistics
+import datetime as _dt
+from pathlib import Path
+
+os.environ.setdefault("FLASK_SECRET_KEY", "bench")
+os.environ["STORAGE_BACKEND"] = "json"
+import app as A
+from bench_json import make_jobs
+
+
+def _dt_key(j):
+    # 예전 export_selected_xlsx / finance_export_xlsx 의 정렬 키
+    d = (j.get('date') or '').strip()
+    t = (j.get('time') or '').strip() or "00:00"
+    try:
+        return _dt.datetime.strptime(f"{d} {t}", "%Y-%m-%d %H:%M")
+    except Exception:
+        try:
+            return _dt.datetime.strptime(d, "%Y-%m-%d")
+        except Exception:
+            return _dt.datetime.min
+
+
+def timeit(fn, repeat: int) -> float:
+    out = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        out.append(time.perf_counter() - t)
+    return statistics.median(out) * 1000.0
+
+
+def run(n: int):
+    jobs = make_jobs(n)
+    repeat = 5 if n <= 20000 else 3
+    per = 10_000 / n
+    with tempfile.TemporaryDirectory() as d:
+        A.DATA_DIR = Path(d)
+        A.jobs_write("bench", jobs)
+        rows, keys = A.jobs_read_keyed("bench")   # 색인(정렬 키) 생성은 여기서 한 번
+        pos = list(range(len(rows)))
+
+        before = timeit(lambda: sorted(rows, key=_dt_key, reverse=True), repeat)
+        after = timeit(lambda: sorted(pos, key=keys.__getitem__, reverse=True), repeat)
+        keyed = timeit(lambda: A.jobs_read_keyed("bench"), repeat)
+        old_keys = timeit(lambda: [_dt_key(j) for j in rows], repeat)
+        new_keys = timeit(lambda: [A._job_sort_ts(j) for j in rows], repeat)
+
+    print(f"\n== 작업 {n:,}건 (ms, 1만 건당) ==")
+    print(f"{'정렬: strptime 키 (이전)':28} {before * per:9.2f}")
+    print(f"{'정렬: 캐시된 키 (이후)':28} {after * per:9.2f}")
+    print(f"{'jobs_read_keyed (캐시 적중)':28} {keyed * per:9.2f}")
+    print(f"{'키 계산: strptime':28} {old_keys * per:9.2f}")
+    print(f"{'키 계산: _job_sort_ts':28} {new_keys * per:9.2f}")
+
+
+if __name__ == "__main__":
+    sizes = [int(x) for x in sys.argv[1:]] or [10_000, 100_000]
+    for n in sizes:
+        run(n)
@@ -0,0 +1,69 @@
+"""
+템플릿 모드 벤치마크: 작업 목록(/jobs)과 재무(/finance) 응답 시간
+
+    python bench_templates.py            # 작업 1만 건
+    python bench_templates.py 50000      # 원하는 건수
+
+dev : 요청마다 jinja 캐시를 비운다(_dev__always_reload_templates) -> 매번 다시 컴파일
+prod: 시작할 때 한 번 컴파일해 둔 캐시를 그대로 쓴다
+시작 비용: 전체 템플릿을 소스에서 컴파일 vs compile_templates 로 만든 바이트코드 모듈에서 읽기
+"""
+import os, sys, time, tempfile, statistics
+from pathlib import Path
+
+os.environ.setdefault("FLASK_SECRET_KEY", "bench")
+os.environ["STORAGE_BACKEND"] = "json"
+os.environ["APP_MODE"] = "prod"
+import app as A
+from bench_json import make_jobs
+
+PAGES = ["/jobs", "/jobs?per_page=100", "/finance", "/finance?tab=income_list"]
+
+
+def timeit(fn, repeat: int) -> float:
+    out = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        out.append(time.perf_counter() - t)
+    return statistics.median(out) * 1000.0
+
+
+def run(n: int, repeat: int = 15):
+    with tempfile.TemporaryDirectory() as d:
+        A.DATA_DIR = Path(d)
+        A.save_json("users.json", {"benchboss": {"password": "pw", "role": "boss", "company": "bench",
+                                                 "phone": "01000000000", "name": "사장님"}})
+        A.jobs_write("bench", make_jobs(n))
+        c = A.app.test_client()
+        c.post("/login", data={"phone": "01000000000", "password": "pw"})
+        for q in PAGES:
+            assert c.get(q).status_code == 200, q
+
+        print(f"\n== 작업 {n:,}건, 응답 시간 (ms, 중앙값) ==")
+        print(f"{'페이지':28} {'dev':>9} {'prod':>9}")
+        for q in PAGES:
+            dev = timeit(lambda: (A._dev__always_reload_templates(), c.get(q)), repeat)
+            prod = timeit(lambda: c.get(q), repeat)
+            print(f"{q:28} {dev:9.1f} {prod:9.1f}")
+
+        src = timeit(lambda: (A.app.jinja_env.cache.clear(), A._templates_warm()), 5)
+        loader = A.app.jinja_env.loader
+        with tempfile.TemporaryDirectory() as out:
+            A.compile_templates_to(out)
+            from jinja2 import ChoiceLoader, ModuleLoader
+            A.app.jinja_env.loader = ChoiceLoader([ModuleLoader(out), loader])
+            try:
+                mod = timeit(lambda: (A.app.jinja_env.cache.clear(), A._templates_warm()), 5)
+            finally:
+                A.app.jinja_env.loader = loader
+                A.app.jinja_env.cache.clear()
+                A._templates_warm()
+        print(f"{'시작: 소스에서 전체 컴파일':28} {src:9.1f}")
+        print(f"{'시작: 바이트코드 모듈':28} {mod:9.1f}")
+
+
+if __name__ == "__main__":
+    sizes = [int(x) for x in sys.argv[1:]] or [10_000]
+    for n in sizes:
+        run(n)
@@ -0,0 +1,40 @@
+/* 엑셀 내보내기: 백그라운드로 만들고(_async=1) 상태를 물어보다가 끝나면 내려받는다.
+   form[data-export] 는 자동으로, 스크립트로 만든 폼은 submitExport(form) 으로 */
+(function(){
+  function box(){
+    let el = document.getElementById('export-progress');
+    if(!el){
+      el = document.createElement('div'); el.id = 'export-progress';
+      el.style.cssText = 'position:fixed;right:16px;bottom:16px;z-index:9999;background:#111827;color:#fff;padding:10px 14px;border-radius:10px;font-size:14px;box-shadow:0 4px 12px rgba(0,0,0,.2);';
+      document.body.appendChild(el);
+    }
+    return el;
+  }
+  function done(el, ms){ setTimeout(()=>el.remove(), ms); }
+  window.submitExport = function(form){
+    const fd = new FormData(form); fd.append('_async', '1');
+    fetch(form.action, {method:'POST', body:fd, credentials:'same-origin', headers:{'Accept':'application/json'}})
+      .then(r => r.json().then(d => [r.status, d]))
+      .then(([status, d]) => {
+        if(!d.success){ alert(d.error || '엑셀을 만들지 못했습니다.'); return; }
+        const el = box(); el.textContent = '엑셀 준비 중…';
+        const poll = () => fetch(d.status_url, {credentials:'same-origin'}).then(r => r.json()).then(s => {
+          if(s.state === 'done'){ el.textContent = '엑셀 내려받는 중'; location.href = s.download_url; done(el, 3000); }
+          else if(s.state === 'error' || !s.success){ el.remove(); alert(s.error || '엑셀을 만들지 못했습니다.'); }
+          else {
+            el.textContent = s.state === 'queued' ? ('엑셀 대기 중' + (s.position ? ' (앞에 ' + s.position + '건)' : '') + '…')
+                                                  : ('엑셀 만드는 중… ' + (s.progress || 0) + '%');
+            setTimeout(poll, 1000);
+          }
+        }).catch(() => setTimeout(poll, 3000));
+        poll();
+      })
+      .catch(() => form.submit());   // JSON 이 아니면(구버전 서버 등) 예전처럼 바로 받기
+  };
+  document.addEventListener('submit', function(e){
+    const f = e.target;
+    if(!(f instanceof HTMLFormElement) || !f.hasAttribute('data-export')) return;
+    e.preventDefault();
+    window.submitExport(f);
+  });
+})();